@@ -0,0 +1,678 @@
+'''
+Benchmarks for the parts of the simulation that limit how large (and how long)
+a run can get. Towers are built beam by beam with Builder.addbeam and analyzed
+with the local analysis program, so no SAP2000 is needed.
+
+Run with "python benchmark.py [benchmark ...]" (all benchmarks by default).
+'''
+from helpers import helpers
+from robots.builder import Builder
+from robots.colony import SmartSwarm
+from sap2000.constants import MATERIAL_TYPES, STEEL_SUBTYPES, PLACEHOLDER
+from sap2000.sap2000 import Sap2000
+from sap2000.sap_local import LocalSap2000
+from sap2000.sap_recorded import RecordedSapObject, SapRecorder
+from sap2000.sap_solver import SOLVERS
+from structure.beams import Beam, BeamStore
+from structure.structure import grid_resolution, Structure
+import construction, gzip, math, numpy as np, os, pickle, random, sys
+import tempfile, time, tracemalloc, variables
+
+def start_program(solver = "sparse", cache_analysis = False):
+  '''
+  Starts a local program with the scaffold tube defined (as the Simulation
+  does)
+  '''
+  program = LocalSap2000(solver,cache_analysis)
+  program.start(variables.program_units)
+  model = program.model
+  ret, name = model.PropMaterial.AddQuick(variables.material_property,
+    MATERIAL_TYPES[variables.material_type],
+    STEEL_SUBTYPES[variables.material_subtype],PLACEHOLDER,PLACEHOLDER,
+    PLACEHOLDER,PLACEHOLDER,PLACEHOLDER,variables.material_property)
+  assert ret == 0
+  ret = model.PropFrame.SetPipe(variables.frame_property_name,
+    variables.material_property,variables.outside_diameter,
+    variables.wall_thickness)
+  assert ret == 0
+
+  return program
+
+def tower_beams(num_beams, bays = 3):
+  '''
+  Returns the endpoints of the first num_beams beams of a lattice tower with
+  bays x bays bays per floor. Each floor has its columns, the beams around and
+  across the floor, and a diagonal in every bay of the outside faces.
+  '''
+  x0, y0, z0 = construction.construction_location
+  size = variables.beam_length
+  def node(i,j,k):
+    return (x0 + i * size, y0 + j * size, z0 + k * size)
+
+  beams = []
+  k = 0
+  while len(beams) < num_beams:
+    columns = [(node(i,j,k),node(i,j,k+1)) for i in range(bays + 1) for j in
+      range(bays + 1)]
+    floor = ([(node(i,j,k+1),node(i+1,j,k+1)) for i in range(bays) for j in
+      range(bays + 1)] + [(node(i,j,k+1),node(i,j+1,k+1)) for i in
+      range(bays + 1) for j in range(bays)])
+    diagonals = ([(node(i,j,k),node(i+1,j,k+1)) for i in range(bays) for j in
+      (0,bays)] + [(node(i,j,k),node(i,j+1,k+1)) for i in (0,bays) for j in
+      range(bays)])
+    beams += columns + floor + diagonals
+    k += 1
+
+  return beams[:num_beams]
+
+def build_tower(num_beams, solver = "sparse", cache_analysis = False):
+  '''
+  Builds a tower of num_beams beams with Builder.addbeam. Returns the program,
+  the structure and the builder.
+  '''
+  program = start_program(solver,cache_analysis)
+  structure = Structure(False)
+  builder = Builder("benchmark",structure,construction.construction_location,
+    program)
+  for p1, p2 in tower_beams(num_beams):
+    builder.location = p1
+    builder.num_beams = variables.beam_capacity
+    assert builder.addbeam(p1,p2)
+
+  return program, structure, builder
+
+def time_analysis(program, read_forces = True):
+  '''
+  Returns the time it takes to run the analysis and (optionally) to read the
+  frame forces of every beam
+  '''
+  model = program.model
+  model.SetModelIsLocked(False)
+  start = time.time()
+  ret = model.Analyze.RunAnalysis()
+  assert ret == 0
+  if read_forces:
+    model.Results.Setup.DeselectAllCasesAndCombosForOutput()
+    model.Results.Setup.SetCaseSelectedForOutput(variables.robot_load_case)
+    ret = model.Results.FrameForce("ALL",2)
+    assert ret[0] == 0
+
+  return time.time() - start
+
+def solve_time(sizes = (250,500,1000,2000,4000), dense_limit = 2000):
+  '''
+  Analysis time against the number of beams, for each of the local solvers
+  '''
+  print("Analysis time (s) against the number of beams")
+  print("{:>8} {:>8} {:>8}".format("beams","nodes","build") + "".join(
+    "{:>10}".format(solver) for solver in SOLVERS))
+  for size in sizes:
+    start = time.time()
+    program, structure, builder = build_tower(size)
+    build = time.time() - start
+    nodes = program.model.PointObj.Count()
+
+    # Mesh the model once so that only the solvers are timed
+    program.model.get_mesh()
+    times = []
+    for solver in SOLVERS:
+      if solver == "dense" and size > dense_limit:
+        times.append("-")
+      else:
+        program.model.solver = solver
+        times.append("{:.3f}".format(time_analysis(program)))
+    print("{:>8} {:>8} {:>8.2f}".format(size,nodes,build) + "".join(
+      "{:>10}".format(t) for t in times))
+  print()
+
+def timestep_time(sizes = (1000,2000,4000), steps = 20):
+  '''
+  Analysis time of the incremental solver for a timestep in which only the
+  robot loads move, and for one in which a beam is added, compared to an
+  analysis from scratch (mesh and factorization)
+  '''
+  print("Analysis time (ms) per timestep")
+  print("{:>8} {:>12} {:>12} {:>12}".format("beams","from scratch",
+    "loads moved","beam added"))
+  for size in sizes:
+    beams = tower_beams(size + steps)
+    program, structure, builder = build_tower(size,"incremental")
+    model = program.model
+    full = time_analysis(program,False)
+
+    # Move a load along a beam
+    start = time.time()
+    for step in range(steps):
+      model.SetModelIsLocked(False)
+      ret = model.FrameObj.SetLoadPoint("1",variables.robot_load_case,1,10,
+        step / steps,variables.robot_load,"Global",True,True,0)
+      assert ret == 0
+      time_analysis(program,False)
+    loads = (time.time() - start) / steps
+
+    # Add beams
+    start = time.time()
+    for p1, p2 in beams[size:]:
+      builder.location = p1
+      builder.num_beams = variables.beam_capacity
+      assert builder.addbeam(p1,p2)
+      time_analysis(program,False)
+    added = (time.time() - start) / steps
+
+    print("{:>8} {:>12.1f} {:>12.1f} {:>12.1f}".format(size,full * 1000,
+      loads * 1000,added * 1000))
+  print()
+
+def nested_grid(structure):
+  '''
+  Returns the boxes of the structure as the nested lists of dictionaries that
+  Structure used to keep (every box, empty or not, up to the top of the 
+  structure)
+  '''
+  num_x, num_y, num_z = structure.num
+  indeces = [(key // num_z // num_y,key // num_z % num_y,key % num_z) for key
+    in structure.model]
+  levels = max(zi for xi, yi, zi in indeces) + 1
+  grid = [[[{} for k in range(levels)] for j in range(num_y)] for i in
+    range(num_x)]
+  for (xi, yi, zi), box in zip(indeces,structure.model.values()):
+    grid[xi][yi][zi] = dict(box)
+
+  return grid
+
+def scan_lookup(grid, structure, name, location):
+  '''
+  The lookup of a beam by name before the registry: the box at location, and
+  on a miss a scan of the whole grid (twice)
+  '''
+  xi, yi, zi = [int(math.floor(coord / size)) for coord, size in
+    zip(location,structure.box_size)]
+  for key, beam in grid[xi][yi][zi].items():
+    if key == name:
+      return beam
+
+  def find_beam():
+    for wall in grid:
+      for column in wall:
+        for cell in column:
+          if name in cell:
+            return cell[name]
+    return None
+
+  if find_beam() is not None:
+    return find_beam()
+  else:
+    return None
+
+def lookup_time(num_beams = 5000, lookups = 2000):
+  '''
+  Time per lookup of a beam by name, when the location is on the beam (hit)
+  and when it is somewhere else in the structure (miss), before and after the
+  registry
+  '''
+  program, structure, builder = build_tower(num_beams)
+  grid = nested_grid(structure)
+  rand = random.Random(1)
+  names = [rand.choice(list(structure.beams)) for i in range(lookups)]
+  beams = [structure.beams[name] for name in names]
+  hits = [beam.endpoints.i for beam in beams]
+  misses = [rand.choice(beams).endpoints.j for beam in beams]
+
+  def timed(lookup, locations):
+    start = time.time()
+    for name, beam, location in zip(names,beams,locations):
+      assert lookup(name,location) is beam
+    return (time.time() - start) / lookups * 1e6
+
+  print("Lookup time (us) of a beam by name in a {} beam tower".format(
+    num_beams))
+  print("{:>10} {:>10} {:>10}".format("","scan","registry"))
+  for label, locations in (("hit",hits),("miss",misses)):
+    scan = timed(lambda name, location: scan_lookup(grid,structure,name,
+      location),locations)
+    registry = timed(structure.get_beam,locations)
+    print("{:>10} {:>10.1f} {:>10.2f}".format(label,scan,registry))
+  print()
+
+def box_indeces(structure, point):
+  return tuple(int(math.floor(coord / size)) for coord, size in zip(point,
+    structure.box_size))
+
+def crawl_path(structure, coord1, coord2):
+  '''
+  The traversal of Structure.__path before the DDA: crawls along the line from
+  box to box, pushing past each boundary by epsilon / 2. Returns points on the
+  line (possibly several in the same box).
+  '''
+  def get_sign(n):
+    if n == 0:
+      return None
+    else:
+      return n > 0
+
+  signs = (get_sign(coord2[0] - coord1[0]), get_sign(coord2[1] - coord1[1]),
+    get_sign(coord2[2] - coord1[2]))
+  line = helpers.make_vector(coord1,coord2)
+
+  def crawl(point):
+    xi, yi, zi = box_indeces(structure,point)
+    bounds = (xi*structure.box_size[0], yi*structure.box_size[1],
+      zi*structure.box_size[2])
+
+    def closest(p):
+      def distance(i):
+        if signs[i] == None:
+          return None
+        elif signs[i]:
+          return abs(p[i] - (bounds[i] + structure.box_size[i]))
+        else:
+          return abs(p[i] - bounds[i])
+
+      index = None
+      for i in range(3):
+        dist, vel = distance(i), abs(line[i])
+        if dist is not None and vel != 0:
+          if index is None:
+            index = i
+          else:
+            min_time = distance(index) / abs(line[index])
+            index = i if dist / vel < min_time else index
+
+      return index, distance(index)
+
+    index, distance = closest(point)
+    move = helpers.scale(distance / abs(line[index]), line)
+    push = helpers.scale(variables.epsilon / 2, line)
+    change = helpers.sum_vectors(move,push)
+    assert helpers.compare(abs(move[index]), distance)
+
+    return helpers.sum_vectors(point,change)
+
+  points, passed,temp = [coord2], False, coord1
+  while not passed:
+    points.append(temp)
+    temp = crawl(temp)
+    for i in range(3):
+      if signs[i] != None:
+        passed = (temp[i] > coord2[i] + variables.epsilon / 2 if signs[i] 
+          else temp[i] < coord2[i] - variables.epsilon / 2)
+
+  return points
+
+def random_segments(structure, number, seed = 1):
+  '''
+  Returns random segments in the grid of the structure: half anywhere (up to
+  a height as large as the width of the structure), and half between points of
+  a lattice of beam lengths (which often lie on box boundaries)
+  '''
+  rand = random.Random(seed)
+  x0, y0, z0 = construction.construction_location
+  size = variables.beam_length
+  width, depth, height = structure.size
+
+  def anywhere():
+    return (rand.uniform(0,width),rand.uniform(0,depth),rand.uniform(0,
+      min(width,height)))
+
+  def lattice():
+    return (x0 + rand.randint(-3,3) * size, y0 + rand.randint(-3,3) * size, 
+      z0 + rand.randint(0,6) * size)
+
+  segments = []
+  while len(segments) < number:
+    point = anywhere if len(segments) % 2 == 0 else lattice
+    p1, p2 = point(), point()
+    if p1 != p2:
+      segments.append((p1,p2))
+
+  return segments
+
+def path_check(number = 5000):
+  '''
+  Checks the box traversal of Structure (DDA) against the previous traversal
+  on random beams: every box reached by the old one must be reached, and the
+  boxes must be in order, each next to the previous one (or diagonal to it, at
+  an edge or corner) and never repeated.
+  Prints the time per beam of each.
+  '''
+  structure = Structure(False)
+  segments = random_segments(structure,number)
+  path = structure._Structure__path
+
+  start = time.time()
+  old = [crawl_path(structure,p1,p2) for p1, p2 in segments]
+  old_time = time.time() - start
+  start = time.time()
+  new = [path(p1,p2) for p1, p2 in segments]
+  new_time = time.time() - start
+
+  extra = 0
+  for (p1, p2), points, boxes in zip(segments,old,new):
+    old_boxes = set(box_indeces(structure,point) for point in points)
+    assert old_boxes <= set(boxes), (p1,p2)
+    assert len(set(boxes)) == len(boxes), (p1,p2)
+    assert boxes[0] == box_indeces(structure,p1), (p1,p2)
+    assert boxes[-1] == box_indeces(structure,p2), (p1,p2)
+    for b1, b2 in zip(boxes,boxes[1:]):
+      assert b1 != b2 and max(abs(i - j) for i, j in zip(b1,b2)) == 1, (p1,p2)
+    extra += len(boxes) - len(old_boxes)
+
+  print("Box traversal of {} random beams (all checked)".format(number))
+  print("{:>10} {:>10}".format("crawl (us)","DDA (us)"))
+  print("{:>10.1f} {:>10.1f}".format(old_time / number * 1e6,new_time / number
+    * 1e6))
+  print("Boxes reached by the DDA but not by the crawl: {}".format(extra))
+  print()
+
+def angles_time(sizes = (1000,4000), calls = 300):
+  '''
+  Time of Builder.local_angles (the candidate points for a new beam at a random
+  point of a random beam) against the number of beams in the tower
+  '''
+  print("Candidate angles from a random point of the tower")
+  print("{:>8} {:>12} {:>12} {:>12}".format("beams","nearby","points",
+    "time (us)"))
+  for size in sizes:
+    program, structure, builder = build_tower(size)
+    rand = random.Random(size)
+    beams = list(structure.beams.values())
+    cases = []
+    for k in range(calls):
+      beam = rand.choice(beams)
+      i, j = beam.endpoints
+      pivot = helpers.sum_vectors(i,helpers.scale(rand.random(),
+        helpers.make_vector(i,j)))
+      cases.append((beam,pivot))
+
+    nearby = sum(len(structure.get_beams(pivot,variables.beam_length)) for
+      beam, pivot in cases)
+    points = 0
+    start = time.time()
+    for beam, pivot in cases:
+      builder.beam, builder.location = beam, pivot
+      endpoint = helpers.sum_vectors(pivot,(0,0,variables.beam_length))
+      points += len(builder.local_angles(pivot,endpoint))
+    elapsed = time.time() - start
+
+    print("{:>8} {:>12.1f} {:>12.1f} {:>12.1f}".format(size,nearby / calls,
+      points / calls,elapsed / calls * 1e6))
+  print()
+
+def grid_time(sides = (30,60,120,240,480), num_beams = 2000, calls = 2000):
+  '''
+  Time per call of Structure.add_beam (building the tower), get_boxes and
+  available (for new beams from random points of the tower), against the side
+  of the boxes of the structure
+  '''
+  beams = tower_beams(num_beams)
+  rand = random.Random(1)
+  points = [helpers.sum_vectors(i,helpers.scale(rand.random(),
+    helpers.make_vector(i,j))) for i, j in (rand.choice(beams) for k in 
+    range(calls))]
+  segments = []
+  for point in points:
+    direction = helpers.make_unit(tuple(rand.uniform(-1,1) for k in range(3)))
+    endpoint = helpers.sum_vectors(point,helpers.scale(variables.beam_length,
+      direction))
+    segments.append((point,endpoint if endpoint[2] > 0 else 
+      helpers.sum_vectors(point,(0,0,variables.beam_length))))
+
+  print("Time per call (us) against the side of the boxes ({} beams, auto is "
+    "{})".format(num_beams,grid_resolution()))
+  print("{:>8} {:>8} {:>10} {:>10} {:>10}".format("side","boxes","add_beam",
+    "get_boxes","available"))
+  for label, side in [(side, side) for side in sides] + [("auto",
+    grid_resolution())]:
+    structure = Structure(False,side)
+    start = time.time()
+    for index, (p1, p2) in enumerate(beams):
+      structure.add_beam(p1,"i{}".format(index),p2,"j{}".format(index),
+        str(index))
+    add = (time.time() - start) / num_beams * 1e6
+
+    start = time.time()
+    for point in points:
+      structure.get_boxes(point)
+    boxes = (time.time() - start) / calls * 1e6
+
+    start = time.time()
+    for e1, e2 in segments:
+      structure.available(e1,e2)
+    available = (time.time() - start) / calls * 1e6
+
+    print("{:>8} {:>8} {:>10.1f} {:>10.1f} {:>10.1f}".format(label,
+      len(structure.model),add,boxes,available))
+  print()
+
+def joint_check(num_beams = 2000, removals = 500):
+  '''
+  Removes random beams from a tower and adds them back, and checks that the 
+  joints of every beam are the same as before and that they agree with the 
+  joint table of the structure. Prints the time per removal and per addition.
+  '''
+  program, structure, builder = build_tower(num_beams)
+  def joints():
+    return {name : {coord : sorted(other.name for other in others) for coord,
+      others in beam.joints.items()} for name, beam in structure.beams.items()}
+
+  def check():
+    for name, beam in structure.beams.items():
+      for coord, others in beam.joints.items():
+        joint = structure.find_joint(coord)
+        assert joint is not None and joint.coord == coord, (name,coord)
+        assert beam in joint.beams and all(other in joint.beams for other in
+          others), (name,coord)
+    for joint in structure.joints.joints.values():
+      assert len(joint.beams) > 1 and all(joint.coord in beam.joints for beam in
+        joint.beams), joint.coord
+
+  before = joints()
+  check()
+  rand = random.Random(1)
+  removed = [structure.beams[name] for name in rand.sample(sorted(
+    structure.beams),removals)]
+
+  start = time.time()
+  for beam in removed:
+    assert structure.remove_beam(beam.name)
+  remove_time = time.time() - start
+  check()
+
+  start = time.time()
+  for beam in removed:
+    (p1, p2), (p1_name, p2_name) = beam.endpoints, beam.endpoint_names
+    structure.add_beam(p1,p1_name,p2,p2_name,beam.name)
+  add_time = time.time() - start
+  check()
+  assert joints() == before
+
+  print("Removed and added back {} of {} beams (joints checked)".format(
+    removals,num_beams))
+  print("{:>10} {:>12} {:>12}".format("joints","remove (us)","add (us)"))
+  print("{:>10} {:>12.1f} {:>12.1f}".format(len(structure.joints),remove_time /
+    removals * 1e6,add_time / removals * 1e6))
+  print()
+
+def beam_memory(num_beams = 10000):
+  '''
+  Memory taken by the beams of a tower (with their endpoint names, deflections 
+  and written endpoints, but without joints), per beam and per 10k beams
+  '''
+  segments = tower_beams(num_beams)
+  names = {}
+  for p1, p2 in segments:
+    names.setdefault(p1,str(len(names)))
+    names.setdefault(p2,str(len(names)))
+
+  tracemalloc.start()
+  start = tracemalloc.get_traced_memory()[0]
+  store = BeamStore()
+  beams = [Beam(str(index),(p1,p2),(names[p1],names[p2]),variables.beam_load,
+    store=store) for index, (p1, p2) in enumerate(segments)]
+  displacements = np.tile((0.1,0.2,-0.3),(len(store.point_names),1))
+  store.update_deflections(np.arange(len(beams)),displacements,
+    variables.visualization["step"])
+  for beam in beams:
+    beam.previous_write_endpoints = beam.deflected_endpoints
+    beam.max_moment = 1.0
+  used = tracemalloc.get_traced_memory()[0] - start
+  tracemalloc.stop()
+
+  print("Memory of {} beams".format(num_beams))
+  print("{:>14} {:>14}".format("per beam (B)","per 10k (MB)"))
+  print("{:>14.0f} {:>14.2f}".format(used / num_beams,used / num_beams * 1e4 / 
+    2**20))
+  print()
+
+def decide_time(num_beams = 1000, sizes = (50,200,800)):
+  '''
+  Time the swarm takes to decide for one timestep, with the robots spread over
+  the beams of a tower
+  '''
+  program, structure, builder = build_tower(num_beams,"incremental",True)
+  model = program.sap_com_object.SapModel
+  beams = sorted(structure.beams.values(),key=lambda beam: int(beam.name))
+
+  print("Decision time of the swarm")
+  print("{:>8} {:>10} {:>14}".format("robots","total (ms)","per robot (ms)"))
+  for size in sizes:
+    # The robots spread evenly over the beams
+    swarm = SmartSwarm(size,structure,program,1)
+    for index, robot in enumerate(swarm.repairers.values()):
+      beam = beams[index * len(beams) // size]
+      model.SetModelIsLocked(False)
+      robot.change_location(helpers.midpoint(*beam.endpoints),beam)
+    assert helpers.run_analysis(model,variables.robot_load_case,
+      variables.wind_combo) == ''
+
+    # The results are retrieved before the robots decide (Structure.failed)
+    program.results.frame_forces()
+    start = time.time()
+    swarm.decide()
+    total = time.time() - start
+    print("{:>8} {:>10.1f} {:>14.3f}".format(size,total * 1000,total * 1000 /
+      size))
+  print()
+
+def checkpoint_time(sizes = (1000,4000), robots = 10):
+  '''
+  Time taken to save and to restore a checkpoint of a tower with a swarm on it
+  (as Simulation.checkpoint and Simulation.resume do), and its size
+  '''
+  print("Checkpoints of a tower with {} robots".format(robots))
+  print("{:>8} {:>12} {:>12} {:>12} {:>12}".format("beams","size (kB)",
+    "save (ms)","model (ms)","restore (ms)"))
+  for num_beams in sizes:
+    program, structure, builder = build_tower(num_beams,"incremental",True)
+    swarm = SmartSwarm(robots,structure,program,1)
+    model = program.sap_com_object.SapModel
+    filename = os.path.join(tempfile.mkdtemp(),"checkpoint.sdb")
+
+    start = time.time()
+    data = gzip.compress(pickle.dumps({"Structure" : structure, "Swarm" : swarm,
+      "loads" : program.loads.loads},pickle.HIGHEST_PROTOCOL),6)
+    save_time = time.time() - start
+
+    start = time.time()
+    assert model.File.Save(filename) == 0
+    model_time = time.time() - start
+
+    start = time.time()
+    state = pickle.loads(gzip.decompress(data))
+    state["Swarm"].attach(program)
+    restore_time = time.time() - start
+
+    # The beams are connected as they were
+    def joints(structure):
+      return dict((name, sorted((coord, sorted(other.name for other in others))
+        for coord, others in beam.joints.items())) for name, beam in
+        structure.beams.items())
+    assert joints(state["Structure"]) == joints(structure)
+    assert state["Swarm"].structure is state["Structure"]
+
+    os.remove(filename)
+    print("{:>8} {:>12.0f} {:>12.1f} {:>12.1f} {:>12.1f}".format(num_beams,
+      len(data) / 1024,save_time * 1000,model_time * 1000,restore_time * 1000))
+  print()
+
+def results_check(num_beams = 60, loads = 10):
+  '''
+  Records the responses of the local program to the bulk ("ALL") and to the
+  per-object FrameForce and JointDisplAbs calls for a loaded tower, and plays
+  them back through a fake SapModel (see sap_recorded.py). Checks that the
+  bulk tables and Structure.failed agree with the results of each object.
+  '''
+  program, structure, builder = build_tower(num_beams)
+  rand = random.Random(1)
+  names = sorted(structure.beams)
+  for index in range(loads):
+    name = rand.choice(names)
+    program.loads.add(name,variables.robot_load_case,index,rand.uniform(0,
+      variables.beam_length),variables.robot_load)
+  assert helpers.run_analysis(program.model,variables.robot_load_case,
+    variables.wind_combo) == ''
+
+  # Record the calls Structure.failed makes, and those for each object
+  recorder = SapRecorder(program.sap_com_object)
+  model = recorder.SapModel
+  assert model.Results.FrameForce("ALL",2)[0] == 0
+  assert model.Results.JointDisplAbs("ALL",2)[0] == 0
+  frames = dict((name, model.Results.FrameForce(name,0)) for name in names)
+  points = dict((name, model.Results.JointDisplAbs(name,0)) for name in
+    structure.store.point_names)
+  for name in names:
+    model.FrameObj.GetLocalAxes(name)
+
+  # Play them back
+  fake = Sap2000(RecordedSapObject(recorder.responses),cache_analysis=False)
+  fake.start(variables.program_units)
+  forces = fake.results.frame_forces()
+  displacements = fake.results.joint_displacements()
+  structure.structure_data.append([])
+  failed = structure.failed(fake)
+
+  # The largest moment along each frame, and the displacement of each point
+  moments = forces.max_moments()
+  for name, results in frames.items():
+    expected = max(math.sqrt(m2**2 + m3**2) for m2, m3 in zip(results[13],
+      results[14]))
+    assert math.isclose(moments[name],expected,rel_tol=1e-12), name
+    assert math.isclose(structure.beams[name].max_moment,expected,
+      rel_tol=1e-12), name
+    assert (expected > variables.structure_check) == ("Beam {} ".format(name)
+      in (failed or "")), name
+  for name, results in points.items():
+    rows = displacements.rows(name)
+    assert len(rows) == 1, name
+    expected = [value[0] for value in results[7:13]]
+    assert np.allclose(displacements.values[rows[0]],expected,rtol=1e-12,
+      atol=0), name
+  for name in names:
+    beam = structure.beams[name]
+    for point, deflection in zip(beam.endpoint_names,beam.deflection):
+      assert np.allclose(deflection,[value[0] for value in points[point][7:10]],
+        rtol=1e-12,atol=0), name
+
+  print("Bulk results of {} frames and {} joints played back and checked".
+    format(len(frames),len(points)))
+  print()
+
+# Benchmarks by name (in the order they are run by default)
+BENCHMARKS = [("solve", solve_time),
+              ("timestep", timestep_time),
+              ("lookup", lookup_time),
+              ("path", path_check),
+              ("angles", angles_time),
+              ("grid", grid_time),
+              ("joints", joint_check),
+              ("memory", beam_memory),
+              ("decide", decide_time),
+              ("checkpoint", checkpoint_time),
+              ("results", results_check)]
+
+if __name__ == "__main__":
+  names = sys.argv[1:] if len(sys.argv) > 1 else [name for name, function in
+    BENCHMARKS]
+  for name, function in BENCHMARKS:
+    if name in names:
+      function()
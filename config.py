@@ -0,0 +1,150 @@
+'''
+The settings of a simulation (variables.py and construction.py) as one frozen
+object, which is handed to the Simulation and from there to the structure, the
+swarm and the robots. Settings are attributes, e.g. config.beam_length, and the
+entries of construction.beam and variables.visualization are attributes of
+config.beam and config.visualization. Simulations with different settings can
+then run side by side in one process:
+
+  Simulation(config=Config(robot_load=0.05,beam={"support_angle" : 45}))
+
+A Config starts from the values the modules have when it is made. Settings
+that variables.py and construction.py derive from others (the limits, the
+locations of home and of the construction site...) are derived again from the
+overridden values, unless they are overridden themselves. The tangents of the
+angles of construction.beam are kept in config.ratios. The settings in FIXED
+are not taken from the config by the code that uses them, so they cannot be
+overridden.
+'''
+from collections import namedtuple
+import construction, math, types, variables
+
+# The settings kept as namedtuples, and the names of their types
+TUPLES = {"beam" : "BeamSettings", "visualization" : "VisualizationSettings",
+  "ratios" : "AngleRatios"}
+
+# Settings that are read from variables.py wherever they are used, and so cannot
+# be overridden (epsilon is the tolerance of the geometry in helpers and of the
+# tree of the beams)
+FIXED = frozenset(["epsilon"])
+
+def _settings(name, entries):
+  '''
+  Returns the entries (a dict) as the namedtuple of the setting
+  '''
+  return namedtuple(TUPLES[name],sorted(entries))(**entries)
+
+class Config(object):
+  def __init__(self, **overrides):
+    # The overrides this config was made with (see replace)
+    settings = dict(overrides)
+    object.__setattr__(self,"overrides",settings)
+
+    # Every setting of variables and construction
+    values = {}
+    for module in variables, construction:
+      for name in dir(module):
+        value = getattr(module,name)
+        if not name.startswith("_") and not isinstance(value,
+          types.ModuleType):
+          values[name] = value
+    unknown = [name for name in settings if name not in values]
+    if unknown != []:
+      raise AttributeError("Unknown settings {}".format(", ".join(sorted(
+        unknown))))
+    fixed = sorted(FIXED.intersection(settings))
+    if fixed != []:
+      raise AttributeError("The settings {} cannot be overridden".format(
+        ", ".join(fixed)))
+    values.update((name, value) for name, value in settings.items() if name
+      not in ("beam","visualization"))
+
+    # Settings derived from others, as in variables.py and construction.py
+    def derive(name, function):
+      if name not in settings:
+        values[name] = function(values)
+    d, t = "outside_diameter", "wall_thickness"
+    derive("density",lambda v: v["steel_density"] / (12**3))
+    derive("cross_sect_area",lambda v: math.pi * ((v[d] / 2)**2 - (v[d] / 2 -
+      v[t])**2))
+    derive("moment_of_intertia",lambda v: math.pi * ((v[d] / 2)**4 - (v[d] / 2
+      - v[t])**4) / 4)
+    derive("beam_load",lambda v: v["cross_sect_area"] * v["beam_length"] *
+      v["density"] / 1000)
+    derive("joint_limit",lambda v: v["beam_length"] * v["beam_load"] / 2)
+    derive("structure_check",lambda v: v["steel_yield"] *
+      v["moment_of_intertia"] / (v[d] / 2))
+    derive("beam_limit",lambda v: v["joint_limit"] + (v["beam_load"] +
+      v["robot_load"]) * v["beam_length"])
+    derive("random",lambda v: v["beam_length"] / 25)
+    derive("home",lambda v: (v["dim_x"] / 2.2, v["dim_y"] / 2.2, 0))
+    derive("home_size",lambda v: (40, 40, v["epsilon"]))
+    derive("construction_location",lambda v: (v["dim_x"] / 2, v["dim_y"] / 2,
+      0))
+    derive("construction_size",lambda v: (40, 40, v["epsilon"]))
+    def center(location, size):
+      return tuple(coord + side / 2 for coord, side in zip(location,size))
+    derive("home_center",lambda v: center(v["home"],v["home_size"]))
+    derive("construction_location_center",lambda v: center(
+      v["construction_location"],v["construction_size"]))
+
+    # The entries of construction.beam (those taken from variables are taken
+    # from the config instead)
+    beam = dict(construction.beam)
+    beam.update({"length" : values["beam_length"], "joint_limit" :
+      values["joint_limit"], "structure_check" : values["structure_check"]})
+    beam.update(settings.get("beam",{}))
+    values["beam"] = _settings("beam",beam)
+
+    visualization = dict(variables.visualization)
+    visualization.update(settings.get("visualization",{}))
+    values["visualization"] = _settings("visualization",visualization)
+
+    # Tangents of the angles (in degrees) of construction.beam
+    angles = sorted(name for name in beam if "angle" in name)
+    values["ratios"] = _settings("ratios",dict((name, math.tan(math.radians(
+      beam[name]))) for name in angles))
+
+    for name, value in values.items():
+      object.__setattr__(self,name,value)
+
+  def __setattr__(self, name, value):
+    raise AttributeError("A Config cannot be changed (see replace)")
+
+  def __delattr__(self, name):
+    raise AttributeError("A Config cannot be changed (see replace)")
+
+  def __reduce__(self):
+    # The values are pickled as they are, so the config does not change when
+    # the modules do (the namedtuples of the config are made on the fly, and
+    # cannot be pickled themselves, so they are pickled as dicts)
+    return (_unpickle, (self.as_dict(),))
+
+  def as_dict(self):
+    '''
+    Returns the values of the config, with the namedtuples as dicts
+    '''
+    values = dict(self.__dict__)
+    for name in TUPLES:
+      values[name] = dict(values[name]._asdict())
+    return values
+
+  def replace(self, **overrides):
+    '''
+    Returns a new config with the overrides of this one and the new ones
+    '''
+    settings = dict(self.overrides)
+    for name in "beam", "visualization":
+      if name in settings and name in overrides:
+        overrides[name] = dict(settings[name], **overrides[name])
+    settings.update(overrides)
+
+    return Config(**settings)
+
+def _unpickle(values):
+  config = Config.__new__(Config)
+  for name, value in values.items():
+    if name in TUPLES:
+      value = _settings(name,value)
+    object.__setattr__(config,name,value)
+  return config
@@ -1,13 +1,13 @@
 from helpers.inout import io
 import getopt, sys
 
-def run(input = "", output = ""):
+def run(input = "", output = "", config = None):
 
   # use default output file if none or empty given
   if output != "":
-    return io(input, output)
+    return io(input, output, config)
   else:
-    return io(input)
+    return io(input, config=config)
 
 # When running it from a commandline, do this.
 if __name__ == "__main__":
@@ -0,0 +1,256 @@
+'''
+NumPy versions of the geometry helpers (vectors.py and helpers.py) that work on
+many points at once. Points and vectors are arrays whose last axis holds the
+coordinates, e.g. (N,3), and a single point broadcasts against them. Scalar
+results (lengths, comparisons) have the shape of the remaining axes, e.g. (N,).
+The tolerances are the same as in the scalar helpers.
+'''
+import numpy as np, variables
+
+def points(p):
+  '''
+  Returns p as an array of floats
+  '''
+  return np.asarray(p, dtype=float)
+
+def compare(x,y,e=variables.epsilon):
+  '''
+  Compares arrays of floats by taking into account "epsilon"
+  '''
+  return np.abs(np.subtract(x,y)) < e
+
+def dot(v1,v2):
+  '''
+  Dots the vectors of v1 and v2
+  '''
+  v1, v2 = points(v1), points(v2)
+  return v1[...,0] * v2[...,0] + v1[...,1] * v2[...,1] + v1[...,2] * v2[...,2]
+
+def cross(v1,v2):
+  '''
+  Calculates the cross products of the vectors of v1 and v2
+  '''
+  v1, v2 = points(v1), points(v2)
+  x1, y1, z1 = v1[...,0], v1[...,1], v1[...,2]
+  x2, y2, z2 = v2[...,0], v2[...,1], v2[...,2]
+
+  return np.stack((y1 * z2 - y2 * z1, z1 * x2 - z2 * x1, x1 * y2 - x2 * y1),
+    axis=-1)
+
+def length(v):
+  return np.sqrt(dot(v,v))
+
+def distance(p1,p2):
+  '''
+  Returns the distances between the points of p1 and p2
+  '''
+  return length(make_vector(p1,p2))
+
+def make_vector(p1,p2):
+  '''
+  Returns the vectors between the points. P2 is the head, p1 the origin
+  '''
+  return np.subtract(points(p2),points(p1))
+
+def make_unit(v):
+  '''
+  Returns unit vectors in the same directions as v (which must be non-zero)
+  '''
+  v = points(v)
+  return v / length(v)[...,np.newaxis]
+
+def scale(k,v):
+  '''
+  Scales the vectors of v by the factors k
+  '''
+  return points(k)[...,np.newaxis] * points(v)
+
+def parallel(v1,v2):
+  '''
+  Returns whether or not the vectors of v1 and v2 are parallel
+  '''
+  return compare(length(cross(v1,v2)),0,0.01)
+
+def collinear(p1,p2,p3):
+  '''
+  Returns whether or not each set of three points is collinear
+  '''
+  normal = cross(make_vector(p1,p2),make_vector(p1,p3))
+  return compare(length(normal),0,variables.epsilon*2)
+
+def between(c1,c2,c3,inclusive=True):
+  '''
+  Returns whether or not the values of c3 are between those of c1 and c2
+  '''
+  low, high = np.minimum(c1,c2), np.maximum(c1,c2)
+  if inclusive:
+    return (compare(low,c3) | (low < c3)) & (compare(c3,high) | (c3 < high))
+  else:
+    return ((low < c3) & ~compare(low,c3)) & ((c3 < high) & ~compare(c3,high))
+
+def between_points(p1,p2,p3,inclusive=True):
+  '''
+  Returns whether the points of p3 are between those of p1 and p2. If not
+  inclusive, at least one coordinate must be strictly between.
+  '''
+  p1, p2, p3 = points(p1), points(p2), points(p3)
+  inside = between(p1,p2,p3).all(axis=-1)
+  if not inclusive:
+    return inside & between(p1,p2,p3,False).any(axis=-1)
+  return inside
+
+def on_line(l1,l2,point,segment=True):
+  '''
+  Returns whether the points lie close to the lines l1 -> l2. The error allowed
+  is epsilon
+  '''
+  l1, l2, point = points(l1), points(l2), points(point)
+  endpoint = compare(distance(l1,point),0)
+  close = compare(length(cross(make_vector(l1,l2),make_vector(l1,point))),0,
+    variables.epsilon * 2)
+  if segment:
+    close = close & between(l1,l2,point).all(axis=-1)
+  return endpoint | close
+
+def correct(l1,l2,point):
+  '''
+  Returns the points projected onto the lines spanned by l1, l2
+  '''
+  l1 = points(l1)
+  unit = make_unit(make_vector(l1,l2))
+  return l1 + scale(dot(unit,make_vector(l1,point)),unit)
+
+def compare_tuple(v1,v2,e=variables.epsilon):
+  '''
+  Compares the points of v1 and v2 coordinate by coordinate
+  '''
+  return compare(v1,v2,e).all(axis=-1)
+
+def intersection(l1,l2,segment=True):
+  '''
+  Batched version of helpers.intersection. l1 and l2 are arrays of line
+  segments (...,2,3) which broadcast against each other, e.g. (N,2,3) and a
+  single (2,3). Returns the points where the segments intersect (...,3), with
+  nan where they do not.
+  '''
+  l1, l2 = points(l1), points(l2)
+  p1, ep1 = l1[...,0,:], l1[...,1,:]
+  p2, ep2 = l2[...,0,:], l2[...,1,:]
+
+  # The lines are coplanar if the normals are parallel, and they cross if they
+  # are not parallel themselves
+  v1, v2 = make_vector(p1,ep1), make_vector(p2,ep2)
+  norm1 = cross(v1,v2)
+  norm2 = cross(make_vector(p1,p2),v2)
+  length1 = length(norm1)
+  coplanar = parallel(norm1,norm2) & (length1 != 0)
+
+  # Distance along line1 travelled (signed), and the point of intersection.
+  # Lines that are not coplanar give inf or nan here.
+  with np.errstate(divide="ignore",invalid="ignore"):
+    a = length(norm2) / length1
+    a = np.where(dot(norm1,norm2) > 0,a,-a)
+    point = p1 + scale(a,v1)
+
+    # The point must be in both line segments
+    crossing = coplanar
+    if segment:
+      crossing = crossing & between_points(p1,ep1,point) & between_points(p2,
+        ep2,point)
+
+  # Lines that do not cross can still share an endpoint
+  def same(q1,q2):
+    return (q1 == q2).all(axis=-1)
+  other = ~coplanar
+  first = other & ((same(p1,p2) & ~same(ep1,ep2)) | (same(p1,ep2) & 
+    ~same(ep1,p2)))
+  second = other & ~first & ((same(ep1,ep2) & ~same(p1,p2)) | (same(ep1,p2) &
+    ~same(p1,ep2)))
+
+  result = np.where(crossing[...,np.newaxis],point,np.nan)
+  result = np.where(first[...,np.newaxis],p1,result)
+  return np.where(second[...,np.newaxis],ep1,result)
+
+def smallest_angle(v1,v2):
+  '''
+  Returns the smallest angles (in degrees) between the vectors of v1 and v2,
+  which must be non-zero
+  '''
+  result = dot(v1,v2) / (length(v1) * length(v2))
+  result = np.where(compare(result,1),1,np.where(compare(result,-1),-1,result))
+
+  return np.degrees(np.arccos(result))
+
+def sphere_intersection(lines,center,radius,segment=True):
+  '''
+  Batched version of helpers.sphere_intersection. Returns the two points (each
+  (...,3)) where the lines (...,2,3) cross the sphere, with nan where they do
+  not (a line touching the sphere only has the first point).
+  '''
+  lines = points(lines)
+  origin = lines[...,0,:]
+  unit = make_unit(make_vector(origin,lines[...,1,:]))
+  dif = make_vector(center,origin)
+  discriminant = dot(unit,dif)**2 - dot(dif,dif) + radius**2
+  neg_b = -dot(unit,dif)
+  root = np.sqrt(np.maximum(discriminant,0))
+
+  first = origin + scale(neg_b + root,unit)
+  second = origin + scale(neg_b - root,unit)
+  found_first, found_second = discriminant >= 0, discriminant > 0
+  if segment:
+    found_first = found_first & on_line(origin,lines[...,1,:],first)
+    found_second = found_second & on_line(origin,lines[...,1,:],second)
+
+  return (np.where(found_first[...,np.newaxis],first,np.nan),
+    np.where(found_second[...,np.newaxis],second,np.nan))
+
+def closest_points(l1,l2,segment=True):
+  '''
+  Batched version of helpers.closest_points, computed in closed form. Returns
+  two arrays (...,3) with nan where there are no points. Where the segments
+  pass each other (and l1 lies on the side of l2 that the normal l1 x l2 points
+  to, as in the scalar version), these are the closest point on l1 and the
+  closest point on l2. Otherwise, they are the projection onto l2 of the
+  nearest endpoint of l1 that has one, and that endpoint.
+  '''
+  l1, l2 = points(l1), points(l2)
+  i1, j1, i2 = l1[...,0,:], l1[...,1,:], l2[...,0,:]
+  u, w = j1 - i1, l2[...,1,:] - i2
+  r = i1 - i2
+  e = variables.epsilon
+
+  # Parameters of the closest points along l1 (s) and l2 (t)
+  normal = cross(u,w)
+  squared = dot(normal,normal)
+  crossing = ~compare(np.sqrt(squared),0)
+  lu, lw = np.sqrt(dot(u,u)), np.sqrt(dot(w,w))
+  b, c, d, f = dot(u,w), lw**2, dot(u,r), dot(w,r)
+  with np.errstate(divide="ignore",invalid="ignore"):
+    s = (b * f - c * d) / squared
+    t = (lu**2 * f - b * d) / squared
+
+    # Like the scalar version, only look on the side the normal points to,
+    # unless l1 ends where l2 ends (the scalar version finds those too)
+    facing = dot(r,normal) > -e * np.sqrt(squared)
+    tips = (compare(s * lu,0) | compare(s * lu,lu)) & compare(t * lw,lw)
+    found = crossing & (facing | tips) & (s >= -e / lu) & (s <= 1 + e / lu)
+    if segment:
+      found = found & (t >= -e / lw) & (t <= 1 + e / lw)
+
+    # Otherwise, the endpoints of l1 projected onto l2
+    t_i, t_j = f / c, (f + b) / c
+    projection_i, projection_j = i2 + scale(t_i,w), i2 + scale(t_j,w)
+    distance_i, distance_j = distance(projection_i,i1), distance(projection_j,j1)
+    valid_i = (t_i >= -e / lw) & (t_i <= 1 + e / lw) & (distance_i != 0)
+    valid_j = (t_j >= -e / lw) & (t_j <= 1 + e / lw) & (distance_j != 0)
+    use_j = (valid_j & (~valid_i | (distance_j < distance_i)))[...,np.newaxis]
+    ends = (crossing & ~found & (valid_i | valid_j))[...,np.newaxis]
+
+    found = found[...,np.newaxis]
+    first = np.where(found,i1 + scale(s,u),np.where(ends,np.where(use_j,
+      projection_j,projection_i),np.nan))
+    second = np.where(found,i2 + scale(t,w),np.where(ends,np.where(use_j,j1,i1),
+      np.nan))
+
+  return first, second
@@ -1,6 +1,6 @@
 from sap2000.constants import LOAD_PATTERN_TYPES
 from helpers.vectors import *
-import construction, errno, math, os, pdb, variables
+import errno, math, os, pdb, variables
 
 def ratio(deg):
   '''
@@ -107,15 +107,17 @@ def vector_to_line(l1,l2,p):
   # If we get here, the point closes to p is the point of intersection
   return sub_vectors(intersection,p)
 
-def check_location(p):
+def check_location(p,size = None):
   '''
   Returns whether or not all elements in p are positive and are inside the 
-  restricted coordinates
+  restricted coordinates (the size of the structure, from variables.py by
+  default)
   '''
   x,y,z = p
+  dim_x, dim_y, dim_z = ((variables.dim_x,variables.dim_y,variables.dim_z) if
+    size is None else size)
   return ((x > 0 or compare(x,0)) and (y > 0 or compare(y,0) and (z >= 0 or 
-    compare(z,0)) and x < variables.dim_x and y < variables.dim_y and (z < 
-    variables.dim_z)))
+    compare(z,0)) and x < dim_x and y < dim_y and (z < dim_z)))
 
 def on_line(l1,l2,point,segment = True):
   '''
@@ -126,10 +128,9 @@ def on_line(l1,l2,point,segment = True):
   lx1,ly1,lz1 = l1
   lx2, ly2, lz2 = l2
   x, y, z = point
-  dist1, dist2 = distance(l1,l2), distance(l1,point)
   
   # Taking care of the point being an endpoint
-  if compare(dist2,0):
+  if compare(distance(l1,point),0):
     return True
 
   # creating two vectors
@@ -143,28 +144,25 @@ def between_points(p1,p2,p3, inclusive = True):
   '''
   Returns whether the point p3 is between the points p1 and p2. inclusive.
   '''
-  return_value = True
   different = False
   for i in range(3):
+    if not between(p1[i],p2[i],p3[i]):
+      return False
     different = different or between(p1[i],p2[i],p3[i],False)
-    return_value = return_value and between(p1[i],p2[i],p3[i])
-
-  if not inclusive:
-    return return_value and different
 
-  else:
-    return return_value 
+  return different or inclusive
 
 def between(c1,c2,c3, inclusive = True):
   '''
   Returns whether or not c3 is between c1 and c2, inclusive.
   '''
-  loc_compare = (lambda x,y: compare(x,y) or x < y) if inclusive else (
-    lambda x,y : x < y and not compare(x,y))
-  if c1 < c2:
-    return loc_compare(c1,c3) and loc_compare(c3,c2)
+  low, high = (c1, c2) if c1 < c2 else (c2, c1)
+  e = variables.epsilon
+  if inclusive:
+    return (abs(low - c3) < e or low < c3) and (abs(c3 - high) < e or c3 < high)
   else:
-    return loc_compare(c2,c3) and loc_compare(c3,c1)
+    return (low < c3 and not abs(low - c3) < e) and (c3 < high and not 
+      abs(c3 - high) < e)
 
 def within(origin,size,point):
   '''
@@ -181,20 +179,24 @@ def collinear(p1,p2,p3):
   '''
   Returns whether or not the three points are collinear.
   '''
-  v1 = make_vector(p1,p2)
-  v2 = make_vector(p1,p3)
-  normal = cross(v1,v2)
-  return compare(length(normal),0,variables.epsilon*2)
+  x1, y1, z1 = p1
+  vx1, vy1, vz1 = p2[0] - x1, p2[1] - y1, p2[2] - z1
+  vx2, vy2, vz2 = p3[0] - x1, p3[1] - y1, p3[2] - z1
+
+  # Length of the normal (v1 x v2)
+  normal = math.sqrt((vy1 * vz2 - vy2 * vz1)**2 + (vz1 * vx2 - vz2 * vx1)**2 + 
+    (vx1 * vy2 - vx2 * vy1)**2)
+  return normal < variables.epsilon*2
 
-def is_vertical(v):
+def is_vertical(v,verticality_angle):
   '''
-  Returns whether we consider the vector v to be vertical. This error angle is
-  defined in variables.py
+  Returns whether we consider the vector v to be vertical, within the error
+  angle (verticality_angle of construction.beam, in degrees)
   '''
   angle = smallest_angle(v,(0,0,1))
   angle = angle if angle <= 90 else 180 - angle
 
-  return angle <= construction.beam['verticality_angle']
+  return angle <= verticality_angle
 
 def correct(l1,l2,point):
   '''
@@ -220,7 +222,10 @@ def compare_tuple(v1,v2,e=variables.epsilon):
   '''
   Comapres two floats using our compare function
   '''
-  return all([compare(x,y,e) for x,y in zip(v1,v2)])
+  for x, y in zip(v1,v2):
+    if not abs(x - y) < e:
+      return False
+  return True
 
 '''
 Helper functions pertaining to the SAP program
@@ -339,7 +344,7 @@ def distance_between_lines(l1,l2):
   #return length of projection onto normal
   return abs(dot(diagonal,normal))
 
-def beam_endpoint(pivot,point,beam_length = construction.beam['length']):
+def beam_endpoint(pivot,point,beam_length):
   '''
   Returns the endpoint of a beam which begins at pivot and contains the point
   'point'.
@@ -497,12 +502,13 @@ def sphere_intersection(line, center, radius, segment = True):
         else:
           return None
 
-def run_analysis(model,output=variables.robot_load_case):
+def run_analysis(model,output,wind_combo):
   '''
-  Runs the analysis, selecting the right cases for output. Returns a string of
+  Runs the analysis, selecting the right cases for output (the load case, or
+  the combination if it is the wind combination). Returns a string of
   explanations for any errors that occurred during the analysis process.
   '''
-  combo = variables.wind_combo == output
+  combo = wind_combo == output
   
   errors = ''
   try:
@@ -1,20 +1,30 @@
 from sap2000 import sap2000
 from sap2000.constants import UNITS
+from sap2000.sap_local import LocalSap2000
 from helpers.helpers import path_exists
 import os, variables
 
 # temp
 # from sap2000.constants import FRAME_TYPES
 
-def io(inputfile = "", outputfile = "C:\SAP 2000\output.sdb"):
+def io(inputfile = "", outputfile = "C:\SAP 2000\output.sdb", config = None):
   """
   Opens the specified inputfile and outputfile. By default, it creates a new 
   model if no inputfile is specified and saves it as the specified outputfile. 
   If no outputfile is specified, the default location is 
-  "C:\SAP 2000\output.sdb". Returns the program and model.
+  "C:\SAP 2000\output.sdb". The settings are taken from the config (see
+  config.py), or from variables.py if there is none. Returns the program and
+  model.
   """
-  # start program
-  program = sap2000.Sap2000()
+  config = variables if config is None else config
+
+  # start program (SAP2000 itself or the local stand in)
+  if config.analysis_program == "Local":
+    program = LocalSap2000(config.local_solver, config.cache_analysis,
+      config.defer_loads)
+  else:
+    program = sap2000.Sap2000(cache_analysis=config.cache_analysis,
+      defer_loads=config.defer_loads)
 
   # This opens the model if it is passedin
   program.start(filename=inputfile)
@@ -35,6 +45,6 @@ def io(inputfile = "", outputfile = "C:\SAP 2000\output.sdb"):
   program.save(outputfile)
 
   # reset the correct units
-  model.SetPresentUnits(UNITS[variables.program_units])
+  model.SetPresentUnits(UNITS[config.program_units])
 
   return program, model
\ No newline at end of file
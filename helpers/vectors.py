@@ -1,6 +1,8 @@
 '''
 Helper functions for vector operations when keeping track of the structure in 
-Python
+Python. Three dimensional vectors (the usual case) take a fast path without
+loops or intermediate lists. See geometry.py for versions that work on many
+vectors at once.
 '''
 import math, variables
 
@@ -39,30 +41,30 @@ def dot(v1,v2):
   '''
   Dots two vectors
   '''
-  loc1, dot = 0, 0
-  for coord1 in v1:
-    loc1 += 1
-    loc2 = 0
-    for coord2 in v2:
-      loc2 += 1
-      if loc1 == loc2:
-        dot += coord1 * coord2
-
   # checking the lenght of the tuples
-  assert (loc1 == loc2)
+  assert len(v1) == len(v2)
+
+  if len(v1) == 3:
+    return v1[0] * v2[0] + v1[1] * v2[1] + v1[2] * v2[2]
 
-  return dot
+  return sum(x * y for x, y in zip(v1,v2))
 
 def sum_vectors(v1,v2):
   '''
   Sums two vectors
   '''
+  if len(v1) == 3 and len(v2) == 3:
+    return (v1[0] + v2[0], v1[1] + v2[1], v1[2] + v2[2])
+
   return tuple([x + y for x, y in zip(v1,v2)])
 
 def scale(k,v):
   '''
   Scales the vector v by k
   '''
+  if len(v) == 3:
+    return (k * v[0], k * v[1], k * v[2])
+
   return tuple(k * x for x in v)
 
 def make_vector(p1,p2):
@@ -77,16 +79,23 @@ def make_unit(v):
   '''
   dist = length(v)
   assert not compare(dist,0)
+  if len(v) == 3:
+    return (v[0] / dist, v[1] / dist, v[2] / dist)
+
   return tuple(x / dist for x in v)
 
 def sub_vectors(v1,v2):
   '''
   Subtracts the second vector from the first
   '''
+  if len(v1) == 3 and len(v2) == 3:
+    return (v1[0] - v2[0], v1[1] - v2[1], v1[2] - v2[2])
+
   return tuple([x - y for x, y in zip(v1,v2)])
 
 def length(v):
-  return distance(v,(0,0,0))
+  x,y,z = v
+  return math.sqrt(x**2 + y**2 + z**2)
 
 def cross(v1,v2):
   '''
@@ -4,12 +4,16 @@ from structure.structure import Structure
 from sap2000.constants import MATERIAL_TYPES, UNITS,STEEL_SUBTYPES, PLACEHOLDER
 from time import strftime
 # from visual import *
-from visualization import Visualization
 from xlsxwriter.workbook import Workbook
-import construction, os, pdb,random,sys, variables
+from config import Config
+import construction, gzip, os, pdb, pickle, random, sys, variables
 
 class Simulation:
-  def __init__(self,seed = None,template="C:\\SAP 2000\\template.sdb"):
+  def __init__(self,seed = None,template="C:\\SAP 2000\\template.sdb",
+    config = None):
+    # The settings of the simulation (see config.py)
+    self.config = Config() if config is None else config
+
     self.SapProgram = None
     self.SapModel = None
     self.Structure = None
@@ -18,6 +22,16 @@ class Simulation:
     self.folder = None
     self.run = False
 
+    # Number of timesteps run (started), and the one in which the structure
+    # failed (None if it did not)
+    self.timesteps = 0
+    self.failed_step = None
+
+    # The file the model is being saved to, and the timestep run_simulation
+    # starts from (other than 0 once resumed from a checkpoint)
+    self.model_file = None
+    self.resumed_step = 0
+
     # Keeps track of the excel data since we can only write it in one go
     self.excel = {}
     self.excel['headers'] = []
@@ -35,7 +49,7 @@ class Simulation:
     Function to setup the general settigns for the SAP2000 program
     '''
     # switch to default units HERE
-    ret = self.SapModel.SetPresentUnits(UNITS[variables.program_units])
+    ret = self.SapModel.SetPresentUnits(UNITS[self.config.program_units])
     if ret:
       return False
 
@@ -45,10 +59,11 @@ class Simulation:
 
     return True
 
-  def __setup_wind(self,name=variables.wind_case):
+  def __setup_wind(self,name=None):
     '''
     We initalize the wind based on the information in variables.python
     '''
+    name = self.config.wind_case if name is None else name
     # Add loadpattern and case
     if not helpers.addloadpattern(self.SapModel,name,'LTYPE_WIND'):
       return False
@@ -94,8 +109,8 @@ class Simulation:
       return False
 
     # Set the cases to be analyzed (all cases)
-    ret = self.SapModel.Analyze.SetRunCaseFlag(variables.robot_load_case,True,
-      False)
+    ret = self.SapModel.Analyze.SetRunCaseFlag(self.config.robot_load_case,
+      True,False)
     if ret:
       print("Failure with run flag.")
       return False
@@ -113,7 +128,7 @@ class Simulation:
 
     # Set Solver Options (Multithreaded, Auto, 64bit, robot_load_case)
     ret = self.SapModel.Analyze.SetSolverOption_1(2,0,False,
-      variables.robot_load_case)
+      self.config.robot_load_case)
     if ret:
       print("Failure with solver options")
       return False
@@ -125,17 +140,17 @@ class Simulation:
     Sets up our beam materials
     '''
     # Defining our Scaffold Tube Material Property
-    ret, name = self.SapModel.PropMaterial.AddQuick(variables.material_property,
-      MATERIAL_TYPES[variables.material_type],
-      STEEL_SUBTYPES[variables.material_subtype],PLACEHOLDER,PLACEHOLDER,
-      PLACEHOLDER,PLACEHOLDER,PLACEHOLDER,variables.material_property)
-    if ret or name != variables.material_property:
+    ret, name = self.SapModel.PropMaterial.AddQuick(
+      self.config.material_property,MATERIAL_TYPES[self.config.material_type],
+      STEEL_SUBTYPES[self.config.material_subtype],PLACEHOLDER,PLACEHOLDER,
+      PLACEHOLDER,PLACEHOLDER,PLACEHOLDER,self.config.material_property)
+    if ret or name != self.config.material_property:
       return False
 
     # Defining the Frame Section. This is the Scaffold Tube
-    ret = self.SapModel.PropFrame.SetPipe(variables.frame_property_name,
-      variables.material_property,variables.outside_diameter,
-      variables.wall_thickness)
+    ret = self.SapModel.PropFrame.SetPipe(self.config.frame_property_name,
+      self.config.material_property,self.config.outside_diameter,
+      self.config.wall_thickness)
     if ret:
       return False
 
@@ -147,11 +162,13 @@ class Simulation:
     '''
     # Pull the names of all the variables and use that to get their attributes 
     # and store them in a list of names, values
-    variables_text = 'variables', ([(constant, getattr(variables, constant)) for
-     constant in dir(variables) if '__' not in constant and '.' not in constant])
-    construction_text = 'construction', ([(constant, getattr(construction,
-      constant)) for constant in dir(construction) if '__' not in constant 
-      and '.' not in constant])
+    # (the values are those of the config of the simulation)
+    variables_text = 'variables', ([(constant, getattr(self.config, constant,
+      getattr(variables, constant))) for constant in dir(variables) if '__' not
+      in constant and '.' not in constant])
+    construction_text = 'construction', ([(constant, getattr(self.config,
+      constant, getattr(construction, constant))) for constant in dir(
+      construction) if '__' not in constant and '.' not in constant])
     
     # Cycle through both modules and store information the data
     data = ''
@@ -237,8 +254,8 @@ class Simulation:
       self.SapProgram.reset(template=self.template)
 
       # Creating new SAP Files
-      outputfolder = ('C:\SAP 2000\\' +strftime("%b-%d") + "\\" + 
-        strftime("%H_%M_%S") + comment + "\\")
+      outputfolder = os.path.join(self.config.output_folder,strftime("%b-%d"),
+        strftime("%H_%M_%S") + comment,"")
       outputfilename = "tower.sdb"
       outputfile = outputfolder + outputfilename
 
@@ -255,6 +272,7 @@ class Simulation:
       self.Swarm.reset()
 
       self.folder = outputfolder
+      self.model_file = outputfile
       self.run = False
 
     else:
@@ -273,17 +291,19 @@ class Simulation:
     if self.started:
       print("Simulation has already been started")
     else:
-      outputfolder = ('C:\SAP 2000\\' +strftime("%b-%d") + "\\" + 
-        strftime("%H_%M_%S") + comment + "\\")
+      outputfolder = os.path.join(self.config.output_folder,strftime("%b-%d"),
+        strftime("%H_%M_%S") + comment,"")
       outputfilename = "tower.sdb"
       self.SapProgram, self.SapModel = commandline.run(model,
-        outputfolder + outputfilename)
+        outputfolder + outputfilename, self.config)
       self.SapProgram.hide()
       self.started = True
+      self.model_file = outputfolder + outputfilename
 
     # Make python structure and start up the colony
-    self.Structure = Structure(visualization)
-    self.Swarm = SmartSwarm(robots, self.Structure, self.SapProgram)
+    self.Structure = Structure(visualization,config=self.config)
+    self.Swarm = SmartSwarm(robots, self.Structure, self.SapProgram,
+      seed=self.seed)
 
     # If we started with a previous model, we have to add all of the beams 
     # to our own model in python
@@ -327,6 +347,8 @@ class Simulation:
     been run.
     '''
     if self.run:
+      # Imported here so that simulations can run without VPython
+      from visualization import Visualization
       window = Visualization(self.folder)
       window.load_data()
       window.run(fullscreen,inverse_speed)
@@ -336,9 +358,11 @@ class Simulation:
   def run_simulation(self,visualization = False, timesteps = 10, debug = True,
     comment = ""):
     '''
-    Runs the simulation according to the variables passed in.
+    Runs the simulation according to the variables passed in. A simulation
+    resumed from a checkpoint carries on from the timestep of the checkpoint.
     '''
     outputfolder = self.folder
+    first, self.resumed_step = self.resumed_step, 0
 
     start_time = strftime("%H:%M:%S")
     # Make sure the simulation has been started. If not, exit.
@@ -362,23 +386,37 @@ class Simulation:
 
     # Open files for writing if debugging
     with open(outputfolder + 'repair_info.txt', 'a') as repair_file, open(outputfolder + "robot_data.txt", 'a') as loc_text, open(outputfolder + "sap_failures.txt", 'a') as sap_failures, open(outputfolder + "run_data.txt", 'a') as run_text, open(outputfolder + "structure.txt", "a") as struct_data:
-      loc_text.write("This file contains information on the robots at each" +
-        " timestep if debugging.\n\n")
-      sap_failures.write("This file contains messages created when SAP 2000 does"
-       + " not complete a function successfully if debugging.\n\n")
-      struct_data.write("This file contains the data about the Pythonic" +
-        " structure.\n\nCurrently unused do to space issues.")
-      run_text.write("This file contains the variables used in the run of the" +
-        " simulation.\n\nTotal timesteps: " + str(timesteps) + "\nStart time of"
-        + " simumation: " + start_time + "\nSeed:" + str(self.seed) + "\n\n")
-
-      run_text.write("Folder: {}\n\n".format(str(self.folder)))
-
-      # Write variables
-      self.__push_information(run_text)
+      files = repair_file, loc_text, sap_failures, run_text, struct_data
+
+      # The files already have their headers if the simulation was resumed
+      if first != 0:
+        run_text.write("\n\nResumed from the checkpoint of timestep {} at {}."
+          "\n\n".format(first,start_time))
+      else:
+        loc_text.write("This file contains information on the robots at each" +
+          " timestep if debugging.\n\n")
+        sap_failures.write("This file contains messages created when SAP 2000 "
+          + "does not complete a function successfully if debugging.\n\n")
+        struct_data.write("This file contains the data about the Pythonic" +
+          " structure.\n\nCurrently unused do to space issues.")
+        run_text.write("This file contains the variables used in the run of " +
+          "the simulation.\n\nTotal timesteps: " + str(timesteps) + "\nStart " +
+          "time of simumation: " + start_time + "\nSeed:" + str(self.seed) +
+          "\n\n")
+
+        run_text.write("Folder: {}\n\n".format(str(self.folder)))
+
+        # Write variables
+        self.__push_information(run_text)
 
       # Run the simulation!
-      for i in range(timesteps):
+      for i in range(first,timesteps):
+        # Save everything needed to resume from here every now and again
+        checkpoints = self.config.checkpoint_timesteps
+        if checkpoints and i % checkpoints == 0 and i != 0 and i != first:
+          self.checkpoint(i,files)
+
+        self.timesteps = i + 1
 
         if visualization:
           self.Swarm.show()
@@ -395,9 +433,10 @@ class Simulation:
 
         # Save to a different filename every now and again
         try:
-          if i % variables.analysis_timesteps == 0 and i != 0:
+          if i % self.config.analysis_timesteps == 0 and i != 0:
             filename = "tower-" + str(i) + ".sdb"
             self.SapModel.File.Save(outputfolder + filename)
+            self.model_file = outputfolder + filename
         except:
           print("Simulation ended when saving output.")
           if debug:
@@ -411,7 +450,8 @@ class Simulation:
         # robots on it (ie, we actually need the information)
         if self.Structure.tubes > 0 and self.Swarm.need_data():
           try:
-            sap_failures.write(helpers.run_analysis(self.SapModel))
+            sap_failures.write(helpers.run_analysis(self.SapModel,
+              self.config.robot_load_case,self.config.wind_combo))
           except:
             if debug:
               swarm_data = self.Swarm.get_information()
@@ -424,6 +464,7 @@ class Simulation:
           failed = self.Structure.failed(self.SapProgram)
           if failed:
             print(failed)
+            self.failed_step = i + 1
             break
 
         # Make the decision based on analysis results
@@ -454,8 +495,9 @@ class Simulation:
           self.exit(run_text)
           raise
 
-        # Write out errors on movements
-        errors = self.Swarm.get_errors()
+        # Write out errors on movements (those on the loads that were deferred
+        # are only known once the loads are applied, see sap_journal.py)
+        errors = self.Swarm.get_errors() + self.SapProgram.journal_errors()
         if errors != '':
           sap_failures.write("Errors that occurred in timestep {}. {}\n\n".format(
             str(i+1),errors))
@@ -474,7 +516,8 @@ class Simulation:
           self.Structure.structure_data[-1].sort(key=lambda t: int(t[0]))
 
         # Check height of structure and break out if we will reach maximum
-        if self.Structure.height > variables.dim_z - 2* construction.beam['length']:
+        if (self.Structure.height > self.config.dim_z - 2 *
+          self.config.beam.length):
           break
 
         with open(self.folder + 'random_seed_results.txt', 'a') as rand_tex:
@@ -520,6 +563,24 @@ class Simulation:
     run_data += "\n\n Maximum height of structure : " +  str(
       self.Structure.height) + "."
 
+    # Number of analyses skipped because nothing had changed
+    stats = self.SapProgram.analysis_stats()
+    if stats is not None:
+      run_data += ("\n\n Analyses run : {}. Analyses skipped (model unchanged) "
+        + ": {}.").format(stats["misses"],stats["hits"])
+      stats = self.SapProgram.results_stats()
+      run_data += ("\n\n Results retrieved from the model : {}. Results reused "
+        + ": {}.").format(stats["misses"],stats["hits"])
+
+    # Number of calls to the model saved by batching the changes to the loads
+    stats = self.SapProgram.journal_stats()
+    if stats is not None:
+      saved = stats["recorded"] - stats["made"]
+      run_data += ("\n\n Changes to loads : {}. Calls made to the model : {} "
+        + "(in {} batches). Calls saved per timestep : {:.2f}.").format(
+        stats["recorded"],stats["made"],stats["flushes"],saved / max(
+        self.timesteps,1))
+
     # Write out simulation data
     run_text.write(run_data)
 
@@ -534,6 +595,96 @@ class Simulation:
 
     self.run = True
 
+  def checkpoint(self,step,files=()):
+    '''
+    Saves everything needed to resume the simulation at the start of the
+    timestep: the model (checkpoint-<step>.sdb) and, pickled and compressed, the
+    state on the Python side (checkpoint-<step>.pkl.gz). That is the structure,
+    the swarm (with the memory and the random numbers of each robot), the
+    buffers of the visualization and of Excel, the loads on the beams, the
+    global random numbers, and how far the output files have been written (the
+    open files are flushed first).
+    '''
+    for file_obj in files:
+      file_obj.flush()
+    sizes = {}
+    for name in os.listdir(self.folder):
+      if name.endswith(".txt"):
+        sizes[name] = os.path.getsize(self.folder + name)
+
+    # Saving the model under another name makes that the current file, so it is
+    # saved again under the one it was being saved to
+    ret = self.SapModel.File.Save(self.folder + "checkpoint-{}.sdb".format(
+      step))
+    assert ret == 0
+    if self.model_file is not None:
+      ret = self.SapModel.File.Save(self.model_file)
+      assert ret == 0
+
+    state = {"step" : step, "seed" : self.seed, "template" : self.template,
+      "config" : self.config, "timesteps" : self.timesteps, "failed_step" :
+      self.failed_step, "excel" : self.excel, "Structure" : self.Structure,
+      "Swarm" : self.Swarm, "random" : random.getstate(), "loads" :
+      self.SapProgram.loads.loads, "sizes" : sizes, "model_file" : None if
+      self.model_file is None else os.path.basename(self.model_file)}
+
+    # Written to a temporary file first, so a crash while writing does not leave
+    # a broken checkpoint behind (the highest levels of compression take many
+    # times as long, for a file only slightly smaller)
+    filename = self.folder + "checkpoint-{}.pkl.gz".format(step)
+    with gzip.open(filename + ".tmp","wb",6) as state_file:
+      pickle.dump(state,state_file,pickle.HIGHEST_PROTOCOL)
+    os.replace(filename + ".tmp",filename)
+
+  @classmethod
+  def resume(cls,folder,step=None):
+    '''
+    Returns the simulation in the output folder as it was at the checkpoint of
+    the timestep (the last one if None), started and ready to carry on with
+    run_simulation. The output written after the checkpoint is dropped.
+    '''
+    folder = os.path.join(folder,"")
+    if step is None:
+      steps = [int(name[len("checkpoint-"):-len(".pkl.gz")]) for name in
+        os.listdir(folder) if name.startswith("checkpoint-") and
+        name.endswith(".pkl.gz")]
+      if steps == []:
+        raise IOError("There are no checkpoints in {}".format(folder))
+      step = max(steps)
+    filename = folder + "checkpoint-{}.pkl.gz".format(step)
+    with gzip.open(filename,"rb") as state_file:
+      state = pickle.load(state_file)
+
+    # Cut the output files back to where they were at the checkpoint
+    for name in os.listdir(folder):
+      if name.endswith(".txt"):
+        with open(folder + name,"r+b") as output:
+          output.truncate(state["sizes"].get(name,0))
+
+    # The model of the checkpoint, saved to the file it was being saved to
+    sim = cls(state["seed"],state["template"],state["config"])
+    if Config(**sim.config.overrides).as_dict() != sim.config.as_dict():
+      print("The settings in variables.py and construction.py have changed " +
+        "since the checkpoint. The simulation carries on with the old ones.")
+    model_file = folder + (state["model_file"] or "tower.sdb")
+    sim.SapProgram, sim.SapModel = commandline.run(folder +
+      "checkpoint-{}.sdb".format(step),model_file,sim.config)
+    sim.SapProgram.hide()
+    sim.SapProgram.loads.loads = state["loads"]
+    sim.started = True
+
+    # The structure and the swarm (which is given the program back)
+    sim.Structure, sim.Swarm = state["Structure"], state["Swarm"]
+    sim.Swarm.attach(sim.SapProgram)
+
+    sim.folder, sim.model_file = folder, model_file
+    sim.timesteps, sim.failed_step = state["timesteps"], state["failed_step"]
+    sim.excel = state["excel"]
+    sim.resumed_step = step
+    random.setstate(state["random"])
+
+    return sim
+
   def visualization_data(self):
     '''
     Writes out the data for the visualization currently stored and clears the
@@ -1,3 +1,5 @@
+import random
+
 # Basic class for any automatic object that needs access to the SAP program
 class Automaton:
   def __init__(self,name,program):
@@ -13,12 +15,38 @@ class Automaton:
     # Robot name
     self.name = name
 
+    # The robot's own stream of random numbers (see seed)
+    self.random = random.Random()
+
   def my_type(self):
     '''
     Returns the class name.
     '''
     return self.__class__.name
 
+  def seed(self,seed):
+    '''
+    Seeds the robot's stream of random numbers from the seed of the simulation
+    and the name of the robot, so what each robot draws does not depend on what
+    (and when) the other robots draw.
+    '''
+    self.random.seed(None if seed is None else "{}:{}".format(seed,self.name))
+
+  def attach(self,program):
+    '''
+    Gives the robot access to the program again (after it was restored from a
+    checkpoint, see Simulation.checkpoint)
+    '''
+    self.model = program.sap_com_object.SapModel
+    self.program = program
+
+  def __getstate__(self):
+    # The program and the sphere of the visualization cannot be pickled, so
+    # they are left out of checkpoints
+    state = dict(self.__dict__)
+    state.update({"model" : None, "program" : None, "simulation_model" : None})
+    return state
+
   def current_state(self):
     '''
     Returns the state of the robot at the moment the function is called
@@ -1,19 +1,19 @@
-from helpers import helpers
+from helpers import geometry, helpers
 from robots.movable import Movable
-import construction, math, operator, pdb, random, sys,variables
+import math, numpy as np, operator, pdb, sys
 
 class Builder(Movable):
   def __init__(self,name,structure,location,program):
     super(Builder,self).__init__(name,structure,location,program)
     # The number of beams the robot is carrying
-    self.num_beams = variables.beam_capacity
+    self.num_beams = self.config.beam_capacity
 
     # Whether or not we should start construction
     self.start_construction = False
 
     # Set the right weight
-    self.weight = (variables.robot_load + variables.beam_load * 
-      variables.beam_capacity)
+    self.weight = (self.config.robot_load + self.config.beam_load * 
+      self.config.beam_capacity)
 
     # Stores variables for construction algorithm (this is the robots memory)
     self.memory = {}
@@ -83,7 +83,7 @@ class Builder(Movable):
       
       # Not repairing, so calculate direction
       if not self.search_mode:
-        direction = helpers.make_vector(self.location,construction.home)
+        direction = helpers.make_vector(self.location,self.config.home)
         direction = (direction[0],direction[1],0)
         self.ground_direction = direction
 
@@ -97,17 +97,18 @@ class Builder(Movable):
 
       return False
 
-  def pickup_beams(self,num = variables.beam_capacity):
+  def pickup_beams(self,num = None):
     '''
     Pickup beams by adding weight to the robot and by adding num to number 
-    carried
+    carried (as many as the robot can carry by default)
     '''
+    num = self.config.beam_capacity if num is None else num
     self.num_beams = self.num_beams + num
-    self.weight = self.weight + variables.beam_load * num
+    self.weight = self.weight + self.config.beam_load * num
 
     # Set the direction towards the structure
     self.ground_direction = helpers.make_vector(self.location,
-      construction.construction_location_center)
+      self.config.construction_location_center)
 
   def discard_beams(self,num = 1):
     '''
@@ -115,13 +116,13 @@ class Builder(Movable):
     number carried
     '''
     self.num_beams = self.num_beams - num
-    self.weight = self.weight - variables.beam_load * num
+    self.weight = self.weight - self.config.beam_load * num
 
   def at_home(self):
     '''
     True if the robot is in the area designated as home (on the ground)
     '''
-    return helpers.within(construction.home, construction.home_size,
+    return helpers.within(self.config.home, self.config.home_size,
       self.location)
 
   def at_site(self):
@@ -129,8 +130,8 @@ class Builder(Movable):
     True if the robot is in the area designated as the construction site 
     (on the ground)
     '''
-    return helpers.within(construction.construction_location, 
-      construction.construction_size, self.location)
+    return helpers.within(self.config.construction_location, 
+      self.config.construction_size, self.location)
 
   def pre_decision(self):
     '''
@@ -138,7 +139,7 @@ class Builder(Movable):
     '''
     # We build almost never.
     self.start_construction = False
-    self.step = variables.step_length
+    self.step = self.config.step_length
     self.memory['broken'] = []
 
   # Model needs to have been analyzed before calling THIS function
@@ -198,7 +199,7 @@ class Builder(Movable):
       return True
 
     return (helpers.smallest_angle((vector[0],vector[1],0),xy) <= 
-      construction.beam['direction_tolerance_angle'])
+      self.config.beam.direction_tolerance_angle)
 
   def filter_dict(self,dirs,new_dirs,comp_functions,preferenced,priorities=[]):
     '''
@@ -242,7 +243,7 @@ class Builder(Movable):
 
         # Additionally, check the x-y direction if we have a preferenced direction
         if (preferenced and self.memory['preferred_direction'] is not None and
-          not helpers.is_vertical(vector)):
+          not helpers.is_vertical(vector,self.config.beam.verticality_angle)):
           coord_bool = coord_bool and self.filter_preferred(vector)
 
         # Check to see if the direciton is acceptable and keep if it is
@@ -319,8 +320,8 @@ class Builder(Movable):
     '''
     Select a random direction from directions
     '''
-    beam_name = random.choice(list(directions.keys()))
-    direction = random.choice(directions[beam_name])
+    beam_name = self.random.choice(list(directions.keys()))
+    direction = self.random.choice(directions[beam_name])
 
     return beam_name, direction
 
@@ -392,20 +393,19 @@ class Builder(Movable):
     # So we can modify the pivot whenever we call the fuction
     pivot = self.location if pivot is None else pivot
 
-    # Format (ret[0], number_results[1], obj_names[2], i_end distances[3], 
-    # elm_names[4], elm_dist[5], load_cases[6], step_types[7], step_nums[8],
-    # Ps[9], V2s[10], V3s[11], Ts[12], M2s[13], M3s[14]
-    results = self.model.Results.FrameForce(name,0)
-    if results[0] != 0:
+    # The frame forces of every beam (see sap_results.py)
+    forces = self.program.results.frame_forces()
+    rows = forces.rows(name) if forces is not None else []
+    if len(rows) == 0:
       # pdb.set_trace()
-      helpers.check(results[0],self,"getting frame forces",results=results,
+      helpers.check(1,self,"getting frame forces",name=name,
         state=self.current_state())
       return 0
 
     # Find index of closest data_point
     close_index, i = 0, 0
     shortest_distance = None
-    distances = results[3]
+    distances = forces.stations[rows].tolist()
     for i_distance in distances:
 
       # Get beam endpoints to calculate global position of moment
@@ -423,12 +423,10 @@ class Builder(Movable):
       i += 1
 
     # Make sure index is indexable
-    assert close_index < results[1]
+    assert close_index < len(rows)
 
     # Now that we have the closest moment, calculate sqrt(m2^2+m3^2)
-    m11 = results[12][close_index]
-    m22 = results[13][close_index]
-    m33 = results[14][close_index]
+    m11, m22, m33 = forces.values[rows[close_index],3:6].tolist()
 
     return m11,m22,m33
 
@@ -446,11 +444,11 @@ class Builder(Movable):
 
   def joint_check(self,name):
     moment = self.get_moment(name)
-    return moment < construction.beam['joint_limit']
+    return moment < self.config.beam.joint_limit
 
   def beam_check(self,name):
     moment = self.get_moment(name)
-    return moment < construction.beam['beam_limit']
+    return moment < self.config.beam.beam_limit
 
   def filter_feasable(self,dirs):
     '''
@@ -476,7 +474,7 @@ class Builder(Movable):
 
         # If the name is our beam and we can read moment from beams, 
         # do a structural check instead of a joint check
-        if (variables.read_beam and 
+        if (self.config.read_beam and 
           ((self.beam.name == name and self.beam_check(name)) or 
           (self.beam.name != name and self.joint_check(name)))):
           results[name] = directions
@@ -502,7 +500,7 @@ class Builder(Movable):
 
 
     # Not at joint, and can read beam moments
-    elif variables.read_beam:
+    elif self.config.read_beam:
 
       # Sanity check (there should only be one beam in the set of directions if
       # We are not at a joint)
@@ -604,7 +602,7 @@ class Builder(Movable):
 
     # If we have no beams, set the ground direction to home (TEMP CODE)
     if self.num_beams == 0:
-      vector = helpers.make_vector(self.location,construction.home_center)
+      vector = helpers.make_vector(self.location,self.config.home_center)
       self.ground_direction = (vector if not helpers.compare(helpers.length(
         vector),0) else self.non_zero_xydirection())
 
@@ -634,7 +632,7 @@ class Builder(Movable):
         self.move(direction, close_beam)
 
       # If we can "detect" a beam, change the ground direction to approach it
-      elif self.num_beams > 0 and dist <= variables.local_radius:
+      elif self.num_beams > 0 and dist <= self.config.local_radius:
         self.ground_direction = direction
         new_location = helpers.sum_vectors(self.location, helpers.scale(
           self.step,helpers.make_unit(direction)))
@@ -678,7 +676,7 @@ class Builder(Movable):
     # Add points to SAP Program
     p1_name, p2_name = addpoint(p1), addpoint(p2)
     name = self.program.frame_objects.add(p1_name,p2_name,
-      propName=variables.frame_property_name)
+      propName=self.config.frame_property_name)
 
     # Skip addition of beam
     if name == '':
@@ -729,7 +727,7 @@ class Builder(Movable):
     '''
     Returns the appropriate ratios for support beam construction
     '''
-    angle = construction.beam[string]
+    angle = getattr(self.config.beam,string)
     return angle
 
   def get_angles(self,support = True):
@@ -748,8 +746,8 @@ class Builder(Movable):
     The direction returned is a unit vector.
     '''
     # Random list
-    tuple_list = ([random.uniform(-1,1),random.uniform(-1,1),
-      random.uniform(-1,1)])
+    tuple_list = ([self.random.uniform(-1,1),self.random.uniform(-1,1),
+      self.random.uniform(-1,1)])
 
     # All are non-zero
     if all(tuple_list):
@@ -780,8 +778,8 @@ class Builder(Movable):
       xy_perp = (-1 * xy[1],xy[0],0)
 
       # Obtain disturbance based on "search_angle"
-      limit = helpers.ratio(construction.beam['direction_tolerance_angle'])
-      scale = random.uniform(-1 * limit,limit)
+      limit = self.config.ratios.direction_tolerance_angle
+      scale = self.random.uniform(-1 * limit,limit)
       disturbance = helpers.scale(scale,xy_perp)
 
       return helpers.sum_vectors(disturbance,xy)
@@ -809,7 +807,7 @@ class Builder(Movable):
     '''
     # Add beam_directions plus vertical change based on angle ratio (tan)
     if angle is None:
-      ratio = helpers.ratio(self.get_angle('support_angle'))
+      ratio = self.config.ratios.support_angle
 
     # We changed the angle from the default  
     else:
@@ -825,7 +823,7 @@ class Builder(Movable):
     Returns the endpoint for construction of a support beam
     '''
     # Add beam_directions plus vertical change based on angle ratio (tan)
-    ratio = helpers.ratio(self.get_angle('support_angle'))
+    ratio = self.config.ratios.support_angle
     vertical = self.support_vertical_change()
     xy_dir = self.support_xy_direction()
 
@@ -837,98 +835,63 @@ class Builder(Movable):
 
     # Calculate endpoints
     endpoint = helpers.sum_vectors(self.location,helpers.scale(
-      construction.beam['length'],direction))
+      self.config.beam.length,direction))
 
     return endpoint
 
   def local_angles(self,pivot,endpoint):
     '''
     Calculates the ratios of a beam if it were to intersect nearby beams. 
-    Utilizes the line defined by pivot -> endpoint as the base for the ratios 
-    '''
-    # We place it here in order to have access to the pivot and to the vertical 
-    # point
-
-    def add_angles(box,dictionary):
-      for name, beam in box.items():
-
-        # Ignore the beam you're on.
-        if self.beam == None or self.beam.name != name:
-
-          # Base vector (from which angles are measured)
-          base_vector = helpers.make_vector(pivot,endpoint)
-
-          # Get the closest points between the beam we want to construct and the
-          # current beam
-          points = helpers.closest_points(beam.endpoints,(pivot,endpoint))
-          if points != None:
-
-            # Endpoints (e1 is on a vertical beam, e2 is on the tilted one)
-            e1,e2 = points
-
-            # If we can actually reach the second point from vertical
-            if (not helpers.compare(helpers.distance(pivot,e2),0) and 
-              helpers.distance(pivot,e2) <= variables.beam_length):
-
-              # Distance between the two endpoints
-              dist = helpers.distance(e1,e2)
-
-              # Vector of beam we want to construct and angle from base_vector
-              construction_vector = helpers.make_vector(pivot,e2)
-              angle = helpers.smallest_angle(base_vector,construction_vector)
-
-              # Add to dictionary
-              if e2 in dictionary:
-                assert helpers.compare(dictionary[e2],angle)
-              else:
-                dictionary[e2] = angle
-
-          # Get the points at which the beam intersects the sphere created by 
-          # the vertical beam      
-          sphere_points = helpers.sphere_intersection(beam.endpoints,pivot,
-            variables.beam_length)
-          if sphere_points != None:
-
-            # Cycle through intersection points (really, should be two, though 
-            # it is possible for it to be one, in
-            # which case, we would have already taken care of this). Either way,
-            # we just cycle
-            for point in sphere_points:
-
-              # Vector to the beam we want to construct
-              construction_vector = helpers.make_vector(pivot,point)
-              angle = helpers.smallest_angle(base_vector,construction_vector)
-
-              # Add to dictionary
-              if point in dictionary:
-                assert helpers.compare(dictionary[point],angle)
-              else:
-                dictionary[point] = angle
-
-          # Endpoints are also included
-          for e in beam.endpoints:
-            v = helpers.make_vector(pivot,e)
-            l = helpers.length(v)
-            if (e not in dictionary and not helpers.compare(l,0) and (
-              helpers.compare(l,variables.beam_length) or l < variables.beam_length)):
-              angle = helpers.smallest_angle(base_vector,v)
-              dictionary[e] = angle
-
-      return dictionary
+    Utilizes the line defined by pivot -> endpoint as the base for the ratios.
+    The candidate points of all the nearby beams are found at once. Returns the
+    (point, angle) pairs sorted by angle.
+    '''
+    # get all beams nearby (ie, all the beams a beam from the pivot could reach)
+    # except the beam you're on
+    beams = [beam for beam in self.structure.get_beams(pivot,
+      self.config.beam_length) if self.beam == None or self.beam.name !=
+      beam.name]
+    if beams == []:
+      return []
+    lines = np.array([beam.endpoints for beam in beams],dtype=float)
+    length = self.config.beam_length
+
+    # Get the closest points between the beam we want to construct and each
+    # beam (e1 is on a vertical beam, e2 is on the tilted one), if we can
+    # actually reach the second point
+    e1, e2 = geometry.closest_points(lines,(pivot,endpoint))
+    dist = geometry.distance(pivot,e2)
+    closest = ~geometry.compare(dist,0) & (dist <= length)
+
+    # Get the points at which each beam intersects the sphere created by the 
+    # vertical beam      
+    sphere1, sphere2 = geometry.sphere_intersection(lines,pivot,length)
+
+    # Endpoints are also included
+    i, j = lines[:,0], lines[:,1]
+    def reachable(e):
+      l = geometry.distance(pivot,e)
+      return ~geometry.compare(l,0) & (geometry.compare(l,length) | (l < length))
+
+    # The candidates of each beam in order, and the angle of each from the base 
+    # vector 
+    candidates = np.stack((e2,sphere1,sphere2,i,j),axis=1).reshape(-1,3)
+    found = np.stack((closest,~np.isnan(sphere1[:,0]),~np.isnan(sphere2[:,0]),
+      reachable(i),reachable(j)),axis=1).reshape(-1)
+    candidates = candidates[found]
+    angles = geometry.smallest_angle(geometry.make_vector(pivot,endpoint),
+      geometry.make_vector(pivot,candidates))
 
-    # get all beams nearby (ie, all the beams in the current box and possible 
-    # those further above)
-    boxes = self.structure.get_boxes(self.location)
     '''
     The dictionary is indexed by the point, and each point is 
-    associated with one angle. The angle is measured from the pivot->endpoint
-    line passed into the function.
+    associated with one angle (the first one found). The angle is measured from
+    the pivot->endpoint line passed into the function.
     '''
-    angles = {}
-    for box in boxes:
-      angles = add_angles(box,angles)
+    dictionary = {}
+    for point, angle in zip(candidates.tolist(),angles.tolist()):
+      dictionary.setdefault(tuple(point),angle)
 
-    return sorted(angles.items(), key = operator.itemgetter(1))
+    return sorted(dictionary.items(), key = operator.itemgetter(1))
 
   def build(self):
     '''
@@ -951,12 +914,13 @@ class Builder(Movable):
       if not self.structure.available(i,j):
 
         # Create a small disturbace
-        lim = variables.random
-        f = random.uniform
+        lim = self.config.random
+        f = self.random.uniform
         disturbance = (f(-1*lim,lim),f(-1*lim,lim),f(-1*lim,lim))
 
         # find the new j-point for the beam
-        new_j = helpers.beam_endpoint(i,helpers.sum_vectors(j,disturbance))
+        new_j = helpers.beam_endpoint(i,helpers.sum_vectors(j,disturbance),
+          self.config.beam.length)
 
         return check(i,new_j)
 
@@ -964,7 +928,7 @@ class Builder(Movable):
 
         # Calculate the actual endpoint of the beam (now that we now direction 
         # vector)
-        return (i,helpers.beam_endpoint(i,j))
+        return (i,helpers.beam_endpoint(i,j,self.config.beam.length))
 
     # Sanitiy check
     assert (self.num_beams > 0)
@@ -988,14 +952,14 @@ class Builder(Movable):
       joint_coord, dist = min([(coord, helpers.distance(self.location,coord)) for coord in all_joints], key = lambda t: t[1])
       
       # If the nearest joint is within our error, then use it as the pivot
-      if dist <= construction.beam['joint_error']:
+      if dist <= self.config.beam.joint_error:
         pivot = joint_coord
 
     # Default vertical endpoint (the ratios are measured from the line created 
     # by pivot -> vertical_endpoint)
     vertical_endpoint = helpers.sum_vectors(pivot,helpers.scale(
-      variables.beam_length,
-      helpers.make_unit(construction.beam['vertical_dir_set'])))
+      self.config.beam_length,
+      helpers.make_unit(self.config.beam.vertical_dir_set)))
 
     # Get the ratios
     sorted_angles = self.local_angles(pivot,vertical_endpoint)
@@ -1008,7 +972,7 @@ class Builder(Movable):
     i, j = check(pivot, default_endpoint)
 
     # Sanity check
-    assert helpers.compare(helpers.distance(i,j),construction.beam['length'])
+    assert helpers.compare(helpers.distance(i,j),self.config.beam.length)
 
     return self.addbeam(i,j)
 
@@ -1068,11 +1032,11 @@ class Builder(Movable):
   def get_disturbance(self):
     '''
     Returns the disturbance level for adding a new beam at the tip (in this
-    class, the disturbance is random at a level set in variables.random)
+    class, the disturbance is random at a level set in self.config.random)
     '''
-    change = variables.random
-    return helpers.make_unit((random.uniform(-change,change),
-      random.uniform(-change,change),0))
+    change = self.config.random
+    return helpers.make_unit((self.random.uniform(-change,change),
+      self.random.uniform(-change,change),0))
 
   def default_probability(self):
     '''
@@ -1082,7 +1046,7 @@ class Builder(Movable):
     True means that the disturbance is NOT applied
     False means that the disturbance is
     '''
-    return (random.randint(0,4) == 1)
+    return (self.random.randint(0,4) == 1)
 
   def construct(self):
     '''
@@ -1,15 +1,24 @@
 from helpers import helpers
 from robots.modifications import *
 # from visual import *
-import construction, variables
+import random
 
 class Swarm:
-  def __init__(self,size, structure, program):
+  def __init__(self,size, structure, program, seed = None):
+    # The settings of the simulation (see config.py), those of the structure
+    self.config = structure.config
+
     # The number of robots in the swarm
     self.size = size
 
+    # The seed of the simulation. Each robot (and the swarm) draws random
+    # numbers from its own stream, derived from it (see Automaton.seed)
+    self.seed = seed
+    self.random = random.Random(None if seed is None else "{}:swarm".format(
+      seed))
+
     # The location of the swarm.
-    self.home = construction.home
+    self.home = self.config.home
 
     # Access to the structure, so we can create repairers
     self.structure = structure
@@ -32,14 +41,47 @@ class Swarm:
     # Keeps track of the color each robot should be at each timestep
     self.color_data = ''
 
+    # Errors of the analyses run by the swarm itself (see decide)
+    self.error_data = ''
+
   def create(self,name,structure,location,program):
-    return SmartRepairer(name,structure,location,program)
+    repairer = SmartRepairer(name,structure,location,program)
+    repairer.seed(self.seed)
+    return repairer
+
+  def attach(self,program):
+    '''
+    Gives the swarm and its robots access to the program again (after they were
+    restored from a checkpoint, see Simulation.checkpoint)
+    '''
+    self.model = program
+    for repairer in self.repairers.values():
+      repairer.attach(program)
+
+  def __getstate__(self):
+    # The program cannot be pickled
+    state = dict(self.__dict__)
+    state["model"] = None
+    return state
 
   def decide(self):
+    # Deciding only reads the structure and the analysis results, so the model
+    # is analyzed first if any robot needs it (as the first such robot would)
+    robots = list(self.repairers.values())
+    model = self.model.sap_com_object.SapModel
+    if not model.GetModelIsLocked() and any(robot.need_data() for robot in
+      robots):
+      errors = helpers.run_analysis(model,self.config.robot_load_case,
+        self.config.wind_combo)
+      if errors != '':
+        self.error_data += ("Analysis before the robots decided failed.\n"
+          "{}\n".format(errors))
+
     # Tell each robot to make the decion
     for repairer in self.repairers:
       self.repairers[repairer].decide()
 
+    for repairer in self.repairers:
       # Add location data for visualization of simulation
       loc = self.repairers[repairer].get_true_location()
       location = (loc[0], loc[1], 0) if helpers.compare(loc[2],0) else loc
@@ -66,7 +108,7 @@ class Swarm:
     return information
 
   def get_errors(self):
-    data = ''
+    data, self.error_data = self.error_data, ''
     for name,repairer in self.repairers.items():
       if repairer.error_data != '':
         data += "{}\n".format(repairer.error_data)
@@ -82,8 +124,8 @@ class Swarm:
     return data
 
 class ReactiveSwarm(Swarm):
-  def __init__(self,size,structure,program):
-    super(ReactiveSwarm, self).__init__(size,structure,program)
+  def __init__(self,size,structure,program, seed = None):
+    super(ReactiveSwarm, self).__init__(size,structure,program,seed)
     # Keeps track of how many robots we have created (in order to keep the 
     # names different)
     self.num_created = size
@@ -103,7 +145,7 @@ class ReactiveSwarm(Swarm):
       # Otherwise create a new model for the robot at the current location
       else:
         repairer.simulation_model = sphere(pos=repairer.location,
-          radius=variables.visualization['robot_size']/2,make_trail=False)
+          radius=self.config.visualization.robot_size/2,make_trail=False)
         repairer.simulation_model.color = (1,0,1)
 
   def reset(self):
@@ -123,7 +165,7 @@ class ReactiveSwarm(Swarm):
     they don't need data.
     '''
     for name, repairer in self.repairers.items():
-      if repairer.need_data() or (variables.collect_data and 
+      if repairer.need_data() or (self.config.collect_data and 
         repairer.beam is not None):
         return True
 
@@ -147,7 +189,7 @@ class ReactiveSwarm(Swarm):
     Deletes the specified robot from the swarm if it exists
     '''
     if name in self.repairers:
-      self.repairers[name].change_location(construction.home, None)
+      self.repairers[name].change_location(self.config.home, None)
       del(self.repairers[name])
       self.size -= 1
       return True
@@ -159,8 +201,7 @@ class ReactiveSwarm(Swarm):
     Deletes a random robot from the swarm.
     '''
     # Pick a random repairer
-    from random import choice
-    smartrepairer_name = choice(self.repairers.keys())
+    smartrepairer_name = self.random.choice(sorted(self.repairers.keys()))
 
     return self.delete_robot(smartrepairer_name)
 
@@ -190,5 +231,5 @@ class ReactiveSwarm(Swarm):
     return deleted
 
 class SmartSwarm(ReactiveSwarm):
-  def __init__(self,size,structure,program):
-    super(SmartSwarm, self).__init__(size,structure,program)
\ No newline at end of file
+  def __init__(self,size,structure,program, seed = None):
+    super(SmartSwarm, self).__init__(size,structure,program,seed)
\ No newline at end of file
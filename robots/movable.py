@@ -1,7 +1,7 @@
 from helpers import helpers
 from robots.automaton import Automaton
 from sap2000.constants import EOBJECT_TYPES
-import construction, pdb, random, variables
+import pdb
 
 # Class of objects that can move around (on the ground and on the structure)
 class DumbMovable(Automaton):
@@ -10,8 +10,11 @@ class DumbMovable(Automaton):
     # Access to my Python structure
     self.structure = structure
 
+    # The settings of the simulation (see config.py), those of the structure
+    self.config = structure.config
+
     # Number of steps left in movement
-    self.step = variables.step_length
+    self.step = self.config.step_length
 
     # The current location of the robot on the designed structure
     self.location = location
@@ -20,7 +23,7 @@ class DumbMovable(Automaton):
     self.beam = None
 
     # The weight of the robot
-    self.weight = variables.robot_load
+    self.weight = self.config.robot_load
 
     # The direction in which we should move
     self.next_direction_info = None
@@ -30,7 +33,7 @@ class DumbMovable(Automaton):
 
     # The robots all initially move towards the centertower
     self.ground_direction = helpers.make_vector(location,
-      construction.construction_location)
+      self.config.construction_location)
 
   def current_state(self):
     '''
@@ -79,10 +82,10 @@ class DumbMovable(Automaton):
     # Jump on beam
     self.beam = beam
 
-    # Find distance and add load
+    # Find distance and add load (see sap2000/sap_loads.py)
     distance = helpers.distance(beam.endpoints.i,location)
-    ret = self.model.FrameObj.SetLoadPoint(beam.name,variables.robot_load_case,
-      1,10,distance,value,"Global", False, True,0)
+    ret = self.program.loads.add(beam.name,self.config.robot_load_case,
+      self.name,distance,value)
     helpers.check(ret,self,"adding new load",beam=beam.name,distance=distance,
       value=value,state=self.current_state())
 
@@ -110,7 +113,7 @@ class DumbMovable(Automaton):
     '''
     Decides whether or not the robot should climb off the structure
     '''
-    return helpers.compare(loc[2],0) and random.int(0,1) == 1
+    return helpers.compare(loc[2],0) and self.random.randint(0,1) == 1
 
   def change_location(self,new_location, new_beam):
     '''
@@ -122,68 +125,32 @@ class DumbMovable(Automaton):
     '''
     def removeload(location):
       '''
-      Removes the load assigned to a specific location based on where the robot 
-      existed (assumes the robot is on a beams
+      Removes the load of the robot from the beam it is on (the loads of each 
+      beam are kept track of in sap2000/sap_loads.py, so the loads of the beam
+      are not read back from the model)
       '''
       # Sanity check
       assert not self.model.GetModelIsLocked()
 
-      # obtain current values.
-      # values are encapsulated in a list as follows: ret, number_items, 
-      # frame_names, loadpat_names, types, coordinates, directions, rel_dists, 
-      # dists, loads
-      data = self.model.FrameObj.GetLoadPoint(self.beam.name)
-     
-      # Sanity check with data
-      assert data[0] == 0 
-      if data[1] == 0:
-        helpers.check(1,self,"getting loads",beam=self.beam.name,
-          return_data=data,state=self.current_state())
-        return;
-
-      # Find location of load
-      i, j = self.beam.endpoints
-      curr_dist = helpers.distance(i,self.location)
-
-      # Loop through distances to find our load (the one in self.location) and 
-      # remove all reference to it. Additionally remove loads not related to our
-      # load pattern
-      indeces = []
-      index = 0
-      for ab_dist in data[8]:  # this provides acces to the absolute_distance 
-        if ((helpers.compare(ab_dist,curr_dist) and variables.robot_load_case == 
-          data[3][index]) or data[3][index] != variables.robot_load_case):
-          indeces.append(index)
-        index += 1
-
-      # Delete the loads off the beam
-      ret = self.model.FrameObj.DeleteLoadPoint(self.beam.name,
-        variables.robot_load_case)
+      # Delete our load off the beam
+      ret = self.program.loads.remove(self.beam.name,
+        self.config.robot_load_case,self.name)
       helpers.check(ret,self,"deleting loads",return_val=ret,
-        beam=self.beam.name,distance=curr_dist,previous_loads=data,
+        beam=self.beam.name,previous_loads=self.program.loads.get(
+          self.beam.name,self.config.robot_load_case),
         state=self.current_state())
 
-      # add the loads we want back to the frame (automatically deletes all 
-      # previous loads)
-      for i in range(data[1]):
-        if i not in indeces:
-          ret = self.model.FrameObj.SetLoadPoint(self.beam.name, 
-            data[3][i], data[4][i], data[6][i], data[7][i], data[9][i],"Global",
-            True,False)
-          helpers.check(ret,self,"adding back loads",return_val=ret,
-            beam=self.beam.name,load_pat=data[3][i],type=data[4][i],
-            direction=data[6][i],rel_dist=data[7][i],load_val=data[9][i],
-            state=self.current_state())
-
-    # Move the load off the current location and to the new one (if still on 
-    # beam), then change the locations
-    if self.beam is not None:
-      removeload(self.location)
-
     # Check to see if we will be moving off a beam and onto the ground
     if self.climb_off(new_location):
       new_beam = None
 
+    # Move the load off the current location and to the new one (if still on 
+    # beam), then change the locations. Moving along the same beam just moves
+    # the load.
+    if self.beam is not None and (new_beam is None or new_beam.name != 
+      self.beam.name):
+      removeload(self.location)
+
     # Don't add the load if there is no beam
     if new_beam is not None:
       self.__addload(new_beam, new_location, self.weight)
@@ -317,37 +284,36 @@ class DumbMovable(Automaton):
     to the xy-plane (ground). It returns that beam and its direction from the 
     robot.
     '''
-    # Get local boxes
-    boxes = self.structure.get_boxes(self.location)
+    # Get local beams
+    beams = self.structure.get_beams(self.location,self.config.beam_length)
 
     # Initializations
     distances = {}
     vectors = {}
 
-    # Cycle through boxes
-    for box in boxes:
-      # Cycle through beams in each box
-      for name in box:
-
-        # So e1 is in the form (x,y,z)
-        e1, e2 = box[name].endpoints 
-        # beam is lying on the ground (THIS IS NOT FUNCTIONAL)
-        if helpers.compare(e1[2],0) and helpers.compare(e2[0],0):
-          # pdb.set_trace()
-          vectors[name] = helpers.vector_to_line(e1,e2,self.location)
-          distances[name] = helpers.length(vectors[name])
-
-        # Only one point is on the ground
-        elif helpers.compare(e1[2],0):
-          vectors[name] = helpers.make_vector(self.location, e1)
-          distances[name] = helpers.distance(e1, self.location)
-        elif helpers.compare(e2[2],0):
-          vectors[name] = helpers.make_vector(self.location, e2)
-          distances[name] = helpers.distances(e2, self.location)
-
-        # No points on the ground
-        else:
-          pass
+    # Cycle through beams
+    for beam in beams:
+      name = beam.name
+
+      # So e1 is in the form (x,y,z)
+      e1, e2 = beam.endpoints 
+      # beam is lying on the ground (THIS IS NOT FUNCTIONAL)
+      if helpers.compare(e1[2],0) and helpers.compare(e2[0],0):
+        # pdb.set_trace()
+        vectors[name] = helpers.vector_to_line(e1,e2,self.location)
+        distances[name] = helpers.length(vectors[name])
+
+      # Only one point is on the ground
+      elif helpers.compare(e1[2],0):
+        vectors[name] = helpers.make_vector(self.location, e1)
+        distances[name] = helpers.distance(e1, self.location)
+      elif helpers.compare(e2[2],0):
+        vectors[name] = helpers.make_vector(self.location, e2)
+        distances[name] = helpers.distances(e2, self.location)
+
+      # No points on the ground
+      else:
+        pass
 
     # get name of beam at the minimum distance if one exists
     if distances == {}:
@@ -357,13 +323,10 @@ class DumbMovable(Automaton):
       name = min(distances, key=distances.get)
 
       # So far away that we can't "see it"      
-      if distances[name] > variables.local_radius:
+      if distances[name] > self.config.local_radius:
         return None
       else:
-        # All the same beans 
-        beams = [box[name] for box in boxes if name in box]
-
-        return {  'beam'  : beams[0],
+        return {  'beam'  : self.structure.beams[name],
                   'distance' : distances[name],
                   'direction' : vectors[name]}
 
@@ -378,8 +341,8 @@ class DumbMovable(Automaton):
       Returns a random, new location (direction)
       '''
       # obtain a random direction
-      direction = (random.uniform(-1 * self.step, self.step), random.uniform(
-        -1 * self.step, self.step), 0)
+      direction = (self.random.uniform(-1 * self.step, self.step),
+        self.random.uniform(-1 * self.step, self.step), 0)
 
       # The they can't all be zero!
       if helpers.compare(helpers.length(direction),0):
@@ -389,7 +352,7 @@ class DumbMovable(Automaton):
         predicted_location = helpers.sum_vectors(step, self.location)
 
         # Check the location
-        if helpers.check_location(predicted_location):
+        if helpers.check_location(predicted_location,self.structure.size):
           return direction
         else:
           return random_direction()
@@ -402,7 +365,7 @@ class DumbMovable(Automaton):
 
       # We are going out of bounds, so set the direction to none and call 
       # yourself again (to find a new location)
-      if not helpers.check_location(predicted_location):
+      if not helpers.check_location(predicted_location,self.structure.size):
         self.ground_direction = None
         return self.get_ground_direction()
 
@@ -476,13 +439,14 @@ class DumbMovable(Automaton):
 
       # Reset step in preparation for next timestep
       if helpers.compare(self.step,0):
-        self.step == variables.step_length
+        self.step == self.config.step_length
 
       # We still have steps to go, so run an analysis if necessary
       elif self.beam is not None:
         # Run analysis before deciding to get the next direction
         if not self.model.GetModelIsLocked() and self.need_data():
-          errors = helpers.run_analysis(self.model)
+          errors = helpers.run_analysis(self.model,
+            self.config.robot_load_case,self.config.wind_combo)
           if errors != '':
             # pdb.set_trace()
             pass
@@ -521,7 +485,8 @@ class DumbMovable(Automaton):
     '''
     # Run analysys before deciding to get the next direction
     if not self.model.GetModelIsLocked() and self.need_data():
-      errors = helpers.run_analysis(self.model)
+      errors = helpers.run_analysis(self.model,self.config.robot_load_case,
+        self.config.wind_combo)
       if errors != '':
         # pdb.set_trace()
         pass
@@ -558,10 +523,10 @@ class DumbMovable(Automaton):
     info = self.get_directions_info()
 
     # Pick a random beam to walk on
-    beam_name = random.choice(list(info['directions'].keys()))
+    beam_name = self.random.choice(list(info['directions'].keys()))
 
     # From the beam, pick a random direction (really, 50/50)
-    direction = random.choice(info['directions'][beam_name])
+    direction = self.random.choice(info['directions'][beam_name])
 
     return {  'beam'      : info['box'][beam_name],
               'direction' : direction }
@@ -576,7 +541,7 @@ class DumbMovable(Automaton):
     '''
     Takes care of resetting appropriate values
     '''
-    self.step = variables.step_length
+    self.step = self.config.step_length
 
   def movable_decide(self):
     '''
@@ -594,7 +559,8 @@ class DumbMovable(Automaton):
       # results. Therefore, check to see if the model is locked. If it is not,
       # then execute and analysis.
       if not self.model.GetModelIsLocked() and self.need_data():
-        errors = helpers.run_analysis(self.model)
+        errors = helpers.run_analysis(self.model,
+          self.config.robot_load_case,self.config.wind_combo)
         assert errors == ''
 
       self.next_direction_info = self.get_direction()
@@ -641,7 +607,8 @@ class Movable(DumbMovable):
     deflection data from SAP to calculate this location.
     '''
     # Not on the structure, no deflection, or not recording deflection
-    if not self.on_structure() or self.beam.deflection is None or not variables.deflection:
+    if (not self.on_structure() or self.beam.deflection is None or not
+      self.config.deflection):
       return super(Movable,self).get_true_location()
 
     else:
@@ -650,7 +617,7 @@ class Movable(DumbMovable):
 
       # Obtain weight of each scale based on location on beam
       i_weight = 1 - (helpers.distance(self.location,self.beam.endpoints.i) / 
-        construction.beam['length'])
+        self.config.beam.length)
       j_weight = 1 - i_weight
 
       # Sum the two vectors to obtain general deflection
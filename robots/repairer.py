@@ -1,6 +1,6 @@
 from helpers import helpers
 from robots.worker import Worker
-import construction, math, pdb,variables, random
+import math, pdb
 
 class DumbRepairer(Worker):
   def __init__(self,name,structure,location,program):
@@ -191,11 +191,12 @@ class DumbRepairer(Worker):
     l1,l2 = helpers.length(v1), helpers.length(v2)
 
     # v1 is non-zero and it is not vertical
-    if not (helpers.compare(l1,0) or helpers.is_vertical(v1)):
+    angle = self.config.beam.verticality_angle
+    if not (helpers.compare(l1,0) or helpers.is_vertical(v1,angle)):
       return helpers.make_unit(v1)
 
     # v2 is non-zero and it is not vertical
-    elif not (helpers.compare(l2,0) or helpers.is_vertical(v2)):
+    elif not (helpers.compare(l2,0) or helpers.is_vertical(v2,angle)):
       return helpers.make_unit(v2)
 
     # No preferred direction because the beam is perfectly vertical
@@ -251,9 +252,9 @@ class DumbRepairer(Worker):
 
     # Number of steps to search once we find a new beam that is close to
     # parallel to the beam we are repairing (going down, ie NOT support beam)
-    length = construction.beam['length'] * math.cos(
-      math.radians(construction.beam['support_angle']))
-    self.memory['new_beam_steps'] = math.floor(length/variables.step_length)+1
+    length = self.config.beam.length * math.cos(
+      math.radians(self.config.beam.support_angle))
+    self.memory['new_beam_steps'] = math.floor(length/self.config.step_length)+1
     self.memory['new_beam_ground_steps'] = (self.memory['new_beam_steps'] if
       self.ground_direction is None else self.memory['new_beam_steps'] - 1 + math.floor(
         math.sin(math.radians(angle_with_vertical)) * self.memory['new_beam_steps']))
@@ -326,7 +327,7 @@ class Repairer(DumbRepairer):
 
       # If below the specified angle, then place the beam directly upwards (no
       # change in xy)
-      if angle < construction.beam['direct_repair_limit']:
+      if angle < self.config.beam.direct_repair_limit:
         return None
       else:
         vertical = (0,0,1)
@@ -348,7 +349,7 @@ class Repairer(DumbRepairer):
             projection = helpers.make_unit((current_vector[0],current_vector[1],0))
 
           # Add some small disturbance
-          disturbance = helpers.scale(random.uniform(-1,1),(-projection[1],
+          disturbance = helpers.scale(self.random.uniform(-1,1),(-projection[1],
             projection[0],projection[2]))
           result = helpers.sum_vectors(projection,disturbance)
 
@@ -385,7 +386,7 @@ class Repairer(DumbRepairer):
       angle = helpers.smallest_angle((0,0,1),current_vector)
       rotation_angle = 180 - angle if angle > 90 else angle
 
-      vertical_angle = abs(construction.beam['support_angle'] - rotation_angle)
+      vertical_angle = abs(self.config.beam.support_angle - rotation_angle)
 
       return super(Repairer,self).support_vertical_change(angle=vertical_angle)
 
@@ -409,12 +410,13 @@ class Repairer(DumbRepairer):
     midpoint = helpers.midpoint(e2,midpoint1)
 
     # Add an offset to mimick inability to determine location exactly
-    offset = helpers.scale(random.uniform(-1*variables.random,variables.random),v)
-    midpoint = (helpers.sum_vectors(midpoint,offset) if random.randint(0,4) == 1
-    else midpoint) 
+    offset = helpers.scale(self.random.uniform(-1*self.config.random,
+      self.config.random),v)
+    midpoint = (helpers.sum_vectors(midpoint,offset) if self.random.randint(0,4)
+      == 1 else midpoint) 
 
     # Calculate starting beam_endpoint
-    endpoint = helpers.beam_endpoint(pivot,midpoint)
+    endpoint = helpers.beam_endpoint(pivot,midpoint,self.config.beam.length)
 
     # Calculate angle from vertical
     angle_from_vertical = helpers.smallest_angle(helpers.make_vector(pivot,
@@ -429,7 +431,8 @@ class Repairer(DumbRepairer):
     # Defining here to have access to min,max, etc.
     def acceptable_support(angle,coord):
       # Find beam endpoints
-      beam_endpoint = helpers.beam_endpoint(pivot,coord)
+      beam_endpoint = helpers.beam_endpoint(pivot,coord,
+        self.config.beam.length)
 
       # Calculate angle from vertical of beam we wish to construct based on the
       # information we've gathered
@@ -451,7 +454,7 @@ class Repairer(DumbRepairer):
         angle = helpers.smallest_angle(beam_vector,support_vector)
         real_angle = abs(90-angle) if angle > 90 else angle
         
-        return simple and real_angle > construction.beam['support_angle_difference']
+        return simple and real_angle > self.config.beam.support_angle_difference
 
     return_coord = None
     for coord,angle in sorted_angles:
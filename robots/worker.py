@@ -1,6 +1,6 @@
 from helpers import helpers
 from robots.builder import Builder
-import construction, math, pdb,variables
+import math, pdb
 
 class Worker(Builder):
   def __init__(self,name,structure,location,program):
@@ -9,7 +9,7 @@ class Worker(Builder):
     self.num_beams = 0
 
     # Since we aren't carryng any beams
-    self.weight = variables.robot_load
+    self.weight = self.config.robot_load
 
     # Smaller number gives higher priority
     self.memory['dir_priority'] = [0,0,0]
@@ -20,6 +20,9 @@ class Worker(Builder):
     # Move further in the y-direction?
     self.memory['pos_y'] = None
 
+    # Did we decide to start the structure? (claimed when acting, see do_action)
+    self.memory['start_structure'] = False
+
   def current_state(self):
     return super(Worker,self).current_state()
 
@@ -70,7 +73,7 @@ class Worker(Builder):
     if self.num_beams == 0:
       self.memory['pos_z'] = False
 
-  def pickup_beams(self,num = variables.beam_capacity):
+  def pickup_beams(self,num = None):
     '''
     Adding ability to change memory
     '''
@@ -135,7 +138,7 @@ class Worker(Builder):
       Returns index, sorting_angle of vs.
       '''
       angle_list = [abs(helpers.smallest_angle((1,0,0),v) - 
-        construction.beam['support_angle']) for v in vs]
+        self.config.beam.support_angle) for v in vs]
       min_val = min(angle_list)
       index = angle_list.index(min_val)
       return index, min_val
@@ -191,7 +194,7 @@ class Worker(Builder):
     if (((self.at_site() and not self.structure.started and not self.search_mode
       )) and not self.memory['built'] and self.num_beams > 0):
 
-      self.structure.started = True
+      self.memory['start_structure'] = True
       self.memory['built'] = True
       return True
     else:
@@ -216,4 +219,18 @@ class Worker(Builder):
     '''
     Decides whether the robot should construct or not based on some local rules.
     '''
-    return self.basic_rules() or self.local_rules()
\ No newline at end of file
+    return self.basic_rules() or self.local_rules()
+
+  def do_action(self):
+    '''
+    Decisions only read the structure, so more than one robot can decide to
+    start it in the same timestep. The first one to act claims it, and the
+    others wander instead.
+    '''
+    if self.memory['start_structure']:
+      self.memory['start_structure'] = False
+      if self.structure.started:
+        self.start_construction = False
+      self.structure.started = True
+
+    super(Worker,self).do_action()
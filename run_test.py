@@ -1,12 +1,17 @@
 from main import Simulation
 from visualization import Visualization
+import sys
 
 # Variables
 view = True
 
-# Run the Simulation
-sim = Simulation("Papyrus")
-sim.start(view,1)
+# Run the Simulation (or, given the output folder of a run, resume it from its
+# last checkpoint)
+if len(sys.argv) > 1:
+  sim = Simulation.resume(sys.argv[1])
+else:
+  sim = Simulation("Papyrus")
+  sim.start(view,1)
 sim.run_simulation(view,10000)
 
 # Display the simulation
@@ -1,3 +1,4 @@
 from sap2000.sap2000 import Sap2000
+from sap2000.sap_local import LocalSap2000
 
-__all__ = ["Sap2000"]
\ No newline at end of file
+__all__ = ["Sap2000", "LocalSap2000"]
\ No newline at end of file
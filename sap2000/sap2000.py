@@ -1,4 +1,3 @@
-import win32com.client as win32
 from sap2000.constants import UNITS
 from sap2000.sap_groups import SapGroups
 from sap2000.sap_areas import SapAreaObjects, SapAreaElements
@@ -6,14 +5,40 @@ from sap2000.sap_points import SapPointObjects, SapPointElements
 from sap2000.sap_lines import SapLineElements
 from sap2000.sap_frames import SapFrameObjects
 from sap2000.sap_analysis import SapAnalysis
+from sap2000.sap_cache import CachedSapObject
+from sap2000.sap_journal import JournalSapObject
+from sap2000.sap_loads import SapLoads
+from sap2000.sap_results import ResultsSapObject, SapResults
+
+# The COM interface only exists on Windows. Other platforms can still use the
+# local analysis program (sap_local.py)
+try:
+  import win32com.client as win32
+except ImportError:
+  win32 = None
 
 
 class Sap2000(object):
-  def __init__(self):
+  def __init__(self, sap_com_object = None, cache_analysis = True,
+    defer_loads = False):
     super(Sap2000, self).__init__()
 
     # create the Sap2000 COM-object
-    sap_com_object = win32.Dispatch("SAP2000v15.sapobject")
+    if sap_com_object is None:
+      if win32 is None:
+        raise ImportError("The SAP2000 COM object requires PyWin32.")
+      sap_com_object = win32.Dispatch("SAP2000v15.sapobject")
+
+    # Skip analyses of unchanged models (see sap_cache.py)
+    if cache_analysis:
+      sap_com_object = CachedSapObject(sap_com_object)
+
+    # Apply the changes to the loads in batches (see sap_journal.py)
+    if defer_loads:
+      sap_com_object = JournalSapObject(sap_com_object)
+
+    # Tell the results when the model changes (see sap_results.py)
+    sap_com_object = ResultsSapObject(sap_com_object)
     self.sap_com_object = sap_com_object
 
     # Each of the following attributes represents an object of the SAP2000 type 
@@ -29,9 +54,16 @@ class Sap2000(object):
     self.frame_objects = SapFrameObjects(sap_com_object)
     self.analysis = SapAnalysis(sap_com_object)
 
+    # The results of all objects at once, as arrays (see sap_results.py)
+    self.results = SapResults(sap_com_object)
+
+    # The point loads on each frame (see sap_loads.py)
+    self.loads = SapLoads(sap_com_object)
+
   def reset(self, units="kip_in_F",template = None):
     if self.model != None:
       self.model.File.Save()
+    self.loads.reset()
 
     if template is None:
       self.model = self.initializeModel(units)
@@ -64,6 +96,60 @@ class Sap2000(object):
 
     return 0
 
+  def analysis_stats(self):
+    '''
+    Returns the number of analyses skipped because the model had not changed
+    (hits) and the number actually run (misses), or None if the analyses are not
+    cached
+    '''
+    cache = self.__layer(CachedSapObject)
+    if cache is not None:
+      return dict(cache.SapModel.stats)
+    return None
+
+  def results_stats(self):
+    '''
+    Returns the number of results served from the cache (hits) and retrieved
+    from the model (misses), or None if the results are not cached
+    '''
+    cache = self.__layer(CachedSapObject)
+    if cache is not None:
+      return dict(cache.SapModel.result_cache.stats)
+    return None
+
+  def journal_stats(self):
+    '''
+    Returns the number of changes to loads recorded and of calls actually made
+    to the model, and the number of batches, or None if the changes to loads
+    are not deferred
+    '''
+    journal = self.__layer(JournalSapObject)
+    if journal is not None:
+      return dict(journal.SapModel.stats)
+    return None
+
+  def journal_errors(self):
+    '''
+    Returns the failures of the deferred changes to loads applied since the
+    last time, or '' if there were none (or the changes are not deferred)
+    '''
+    journal = self.__layer(JournalSapObject)
+    if journal is not None:
+      return journal.SapModel.take_errors()
+    return ''
+
+  def __layer(self, layer_class):
+    '''
+    Returns the layer of the specified class around the COM object (or None)
+    '''
+    sap_object = self.sap_com_object
+    while isinstance(sap_object, (CachedSapObject, JournalSapObject,
+      ResultsSapObject)):
+      if isinstance(sap_object, layer_class):
+        return sap_object
+      sap_object = sap_object._sap_com_object
+    return None
+
   def hide(self):
     """
     This function hides the Sap2000 application. When the application is
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
 from collections import namedtuple
-import win32com.client as win32
 from sap2000.constants import UNITS
 
 
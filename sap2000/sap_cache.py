@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+'''
+A transparent layer between the simulation and SapModel that avoids running
+analyses that cannot change anything. Every call made through the layer is
+forwarded to the real SapModel, except that:
+  * It keeps a fingerprint of the model (frames, points, restraints, output
+    stations and the point loads on each frame). Any other change to the model
+    simply counts as a new model.
+  * Locking is virtual. Unlocking the model (which deletes the results in
+    SAP2000) is only passed on when the model is actually changed or results
+    are asked for while unlocked.
+  * RunAnalysis is skipped if the fingerprint is the same as in the last
+    analysis.
+  * Results (FrameForce, JointDisplAbs, ...) are retrieved from the model at
+    most once per analysis, and kept in a ResultsCache.
+The number of analyses skipped (hits) and run (misses) are kept in stats, and
+the same for results in result_cache.stats.
+'''
+import operator
+
+# Marks the loads of a frame that were there before the layer was created (and
+# which it therefore knows nothing about)
+INITIAL = "initial"
+
+class CachedSapObject(object):
+  '''
+  Wraps the SAP2000 COM object. Everything is forwarded to it, but SapModel is
+  replaced by the caching layer.
+  '''
+  def __init__(self, sap_com_object):
+    super(CachedSapObject, self).__init__()
+    self._sap_com_object = sap_com_object
+    self.SapModel = CachedSapModel(sap_com_object.SapModel)
+
+  def __getattr__(self, name):
+    return getattr(self._sap_com_object, name)
+
+class SapProxy(object):
+  '''
+  Stands in for any object (or function) below SapModel. Calls are handed to
+  the cache along with the path to the function (e.g. ("FrameObj",
+  "SetLoadPoint")).
+  '''
+  def __init__(self, cache, sap_object, path):
+    super(SapProxy, self).__init__()
+    self._cache = cache
+    self._obj = sap_object
+    self._path = path
+
+  def __getattr__(self, name):
+    return SapProxy(self._cache, getattr(self._obj, name), self._path + (name,))
+
+  def __call__(self, *args, **kwargs):
+    return self._cache.call(self._path, self._obj, args, kwargs)
+
+class ResultsCache(object):
+  '''
+  Results retrieved from the model, keyed by (analysis generation, object name,
+  result type). The result type includes the function, the rest of its
+  arguments and the cases selected for output. A new generation starts every
+  time a changed model is analyzed, so results from earlier analyses are never
+  returned.
+  '''
+  def __init__(self):
+    super(ResultsCache, self).__init__()
+    self.generation = 0
+    self.results = {}
+    self.stats = {"hits" : 0, "misses" : 0}
+
+  def invalidate(self):
+    self.generation += 1
+    self.results = {}
+
+  def key(self, function, args, selected):
+    name = args[0] if len(args) > 0 else None
+    return (self.generation, name, (function,) + tuple(args[1:]) + (selected,))
+
+  def get(self, key):
+    '''
+    Returns the cached results (or None if we don't have them)
+    '''
+    if key in self.results:
+      self.stats["hits"] += 1
+      return self.results[key]
+    self.stats["misses"] += 1
+    return None
+
+  def store(self, key, results):
+    self.results[key] = results
+
+class CachedSapModel(object):
+  '''
+  The caching layer itself. Use it exactly as SapModel.
+  '''
+  def __init__(self, sap_model):
+    super(CachedSapModel, self).__init__()
+    self._model = sap_model
+    self.stats = {"hits" : 0, "misses" : 0}
+    self.result_cache = ResultsCache()
+    self.reset()
+
+  def reset(self):
+    '''
+    Forgets everything about the model (a new model was created or opened)
+    '''
+    # What we know of the model {key : value}, and the fingerprint made from it
+    # (which can be updated one entry at a time)
+    self.ledger = {}
+    self.hashed = 0
+    self.version = self.__dict__.get("version", 0) + 1
+
+    # Virtual and real lock states (None if unknown)
+    self.locked = None
+    self.real_locked = None
+
+    # Fingerprint of the last analysis and whether the real model still has its
+    # results
+    self.analyzed = None
+    self.real_results = False
+    self.result_cache.invalidate()
+
+    # Cases and combinations selected for output (in the simulation and in the
+    # real model)
+    self.selected = frozenset()
+    self.real_selected = None
+
+  def __getattr__(self, name):
+    return SapProxy(self, getattr(self._model, name), (name,))
+
+  def fingerprint(self):
+    return (self.version, self.hashed)
+
+  def record(self, key, value):
+    '''
+    Updates an entry of the ledger (and the fingerprint)
+    '''
+    if key in self.ledger:
+      self.hashed ^= hash((key, self.ledger[key]))
+    self.ledger[key] = value
+    self.hashed ^= hash((key, value))
+
+  def changed(self):
+    '''
+    Something we do not keep track of changed
+    '''
+    self.version += 1
+
+  def GetModelIsLocked(self):
+    if self.locked is None:
+      # If locked, the model has results (as far as we know)
+      self.locked = self.real_locked = self._model.GetModelIsLocked()
+      self.real_results = self.locked
+    return self.locked
+
+  def SetModelIsLocked(self, lock_it = True):
+    '''
+    Unlocking is only passed on when needed. Locking is passed on right away.
+    '''
+    if lock_it:
+      ret = self._model.SetModelIsLocked(True)
+      if ret == 0:
+        self.locked = self.real_locked = True
+        self.real_results = False
+      return ret
+
+    self.locked = False
+    return 0
+
+  def unlock(self):
+    '''
+    Unlocks the real model if it has to be (when the model is virtually
+    unlocked)
+    '''
+    if not self.GetModelIsLocked() and self.real_locked is not False:
+      ret = self._model.SetModelIsLocked(False)
+      self.real_locked = ret != 0
+      self.real_results = False
+
+  def call(self, path, function, args, kwargs):
+    '''
+    Handles a call to the function at path
+    '''
+    name = path[-1]
+    if path[0] == "Analyze" and name == "RunAnalysis":
+      return self.run_analysis(function)
+    elif path[0] == "Results" and path[1] == "Setup":
+      return self.select(name, function, args, kwargs)
+    elif path[0] == "Results":
+      return self.get_results(path, function, args, kwargs)
+    elif name.startswith("Get") or name == "Count" or path[0] == "View":
+      return function(*args, **kwargs)
+    elif path[0] == "File":
+      ret = function(*args, **kwargs)
+      if name != "Save":
+        self.reset()
+      return ret
+    else:
+      return self.change(path, function, args, kwargs)
+
+  def InitializeNewModel(self, *args):
+    ret = self._model.InitializeNewModel(*args)
+    self.reset()
+    return ret
+
+  def change(self, path, function, args, kwargs):
+    '''
+    Passes on a call that changes the model, and records what it did
+    '''
+    self.unlock()
+    ret = function(*args, **kwargs)
+    status = ret[0] if isinstance(ret, (tuple, list)) else ret
+    if status != 0 or kwargs != {} or not self.track(path, args, ret):
+      # The call might have changed anything (even the lock)
+      self.changed()
+      self.real_locked = None
+      self.real_results = False
+
+    return ret
+
+  def track(self, path, args, ret):
+    '''
+    Records the changes that are part of the fingerprint. Returns False if the
+    change is not one of those.
+    '''
+    call = path[-2:]
+    if call == ("PointObj", "AddCartesian"):
+      key = ("point", ret[1])
+      if key not in self.ledger:
+        self.record(key, tuple(args[:3]))
+    elif call == ("PointObj", "SetRestraint") and args[2:] in ((), (0,)):
+      self.record(("restraint", args[0]), tuple(args[1]))
+    elif call == ("FrameObj", "AddByPoint"):
+      self.record(("frame", ret[1]), (args[0], args[1]) + tuple(args[3:4]))
+    elif call == ("FrameObj", "SetOutputStations") and args[6:] in ((), (0,)):
+      self.record(("stations", args[0]), tuple(args[1:6]))
+    elif call == ("FrameObj", "SetLoadPoint"):
+      # Defaults are csys "Global", relative distance, replace and item type 0
+      args = tuple(args) + ("Global", True, True, 0)[len(args) - 6:]
+      frame, pattern, load, replace, item_type = (args[0], args[1],
+        args[2:8], args[8], args[9])
+      if item_type != 0:
+        return False
+      key = ("loads", frame, pattern)
+      previous = () if replace else self.ledger.get(key, (INITIAL,))
+      self.record(key, previous + (load,))
+    elif call == ("FrameObj", "DeleteLoadPoint") and args[2:] in ((), (0,)):
+      self.record(("loads", args[0], args[1]), ())
+    else:
+      return False
+
+    return True
+
+  def run_analysis(self, function):
+    '''
+    Runs the analysis unless the model has not changed since the last one
+    '''
+    if self.fingerprint() == self.analyzed:
+      self.stats["hits"] += 1
+      self.locked = True
+      return 0
+
+    self.stats["misses"] += 1
+    return self.analyze(function)
+
+  def analyze(self, function = None):
+    '''
+    Runs the analysis on the real model
+    '''
+    if function is None:
+      function = self._model.Analyze.RunAnalysis
+    ret = function()
+    if ret == 0:
+      # The results only change if the model did
+      if self.analyzed != self.fingerprint():
+        self.result_cache.invalidate()
+      self.analyzed = self.fingerprint()
+      self.locked = self.real_locked = True
+      self.real_results = True
+    else:
+      self.result_cache.invalidate()
+      self.analyzed = None
+
+    return ret
+
+  def select(self, name, function, args, kwargs):
+    '''
+    Selects cases for output. The selection is only passed on to the real model
+    when results are retrieved from it.
+    '''
+    if name == "DeselectAllCasesAndCombosForOutput":
+      self.selected = frozenset()
+      return 0
+    elif name in ("SetCaseSelectedForOutput", "SetComboSelectedForOutput"):
+      selected = args[1] if len(args) > 1 else kwargs.get("Selected", True)
+      item = (name, args[0])
+      if selected and self.real_selected is not None and (item in
+        self.real_selected):
+        self.selected = self.selected | frozenset([item])
+        return 0
+
+      # Pass it on to find out whether it works
+      ret = function(*args, **kwargs)
+      if ret == 0:
+        update = operator.or_ if selected else operator.sub
+        self.selected = update(self.selected, frozenset([item]))
+        if self.real_selected is not None:
+          self.real_selected = update(self.real_selected, frozenset([item]))
+      return ret
+    else:
+      return function(*args, **kwargs)
+
+  def sync_selection(self):
+    '''
+    Makes the cases selected in the real model match the selection
+    '''
+    if self.real_selected == self.selected:
+      return
+    setup = self._model.Results.Setup
+    setup.DeselectAllCasesAndCombosForOutput()
+    for function, name in self.selected:
+      getattr(setup, function)(name, True)
+    self.real_selected = self.selected
+
+  def get_results(self, path, function, args, kwargs):
+    '''
+    Returns results, from the cache if we already have them. Nothing is served
+    from the cache while the model is unlocked (there are no results then).
+    '''
+    key = None
+    if self.GetModelIsLocked() and kwargs == {}:
+      try:
+        key = self.result_cache.key(path[-1], args, self.selected)
+        cached = self.result_cache.get(key)
+      except TypeError:
+        # Unhashable arguments
+        key = cached = None
+      if cached is not None:
+        return cached
+
+    # The analysis was skipped, but the real results are gone (so it did not
+    # save anything after all)
+    if self.locked and not self.real_results:
+      self.stats["hits"] -= 1
+      self.stats["misses"] += 1
+      self.analyze()
+    self.unlock()
+    self.sync_selection()
+    ret = function(*args, **kwargs)
+    if key is not None and ret[0] == 0:
+      self.result_cache.store(key, ret)
+
+    return ret
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+'''
+A layer between the simulation and SapModel that defers the changes to the
+point loads of frames (the robots moving around), and applies them in one
+batch just before they matter: before an analysis, before results are read,
+and before any call that is not known to be independent of them. Until then,
+the changes to each frame are only recorded, so they coalesce:
+  * Only the final loads of each frame are written, once.
+  * A frame whose final loads are the ones already written is not touched (a
+    load added and removed again costs nothing).
+Other changes (points, frames, output stations) are passed on right away,
+since their results (the names SAP2000 gives the new objects) are needed
+immediately. The number of calls recorded and actually made are kept in stats.
+Deferred calls return 0 when they are made. If one then fails when it is
+applied, the failure is kept in errors until it is taken with take_errors (see
+Sap2000.journal_errors), so that it can be logged with the other errors.
+'''
+from sap2000.sap_cache import SapProxy
+
+# Changes that are passed on without applying the deferred changes first (as
+# are the calls that only read from the model, except for the loads)
+INDEPENDENT = frozenset([("PointObj", "AddCartesian"), ("PointObj",
+  "SetRestraint"), ("FrameObj", "AddByPoint"), ("FrameObj",
+  "SetOutputStations")])
+
+class JournalSapObject(object):
+  '''
+  Wraps the SAP2000 COM object. Everything is forwarded to it, but SapModel is
+  replaced by the journal.
+  '''
+  def __init__(self, sap_com_object):
+    super(JournalSapObject, self).__init__()
+    self._sap_com_object = sap_com_object
+    self.SapModel = JournalSapModel(sap_com_object.SapModel)
+
+  def __getattr__(self, name):
+    return getattr(self._sap_com_object, name)
+
+  def ApplicationExit(self, *args):
+    self.SapModel.flush()
+    return self._sap_com_object.ApplicationExit(*args)
+
+class JournalSapModel(object):
+  '''
+  The journal itself. Use it exactly as SapModel.
+  '''
+  def __init__(self, sap_model):
+    super(JournalSapModel, self).__init__()
+    self._model = sap_model
+    self.stats = {"recorded" : 0, "made" : 0, "flushes" : 0}
+    self.errors = ''
+    self.reset()
+
+  def reset(self):
+    '''
+    Forgets everything about the model (a new model was created or opened)
+    '''
+    # The recorded loads of each frame {(frame, pattern) : (known, loads)}, in
+    # the order the frames were first changed. If known, the loads replace
+    # those of the frame, otherwise they are added to them.
+    self.pending = {}
+    self.order = []
+
+    # The loads of each frame in the model, as far as we know
+    self.written = {}
+
+  def __getattr__(self, name):
+    return SapProxy(self, getattr(self._model, name), (name,))
+
+  def call(self, path, function, args, kwargs):
+    '''
+    Handles a call to the function at path
+    '''
+    call = path[-2:]
+    if kwargs == {} and call == ("FrameObj", "SetLoadPoint"):
+      # Defaults are csys "Global", relative distance, replace and item type 0
+      args = tuple(args) + ("Global", True, True, 0)[len(args) - 6:]
+      if args[9] == 0:
+        self.record(args[0], args[1], args[2:8], args[8])
+        return 0
+    elif (kwargs == {} and call == ("FrameObj", "DeleteLoadPoint") and
+      args[2:] in ((), (0,))):
+      self.record(args[0], args[1], None, True)
+      return 0
+
+    # Unlocking is independent as well, but locking is not (the deferred
+    # changes could not be applied to a locked model)
+    reading = (path[-1].startswith("Get") and call != ("FrameObj",
+      "GetLoadPoint") and path[0] not in ("Results", "Analyze"))
+    unlocking = path == ("SetModelIsLocked",) and args[:1] == (False,)
+    if call in INDEPENDENT or reading or unlocking:
+      return function(*args, **kwargs)
+
+    self.flush()
+    ret = function(*args, **kwargs)
+    if path[0] == "File" and path[-1] != "Save":
+      self.reset()
+    return ret
+
+  def InitializeNewModel(self, *args):
+    self.flush()
+    ret = self._model.InitializeNewModel(*args)
+    self.reset()
+    return ret
+
+  def record(self, frame, pattern, load, replace):
+    '''
+    Records a load added to the frame (or all of its loads deleted, if the load
+    is None)
+    '''
+    self.stats["recorded"] += 1
+    key = (frame, pattern)
+    if key not in self.pending:
+      self.pending[key] = (False, ())
+      self.order.append(key)
+
+    known, loads = self.pending[key]
+    if load is None:
+      self.pending[key] = (True, ())
+    elif replace:
+      self.pending[key] = (True, (load,))
+    else:
+      self.pending[key] = (known, loads + (load,))
+
+  def flush(self):
+    '''
+    Applies the recorded changes to the model, each frame at once. Returns the
+    first non-zero return value, or 0.
+    '''
+    if self.order == []:
+      return 0
+    self.stats["flushes"] += 1
+
+    frame_obj = self._model.FrameObj
+    first = 0
+    for key in self.order:
+      frame, pattern = key
+      known, loads = self.pending[key]
+      if known and self.written.get(key) == loads:
+        continue
+
+      # Apply the loads (replacing those of the frame if known)
+      calls = []
+      if known and loads == ():
+        calls.append(("DeleteLoadPoint", (frame, pattern)))
+      for index, load in enumerate(loads):
+        calls.append(("SetLoadPoint", (frame, pattern) + load + (known and
+          index == 0, 0)))
+      for name, args in calls:
+        self.stats["made"] += 1
+        ret = getattr(frame_obj, name)(*args)
+        if ret != 0:
+          self.errors += ("Could not apply the deferred call to {} for frame "
+            "{} in load pattern {}. Value: {}\n").format(name, frame, pattern,
+            ret)
+          first = first or ret
+
+      # What the frame has now (unknown if loads were only added to it)
+      if known:
+        self.written[key] = loads
+      elif key in self.written:
+        self.written[key] = self.written[key] + loads
+
+    self.pending, self.order = {}, []
+    return first
+
+  def take_errors(self):
+    '''
+    Returns the failures of the deferred calls applied since the last time
+    (one line each, or '' if there were none), and forgets them
+    '''
+    errors, self.errors = self.errors, ''
+    return errors
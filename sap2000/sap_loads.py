@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+'''
+Bookkeeping of the point loads on the frames of the model. The loads are kept
+in Python, by frame and by the name of whoever placed them (the robots), so a
+load can be moved without reading the loads of the frame back from the model.
+SAP2000 can only delete all the point loads of a frame in a load pattern at
+once, so:
+  * Adding a load to a frame is one call (SetLoadPoint).
+  * Removing the only load of a frame is one call (DeleteLoadPoint).
+  * Removing one of several loads rewrites the frame: the first remaining load
+    replaces all of them, and the others are added back.
+'''
+
+class SapLoads(object):
+  '''
+  The point loads placed on frames, {(frame, load pattern) : {owner : (distance,
+  value)}}. Distances are absolute, from the i-end of the frame, and loads act
+  in the gravity direction.
+  '''
+  def __init__(self, sap_com_object):
+    super(SapLoads, self).__init__()
+    self._sap = sap_com_object
+
+    # Number of calls made to the model
+    self.stats = {"calls": 0}
+
+    self.loads = {}
+
+  def reset(self):
+    '''
+    Forgets all loads (for a new model)
+    '''
+    self.loads = {}
+
+  def get(self, frame, pattern):
+    '''
+    Returns the loads on the frame in the pattern {owner : (distance, value)}
+    '''
+    return dict(self.loads.get((frame, pattern), {}))
+
+  def _set(self, frame, pattern, distance, value, replace):
+    self.stats["calls"] += 1
+    return self._sap.SapModel.FrameObj.SetLoadPoint(frame, pattern, 1, 10,
+      distance, value, "Global", False, replace, 0)
+
+  def _write(self, frame, pattern):
+    '''
+    Writes all the loads of the frame in the pattern to the model. Returns the
+    first non-zero return value, or 0.
+    '''
+    loads = list(self.loads.get((frame, pattern), {}).values())
+    if loads == []:
+      self.stats["calls"] += 1
+      return self._sap.SapModel.FrameObj.DeleteLoadPoint(frame, pattern)
+
+    ret = 0
+    for index, (distance, value) in enumerate(loads):
+      result = self._set(frame, pattern, distance, value, index == 0)
+      ret = ret or result
+    return ret
+
+  def add(self, frame, pattern, owner, distance, value):
+    '''
+    Places the load of the owner on the frame (replacing any load of the owner
+    already there)
+    '''
+    loads = self.loads.setdefault((frame, pattern), {})
+    if owner in loads:
+      loads[owner] = (distance, value)
+      return self._write(frame, pattern)
+
+    # The first load replaces anything the model had on the frame
+    loads[owner] = (distance, value)
+    return self._set(frame, pattern, distance, value, len(loads) == 1)
+
+  def remove(self, frame, pattern, owner):
+    '''
+    Removes the load of the owner from the frame. Returns 1 if there was none.
+    '''
+    loads = self.loads.get((frame, pattern), {})
+    if owner not in loads:
+      return 1
+
+    del loads[owner]
+    if loads == {}:
+      del self.loads[(frame, pattern)]
+
+    return self._write(frame, pattern)
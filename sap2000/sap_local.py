@@ -0,0 +1,939 @@
+#!/usr/bin/env python
+'''
+A local stand in for the SAP2000 COM object. It implements the (small) part of
+the SAP2000 OAPI that the simulation uses, with the same names, arguments and
+return values, and analyzes the model with the NumPy frame solver found in
+sap_solver.py. This means that entire simulations can run without SAP2000 (and
+without Windows).
+
+Some simplifications to keep in mind:
+  * Units are not converted. Everything is in the units the model was created
+    with (kip_in_F for the simulation).
+  * The analysis is linear. Non-linear (P-delta) cases are solved as linear ones.
+  * Frames are rigidly connected at their end points and at any point object
+    lying along them (as SAP2000 does when meshing at intermediate joints).
+  * Wind (and any other automatic) loads are not generated.
+'''
+from collections import OrderedDict
+from sap2000.constants import MATERIAL_TYPES, UNITS
+from sap2000.sap2000 import Sap2000
+from sap2000.sap_solver import DEFAULT_SOLVER, SOLVERS, FrameLoads, element_axes
+import bisect, math, os, pickle
+import numpy as np
+
+# Points closer than this are merged into one when added
+MERGE_TOLERANCE = 0.001
+
+# Default material properties (E, poisson ratio, unit weight) in kip, in
+MATERIAL_DEFAULTS = {
+  MATERIAL_TYPES["MATERIAL_STEEL"]      : (29000, 0.3, 0.490 / 12**3),
+  MATERIAL_TYPES["MATERIAL_CONCRETE"]   : (3605, 0.2, 0.150 / 12**3),
+  MATERIAL_TYPES["MATERIAL_ALUMINUM"]   : (10000, 0.33, 0.169 / 12**3),
+  MATERIAL_TYPES["MATERIAL_COLDFORMED"] : (29500, 0.3, 0.490 / 12**3)}
+
+# Direction codes for loads (global x, y, z and gravity)
+GLOBAL_DIRECTIONS = {4 : (1,0,0), 5 : (0,1,0), 6 : (0,0,1), 10 : (0,0,-1)}
+
+class LocalSapObject(object):
+  '''
+  Replaces the "SAP2000v15.sapobject" COM object. The solver is one of the
+  names in sap_solver.SOLVERS.
+  '''
+  def __init__(self, solver = DEFAULT_SOLVER):
+    super(LocalSapObject, self).__init__()
+    self.SapModel = LocalSapModel(solver)
+
+  def ApplicationStart(self, units = UNITS["kip_in_F"], visible = True,
+    filename = ""):
+    self.SapModel.InitializeNewModel(units)
+    self.SapModel.File.NewBlank()
+    if filename != "" and os.path.exists(filename):
+      return self.SapModel.File.OpenFile(filename)
+    return 0
+
+  def ApplicationExit(self, save_file = True):
+    if save_file and self.SapModel.filename is not None:
+      self.SapModel.File.Save()
+    return 0
+
+  def Hide(self):
+    return 0
+
+  def Unhide(self):
+    return 0
+
+class LocalSapModel(object):
+  '''
+  Replaces SapModel. Stores the definition of the model (points, frames, loads,
+  properties and cases) along with the analysis results once the model has been
+  run.
+  '''
+  def __init__(self, solver = DEFAULT_SOLVER):
+    super(LocalSapModel, self).__init__()
+    self.solver = solver
+
+    self.File = LocalFile(self)
+    self.PointObj = LocalPointObj(self)
+    self.FrameObj = LocalFrameObj(self)
+    self.Analyze = LocalAnalyze(self)
+    self.Results = LocalResults(self)
+    self.LoadPatterns = LocalLoadPatterns(self)
+    self.LoadCases = LocalLoadCases(self)
+    self.PropMaterial = LocalPropMaterial(self)
+    self.PropFrame = LocalPropFrame(self)
+    self.View = LocalView()
+
+    # Objects which the simulation never uses, but that the Sap2000 class
+    # expects to find
+    self.GroupDef = LocalEmptyObject()
+    self.AreaObj = LocalEmptyObject()
+    self.AreaElm = LocalEmptyObject()
+    self.LineElm = LocalEmptyObject()
+    self.PointElm = self.PointObj
+
+    self.filename = None
+    self.units = UNITS["kip_in_F"]
+    self.blank()
+
+  def blank(self):
+    '''
+    Empties the model. This is the state of a new blank model in SAP2000: a DEAD
+    load pattern (with self weight) and case, and a default frame section.
+    '''
+    self.locked = False
+    self.results = None
+
+    # Point objects {name : (x,y,z)}, their restraints {name : (bool * 6)} and
+    # a hash of their location (for merging)
+    self.points = OrderedDict()
+    self.restraints = {}
+    self.point_hash = {}
+
+    # Frame objects {name : (i-point, j-point)}, their section, output stations
+    # and point loads
+    self.frames = OrderedDict()
+    self.frame_sections = {}
+    self.frame_stations = {}
+    self.frame_loads = {}
+
+    # Properties
+    self.materials = {"A992Fy50" : MATERIAL_DEFAULTS[MATERIAL_TYPES[
+      "MATERIAL_STEEL"]]}
+    self.sections = {"Default" : ("A992Fy50", 10.3, 15.3, 510, 0.506)}
+
+    # Load patterns {name : (type, self weight multiplier)} and cases {name :
+    # list of (pattern, scale)}
+    self.patterns = OrderedDict([("DEAD", (1, 1))])
+    self.cases = OrderedDict([("DEAD", [("DEAD", 1)])])
+    self.run_cases = set(self.cases)
+    self.output_cases = set()
+
+    # Counters for default names and the version of the geometry and properties
+    # (which tells us when the mesh and the stiffness need to be rebuilt)
+    self.next_point = 1
+    self.next_frame = 1
+    self.geometry = 0
+    self.mesh = None
+
+    # The solver of the last analysis (geometry, solver name, solver)
+    self.stiffness = None
+
+  def InitializeNewModel(self, units = UNITS["kip_in_F"]):
+    self.units = units
+    self.filename = None
+    self.blank()
+    return 0
+
+  def SetPresentUnits(self, units):
+    self.units = units
+    return 0
+
+  def GetPresentUnits(self):
+    return self.units
+
+  def GetModelIsLocked(self):
+    return self.locked
+
+  def SetModelIsLocked(self, lock_it = True):
+    self.locked = lock_it
+    if not lock_it:
+      self.results = None
+    return 0
+
+  def definition(self):
+    '''
+    Returns everything needed to rebuild the model (but not the results)
+    '''
+    keys = ("points", "restraints", "frames", "frame_sections",
+      "frame_stations", "frame_loads", "materials", "sections", "patterns",
+      "cases", "run_cases", "output_cases", "next_point", "next_frame", "units")
+    return {key : getattr(self, key) for key in keys}
+
+  def load_definition(self, definition):
+    '''
+    Restores a model from the output of definition()
+    '''
+    self.blank()
+    for key, value in definition.items():
+      setattr(self, key, value)
+    for name, coords in self.points.items():
+      self.point_hash.setdefault(self.point_key(coords), []).append(name)
+
+  def point_key(self, coords):
+    '''
+    Returns the hash bucket of a location
+    '''
+    return tuple(int(math.floor(c / MERGE_TOLERANCE)) for c in coords)
+
+  def find_point(self, coords):
+    '''
+    Returns the name of a point within MERGE_TOLERANCE of coords (or None)
+    '''
+    x, y, z = self.point_key(coords)
+    for dx in (-1, 0, 1):
+      for dy in (-1, 0, 1):
+        for dz in (-1, 0, 1):
+          for name in self.point_hash.get((x + dx, y + dy, z + dz), []):
+            other = self.points[name]
+            if math.sqrt(sum((a - b)**2 for a, b in zip(coords, other))) <= (
+              MERGE_TOLERANCE):
+              return name
+    return None
+
+  def frame_length(self, name):
+    i, j = self.frames[name]
+    return math.sqrt(sum((a - b)**2 for a, b in zip(self.points[i],
+      self.points[j])))
+
+  def get_mesh(self):
+    '''
+    Returns the analysis mesh, rebuilding it if the geometry has changed
+    '''
+    if self.mesh is None or self.mesh.geometry != self.geometry:
+      self.mesh = LocalMesh(self, self.mesh)
+    return self.mesh
+
+  def analyze(self):
+    '''
+    Runs all the cases flagged to be run and locks the model. As long as the
+    geometry (and the solver) stay the same, the factorized stiffness matrix of
+    the last analysis is reused, so only the loads change.
+    '''
+    mesh = self.get_mesh()
+    cases = [name for name in self.cases if name in self.run_cases]
+    loads = [mesh.loads(self, name) for name in cases]
+    if self.stiffness is None or self.stiffness[:2] != (mesh.geometry,
+      self.solver):
+      previous = self.stiffness[2] if self.stiffness is not None else None
+      self.stiffness = (mesh.geometry, self.solver, mesh.solver(self, previous))
+    solver = self.stiffness[2]
+    displacements = solver.solve(loads)
+    self.results = LocalResultsData(mesh, solver, cases, loads, displacements)
+    self.locked = True
+
+    return 0
+
+class LocalMesh(object):
+  '''
+  The analysis model: point objects become nodes, and every frame object is
+  split into elements at the point objects lying along it.
+  '''
+  def __init__(self, model, previous = None):
+    super(LocalMesh, self).__init__()
+    self.geometry = model.geometry
+
+    # Nodes
+    self.node_names = list(model.points)
+    self.nodes = {name : k for k, name in enumerate(self.node_names)}
+    self.coordinates = np.array([model.points[name] for name in
+      self.node_names], dtype=float).reshape(-1,3)
+    self.restraints = np.array([model.restraints.get(name, (False,) * 6) for
+      name in self.node_names], dtype=bool).reshape(-1,6)
+
+    # Nodes lying along each frame {frame : [(distance from i, node)]}. Points
+    # are never moved or deleted, so the previous mesh only has to be checked
+    # against the points added since
+    self.interior = OrderedDict()
+    old_frames = [name for name in model.frames if previous is not None and
+      name in previous.interior]
+    for name in old_frames:
+      self.interior[name] = list(previous.interior[name])
+    if old_frames != [] and len(previous.node_names) < len(self.node_names):
+      self.add_interior(model, old_frames, range(len(previous.node_names),
+        len(self.node_names)))
+    for name, (i, j) in model.frames.items():
+      if name not in self.interior:
+        self.interior[name] = self.split(self.nodes[i], self.nodes[j])
+
+    # Elements {frame : [element indeces]}, with the element's distance from the
+    # i-end of the frame and the names of the elements
+    self.connectivity = []
+    self.frame_elements = OrderedDict()
+    self.offsets = []
+    self.element_names = []
+    self.element_frames = []
+    for name, (i, j) in model.frames.items():
+      nodes = [self.nodes[i]] + [node for dist, node in self.interior[name]] + [
+        self.nodes[j]]
+      offsets = [0] + [dist for dist, node in self.interior[name]]
+      self.frame_elements[name] = []
+      for k in range(len(nodes) - 1):
+        self.frame_elements[name].append(len(self.connectivity))
+        self.connectivity.append((nodes[k], nodes[k + 1]))
+        self.offsets.append(offsets[k])
+        self.element_frames.append(name)
+        self.element_names.append(name if len(nodes) == 2 else "{}-{}".format(
+          name, k + 1))
+    self.elements = {name : k for k, name in enumerate(self.element_names)}
+
+    self.properties, self.weights = self.section_properties(model)
+
+  def split(self, i, j):
+    '''
+    Returns the nodes lying on the segment from node i to node j, as a sorted
+    list of (distance from i, node)
+    '''
+    start, end = self.coordinates[i], self.coordinates[j]
+    v = end - start
+    length = math.sqrt(np.dot(v, v))
+
+    # Projection of every node onto the segment and its distance to it
+    along = np.dot(self.coordinates - start, v) / length
+    offset = self.coordinates - start - np.outer(along / length, v)
+    distance = np.sqrt((offset**2).sum(axis=1))
+    inside = ((distance <= MERGE_TOLERANCE) & (along > MERGE_TOLERANCE) &
+      (along < length - MERGE_TOLERANCE))
+    inside[[i, j]] = False
+
+    return sorted(zip(along[inside].tolist(), np.flatnonzero(inside).tolist()))
+
+  def add_interior(self, model, frames, nodes):
+    '''
+    Adds the nodes (indeces) that lie along any of the frames to their interior
+    nodes. Each node is checked against all of the frames at once.
+    '''
+    ends = np.array([[self.nodes[point] for point in model.frames[name]]
+      for name in frames], dtype=int).reshape(-1,2)
+    starts = self.coordinates[ends[:,0]]
+    v = self.coordinates[ends[:,1]] - starts
+    lengths = np.sqrt((v**2).sum(axis=1))
+
+    for node in nodes:
+      along = ((self.coordinates[node] - starts) * v).sum(axis=1) / lengths
+      offset = self.coordinates[node] - starts - (along / lengths)[:,None] * v
+      distance = np.sqrt((offset**2).sum(axis=1))
+      inside = ((distance <= MERGE_TOLERANCE) & (along > MERGE_TOLERANCE) &
+        (along < lengths - MERGE_TOLERANCE) & (ends[:,0] != node) &
+        (ends[:,1] != node))
+      for k in np.flatnonzero(inside).tolist():
+        bisect.insort(self.interior[frames[k]], (float(along[k]), int(node)))
+
+  def section_properties(self, model):
+    '''
+    Returns the (m,6) section properties of the elements and the (m,) weight per
+    unit length
+    '''
+    properties, weights = [], []
+    for frame in self.element_frames:
+      material, A, I22, I33, J = model.sections[model.frame_sections[frame]]
+      E, U, W = model.materials[material]
+      properties.append((E, E / (2 * (1 + U)), A, I22, I33, J))
+      weights.append(W * A)
+
+    return (np.array(properties, dtype=float).reshape(-1,6),
+      np.array(weights, dtype=float))
+
+  def solver(self, model, previous = None):
+    '''
+    Returns a solver for this mesh. The previous solver (of the model before it
+    last changed) lets solvers that support it update their factorization.
+    '''
+    return SOLVERS[model.solver](self.coordinates, self.restraints,
+      self.connectivity, self.properties, previous)
+
+  def locate(self, frame, distance):
+    '''
+    Returns the element of the frame that contains the point at distance from
+    the i-end of the frame, and the distance from the i-end of the element
+    '''
+    elements = self.frame_elements[frame]
+    k = max(bisect.bisect_right([self.offsets[e] for e in elements],
+      distance) - 1, 0)
+    return elements[k], distance - self.offsets[elements[k]]
+
+  def loads(self, model, case):
+    '''
+    Returns the FrameLoads of the named load case
+    '''
+    loads = FrameLoads(len(self.node_names), len(self.connectivity))
+
+    for pattern, scale in model.cases[case]:
+      # Self weight
+      load_type, multiplier = model.patterns[pattern]
+      loads.uniform[:,2] -= scale * multiplier * self.weights
+
+      # Point loads on frames
+      for frame, frame_loads in model.frame_loads.items():
+        for load in frame_loads:
+          load_pattern, my_type, csys, direction, rel, dist, value = load
+          if load_pattern != pattern:
+            continue
+          element, distance = self.locate(frame, dist)
+          if direction in GLOBAL_DIRECTIONS:
+            vector = np.array(GLOBAL_DIRECTIONS[direction], dtype=float)
+          else:
+            i, j = self.connectivity[element]
+            axes = self.local_axes(i, j)
+            vector = axes[direction - 1]
+          vector = vector * value * scale
+          if my_type == 1:
+            loads.add_point(element, distance, force = vector)
+          else:
+            loads.add_point(element, distance, moment = vector)
+
+    return loads
+
+  def local_axes(self, i, j):
+    '''
+    Returns the local axes of the element from node i to node j
+    '''
+    lengths, axes = element_axes(self.coordinates[[i]], self.coordinates[[j]])
+    return axes[0]
+
+  def stations(self, model, frame):
+    '''
+    Returns the output stations of the frame as a list of (element, distances
+    from the i-end of the element)
+    '''
+    my_type, max_size, min_sections, no_ends, no_loads = (
+      model.frame_stations.get(frame, (2, 24, 3, False, False)))
+    length = model.frame_length(frame)
+
+    # Evenly spaced stations along the frame
+    if my_type == 1:
+      segments = max(int(math.ceil(length / max_size)), 1)
+    else:
+      segments = max(min_sections - 1, 1)
+    frame_stations = [length * k / segments for k in range(segments + 1)]
+
+    # Point loads
+    if not no_loads:
+      frame_stations += [load[5] for load in model.frame_loads.get(frame, [])]
+
+    stations = []
+    for element in self.frame_elements[frame]:
+      start = self.offsets[element]
+      i, j = self.connectivity[element]
+      end = start + math.sqrt(((self.coordinates[j] - self.coordinates[i])**2
+        ).sum())
+      local = [s - start for s in frame_stations if start - MERGE_TOLERANCE <=
+        s <= end + MERGE_TOLERANCE]
+      if not no_ends:
+        local += [0, end - start]
+      local = sorted(set(round(min(max(s, 0), end - start), 9) for s in local))
+      stations.append((element, local))
+
+    return stations
+
+class LocalResultsData(object):
+  '''
+  The results of an analysis. Frame forces are only calculated when they are
+  asked for.
+  '''
+  def __init__(self, mesh, solver, cases, loads, displacements):
+    super(LocalResultsData, self).__init__()
+    self.mesh = mesh
+    self.solver = solver
+    self.cases = cases
+    self.loads = dict(zip(cases, loads))
+    self.displacements = dict(zip(cases, displacements))
+    self.end_forces = {case : solver.end_forces(self.displacements[case],
+      self.loads[case]) for case in cases}
+
+    # Calculated frame forces {(frame, case) : rows}
+    self.frame_forces = {}
+
+  def frame_force(self, model, frame, case):
+    '''
+    Returns the list of rows (ObjSta, Elm, ElmSta, P, V2, V3, T, M2, M3) for the
+    frame in the given case
+    '''
+    key = (frame, case)
+    if key not in self.frame_forces:
+      rows = []
+      for element, stations in self.mesh.stations(model, frame):
+        forces = self.solver.station_forces(element, stations,
+          self.end_forces[case], self.loads[case])
+        offset = self.mesh.offsets[element]
+        for station, values in zip(stations, forces):
+          rows.append((offset + station, self.mesh.element_names[element],
+            station) + tuple(float(v) for v in values))
+      self.frame_forces[key] = rows
+
+    return self.frame_forces[key]
+
+class LocalFile(object):
+  def __init__(self, model):
+    super(LocalFile, self).__init__()
+    self._model = model
+
+  def NewBlank(self):
+    self._model.blank()
+    return 0
+
+  def Save(self, filename = ""):
+    '''
+    Saves the definition of the model (pickled)
+    '''
+    if filename == "":
+      filename = self._model.filename
+    if filename is None:
+      return 1
+
+    with open(filename, "wb") as model_file:
+      pickle.dump(self._model.definition(), model_file)
+    self._model.filename = filename
+    return 0
+
+  def OpenFile(self, filename):
+    if not os.path.exists(filename):
+      return 1
+
+    with open(filename, "rb") as model_file:
+      self._model.load_definition(pickle.load(model_file))
+    self._model.filename = filename
+    return 0
+
+class LocalObjects(object):
+  '''
+  Base for the point and frame objects
+  '''
+  def __init__(self, model, items):
+    super(LocalObjects, self).__init__()
+    self._model = model
+    self._items = items
+
+  def GetNameList(self, number_names = 0, names = None):
+    names = getattr(self._model, self._items)
+    return 0, len(names), tuple(names)
+
+  def Count(self, *args):
+    return len(getattr(self._model, self._items))
+
+class LocalPointObj(LocalObjects):
+  def __init__(self, model):
+    super(LocalPointObj, self).__init__(model, "points")
+
+  def AddCartesian(self, x, y, z, name = "", user_name = "", csys = "Global",
+    merge_off = False, merge_number = 0):
+    model = self._model
+    if model.locked:
+      return 1, ""
+
+    # Merge with an existing point
+    coords = (float(x), float(y), float(z))
+    if not merge_off:
+      existing = model.find_point(coords)
+      if existing is not None:
+        return 0, existing
+
+    # Name the point (the user name is ignored if it is already taken)
+    if user_name == "" or user_name in model.points:
+      while str(model.next_point) in model.points:
+        model.next_point += 1
+      user_name = str(model.next_point)
+
+    model.points[user_name] = coords
+    model.point_hash.setdefault(model.point_key(coords), []).append(user_name)
+    model.geometry += 1
+    return 0, user_name
+
+  def GetCoordCartesian(self, name, x = 0, y = 0, z = 0, csys = "Global"):
+    if name not in self._model.points:
+      return 1, 0, 0, 0
+    return (0,) + self._model.points[name]
+
+  def SetRestraint(self, name, value, item_type = 0):
+    model = self._model
+    if model.locked or name not in model.points:
+      return 1, value
+    model.restraints[name] = tuple(bool(v) for v in value)
+    model.geometry += 1
+    return 0, value
+
+  def GetRestraint(self, name, value = None):
+    if name not in self._model.points:
+      return 1, value
+    return 0, self._model.restraints.get(name, (False,) * 6)
+
+class LocalFrameObj(LocalObjects):
+  def __init__(self, model):
+    super(LocalFrameObj, self).__init__(model, "frames")
+
+  def AddByPoint(self, point_1, point_2, name = "", prop_name = "Default",
+    user_name = ""):
+    model = self._model
+    if (model.locked or point_1 not in model.points or point_2 not in
+      model.points or point_1 == point_2 or prop_name not in model.sections):
+      return 1, ""
+
+    if user_name == "" or user_name in model.frames:
+      while str(model.next_frame) in model.frames:
+        model.next_frame += 1
+      user_name = str(model.next_frame)
+
+    model.frames[user_name] = (point_1, point_2)
+    model.frame_sections[user_name] = prop_name
+    model.geometry += 1
+    return 0, user_name
+
+  def GetPoints(self, name, *args):
+    if name not in self._model.frames:
+      return 1, "", ""
+    return (0,) + self._model.frames[name]
+
+  def GetSection(self, name, *args):
+    if name not in self._model.frames:
+      return 1, "", ""
+    return 0, self._model.frame_sections[name], ""
+
+  def GetLocalAxes(self, name, *args):
+    '''
+    Local axes are never rotated in the local model
+    '''
+    if name not in self._model.frames:
+      return 1, 0, False
+    return 0, 0, False
+
+  def GetElm(self, name, *args):
+    if name not in self._model.frames:
+      return 1, 0, ()
+    mesh = self._model.get_mesh()
+    names = tuple(mesh.element_names[e] for e in mesh.frame_elements[name])
+    return 0, len(names), names
+
+  def SetOutputStations(self, name, my_type, max_seg_size, min_sections,
+    no_output_at_ends = False, no_output_at_loads = False, item_type = 0):
+    model = self._model
+    if model.locked or name not in model.frames:
+      return 1
+    model.frame_stations[name] = (my_type, max_seg_size, min_sections,
+      no_output_at_ends, no_output_at_loads)
+    return 0
+
+  def SetLoadPoint(self, name, load_pat, my_type, direction, dist, val,
+    csys = "Global", rel_dist = True, replace = True, item_type = 0):
+    model = self._model
+    if (model.locked or name not in model.frames or load_pat not in
+      model.patterns):
+      return 1
+
+    # Store both the relative and the absolute distance
+    length = model.frame_length(name)
+    if rel_dist:
+      rel, absolute = dist, dist * length
+    else:
+      rel, absolute = dist / length, dist
+    if rel < -1e-9 or rel > 1 + 1e-9:
+      return 1
+
+    loads = model.frame_loads.setdefault(name, [])
+    if replace:
+      loads[:] = [load for load in loads if load[0] != load_pat]
+    loads.append((load_pat, my_type, csys, direction, rel, absolute, val))
+    return 0
+
+  def GetLoadPoint(self, name, *args):
+    '''
+    Returns ret, number_items, frame_names, loadpat_names, types, coordinates,
+    directions, rel_dists, dists, loads
+    '''
+    if name not in self._model.frames:
+      return (1, 0) + ((),) * 8
+    loads = self._model.frame_loads.get(name, [])
+    columns = tuple(zip(*loads)) if loads != [] else ((),) * 7
+    return (0, len(loads), (name,) * len(loads)) + columns
+
+  def DeleteLoadPoint(self, name, load_pat, item_type = 0):
+    model = self._model
+    if model.locked or name not in model.frames:
+      return 1
+    loads = model.frame_loads.get(name, [])
+    loads[:] = [load for load in loads if load[0] != load_pat]
+    return 0
+
+class LocalAnalyze(object):
+  def __init__(self, model):
+    super(LocalAnalyze, self).__init__()
+    self._model = model
+
+  def RunAnalysis(self):
+    return self._model.analyze()
+
+  def DeleteResults(self, Name = "", All = False):
+    self._model.SetModelIsLocked(False)
+    return 0
+
+  def SetActiveDOF(self, DOF):
+    return 0, DOF
+
+  def SetRunCaseFlag(self, name, run, all_cases = False):
+    model = self._model
+    names = list(model.cases) if all_cases else [name]
+    if any(case not in model.cases for case in names):
+      return 1
+    for case in names:
+      if run:
+        model.run_cases.add(case)
+      else:
+        model.run_cases.discard(case)
+    return 0
+
+  def SetSolverOption_1(self, *args):
+    return 0
+
+class LocalResults(object):
+  '''
+  Analysis results. Only the results for the cases selected for output are
+  returned.
+  '''
+  def __init__(self, model):
+    super(LocalResults, self).__init__()
+    self._model = model
+    self.Setup = LocalResultsSetup(model)
+
+  def available(self):
+    '''
+    Returns the selected cases that have results
+    '''
+    results = self._model.results
+    return [case for case in results.cases if case in self._model.output_cases]
+
+  def names(self, name, item_type, items):
+    '''
+    Returns the object names referred to by name (object, element or the group
+    "ALL")
+    '''
+    mesh = self._model.results.mesh
+    if item_type == 0 and name in items:
+      return [name]
+    elif item_type == 1 and name in mesh.elements:
+      return [name]
+    elif item_type == 2 and name.upper() == "ALL":
+      return list(items)
+    return None
+
+  def FrameForce(self, name, item_type_elm, *args):
+    '''
+    Returns ret, NumberResults, Obj, ObjSta, Elm, ElmSta, LoadCase, StepType,
+    StepNum, P, V2, V3, T, M2, M3
+    '''
+    model = self._model
+    if model.results is None:
+      return (1, 0) + ((),) * 13
+    names = self.names(name, item_type_elm, model.frames)
+    if names is None:
+      return (1, 0) + ((),) * 13
+
+    mesh = model.results.mesh
+    rows = []
+    for case in self.available():
+      for frame in names:
+        if item_type_elm == 1:
+          frame = mesh.element_frames[mesh.elements[name]]
+        for row in model.results.frame_force(model, frame, case):
+          if item_type_elm != 1 or row[1] == name:
+            rows.append((frame, row[0], row[1], row[2], case, "", 0) + row[3:])
+
+    columns = tuple(zip(*rows)) if rows != [] else ((),) * 13
+    return (0, len(rows)) + columns
+
+  def JointDisplAbs(self, name, item_type_elm, *args):
+    '''
+    Returns ret, NumberResults, Obj, Elm, LoadCase, StepType, StepNum, U1, U2,
+    U3, R1, R2, R3
+    '''
+    model = self._model
+    if model.results is None:
+      return (1, 0) + ((),) * 11
+    names = self.names(name, 2 if item_type_elm == 2 else 0, model.points)
+    if names is None:
+      return (1, 0) + ((),) * 11
+
+    mesh = model.results.mesh
+    rows = []
+    for case in self.available():
+      displacements = model.results.displacements[case]
+      for point in names:
+        values = displacements[mesh.nodes[point]] if point in mesh.nodes else (
+          np.zeros(6))
+        rows.append((point, point, case, "", 0) + tuple(float(v) for v in
+          values))
+
+    columns = tuple(zip(*rows)) if rows != [] else ((),) * 11
+    return (0, len(rows)) + columns
+
+class LocalResultsSetup(object):
+  def __init__(self, model):
+    super(LocalResultsSetup, self).__init__()
+    self._model = model
+
+  def DeselectAllCasesAndCombosForOutput(self):
+    self._model.output_cases = set()
+    return 0
+
+  def SetCaseSelectedForOutput(self, name, selected = True):
+    if name not in self._model.cases:
+      return 1
+    if selected:
+      self._model.output_cases.add(name)
+    else:
+      self._model.output_cases.discard(name)
+    return 0
+
+  def SetComboSelectedForOutput(self, name, selected = True):
+    '''
+    Combinations are not supported by the local model
+    '''
+    return 1
+
+class LocalLoadPatterns(LocalObjects):
+  def __init__(self, model):
+    super(LocalLoadPatterns, self).__init__(model, "patterns")
+
+  def Add(self, name, my_type, self_wt_multiplier = 0, add_load_case = True):
+    model = self._model
+    if model.locked or name in model.patterns:
+      return 1
+    model.patterns[name] = (my_type, self_wt_multiplier)
+    if add_load_case:
+      model.cases[name] = [(name, 1)]
+      model.run_cases.add(name)
+    return 0
+
+class LocalLoadCases(LocalObjects):
+  def __init__(self, model):
+    super(LocalLoadCases, self).__init__(model, "cases")
+    self.StaticLinear = LocalStaticCase(model)
+    self.StaticNonlinear = LocalStaticCase(model)
+
+class LocalStaticCase(object):
+  '''
+  Static load cases. Both linear and non-linear cases are solved linearly.
+  '''
+  def __init__(self, model):
+    super(LocalStaticCase, self).__init__()
+    self._model = model
+
+  def SetCase(self, name):
+    model = self._model
+    if model.locked:
+      return 1
+    model.cases[name] = []
+    model.run_cases.add(name)
+    return 0
+
+  def SetGeometricNonlinearity(self, name, my_type):
+    return 0 if name in self._model.cases else 1
+
+  def SetLoads(self, name, number_loads, load_type, load_name, sf):
+    model = self._model
+    if (model.locked or name not in model.cases or any(pattern not in
+      model.patterns for pattern in load_name)):
+      return 1, load_type, load_name, sf
+    model.cases[name] = list(zip(load_name, sf))
+    return 0, load_type, load_name, sf
+
+class LocalPropMaterial(object):
+  def __init__(self, model):
+    super(LocalPropMaterial, self).__init__()
+    self._model = model
+
+  def AddQuick(self, name, mat_type, *args):
+    '''
+    Adds a material with the default properties of its type. The last argument
+    is the user name (as in SAP2000)
+    '''
+    model = self._model
+    if model.locked or mat_type not in MATERIAL_DEFAULTS:
+      return 1, ""
+    user_name = args[-1] if len(args) > 0 and args[-1] != "" else name
+    model.materials[user_name] = MATERIAL_DEFAULTS[mat_type]
+    model.geometry += 1
+    return 0, user_name
+
+  def SetMPIsotropic(self, name, e, u, a, temp = 0):
+    model = self._model
+    if model.locked or name not in model.materials:
+      return 1
+    model.materials[name] = (e, u, model.materials[name][2])
+    model.geometry += 1
+    return 0
+
+  def SetWeightAndMass(self, name, my_option, value, temp = 0):
+    model = self._model
+    if model.locked or name not in model.materials or my_option != 1:
+      return 1
+    model.materials[name] = model.materials[name][:2] + (value,)
+    model.geometry += 1
+    return 0
+
+class LocalPropFrame(object):
+  def __init__(self, model):
+    super(LocalPropFrame, self).__init__()
+    self._model = model
+
+  def SetPipe(self, name, mat_prop, t3, tw, *args):
+    '''
+    Adds a pipe section with outside diameter t3 and wall thickness tw
+    '''
+    model = self._model
+    if model.locked or mat_prop not in model.materials:
+      return 1
+    outside, inside = t3 / 2, t3 / 2 - tw
+    area = math.pi * (outside**2 - inside**2)
+    inertia = math.pi * (outside**4 - inside**4) / 4
+    model.sections[name] = (mat_prop, area, inertia, inertia, 2 * inertia)
+    model.geometry += 1
+    return 0
+
+  def SetGeneral(self, name, mat_prop, t3, t2, area, as2, as3, torsion, i22,
+    i33, *args):
+    model = self._model
+    if model.locked or mat_prop not in model.materials:
+      return 1
+    model.sections[name] = (mat_prop, area, i22, i33, torsion)
+    model.geometry += 1
+    return 0
+
+class LocalView(object):
+  def RefreshView(self, window = 0, zoom = True):
+    return 0
+
+  def RefreshWindow(self, window = 0):
+    return 0
+
+class LocalEmptyObject(object):
+  '''
+  Object types that are never used in the local model
+  '''
+  def GetNameList(self, *args):
+    return 0, 0, ()
+
+  def Count(self, *args):
+    return 0
+
+class LocalSap2000(Sap2000):
+  '''
+  The Sap2000 program, running on the local model instead of SAP2000
+  '''
+  def __init__(self, solver = DEFAULT_SOLVER, cache_analysis = True,
+    defer_loads = False):
+    super(LocalSap2000, self).__init__(LocalSapObject(solver), cache_analysis,
+      defer_loads)
+
+  def reset(self, units="kip_in_F", template = None):
+    # There is no template unless one was saved by a previous local run
+    if template is not None and not os.path.exists(template):
+      template = None
+    super(LocalSap2000, self).reset(units, template)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+'''
+Records the responses of SapModel during a run, and plays them back without
+SAP2000. Code that reads results (e.g. sap_results.py) can then be checked
+against responses from a real model:
+
+  recorder = SapRecorder(sap_com_object)
+  ... use recorder in place of the COM object, then recorder.save(filename)
+
+  program = Sap2000(RecordedSapObject(filename), cache_analysis=False)
+'''
+import pickle
+
+def freeze(value):
+  '''
+  Turns lists (e.g. of DOFs) into tuples so that arguments can be used as keys
+  '''
+  if isinstance(value, (list, tuple)):
+    return tuple(freeze(item) for item in value)
+  return value
+
+class RecordingProxy(object):
+  '''
+  Stands in for any object (or function) below SapModel, and records the
+  response to every call by (path, arguments)
+  '''
+  def __init__(self, sap_object, path, responses):
+    super(RecordingProxy, self).__init__()
+    self._obj = sap_object
+    self._path = path
+    self._responses = responses
+
+  def __getattr__(self, name):
+    return RecordingProxy(getattr(self._obj, name), self._path + (name,),
+      self._responses)
+
+  def __call__(self, *args):
+    ret = self._obj(*args)
+    self._responses[(self._path, freeze(args))] = ret
+    return ret
+
+class SapRecorder(object):
+  '''
+  Wraps the SAP2000 COM object. Everything is forwarded to it, and the
+  responses of SapModel are recorded.
+  '''
+  def __init__(self, sap_com_object):
+    super(SapRecorder, self).__init__()
+    self._sap_com_object = sap_com_object
+    self.responses = {}
+    self.SapModel = RecordingProxy(sap_com_object.SapModel, (), self.responses)
+
+  def __getattr__(self, name):
+    return getattr(self._sap_com_object, name)
+
+  def save(self, filename):
+    with open(filename, "wb") as f:
+      pickle.dump(self.responses, f)
+
+class RecordedProxy(object):
+  '''
+  Answers calls with the recorded response to the same call
+  '''
+  def __init__(self, path, responses):
+    super(RecordedProxy, self).__init__()
+    self._path = path
+    self._responses = responses
+
+  def __getattr__(self, name):
+    return RecordedProxy(self._path + (name,), self._responses)
+
+  def __call__(self, *args):
+    key = (self._path, freeze(args))
+    if key not in self._responses:
+      raise LookupError("No recorded response for {}{}".format(
+        ".".join(self._path), args))
+    return self._responses[key]
+
+class RecordedSapObject(object):
+  '''
+  A fake SAP2000 COM object. responses is either a dictionary {(path,
+  arguments) : response} or the name of a file saved by SapRecorder.
+  '''
+  def __init__(self, responses):
+    super(RecordedSapObject, self).__init__()
+    if not isinstance(responses, dict):
+      with open(responses, "rb") as f:
+        responses = pickle.load(f)
+    self.responses = responses
+    self.SapModel = RecordedProxy((), responses)
+
+  def ApplicationStart(self, *args):
+    return 0
+
+  def ApplicationExit(self, *args):
+    return 0
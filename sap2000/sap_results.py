@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+'''
+Bulk retrieval of analysis results. Instead of asking for the results of one
+object at a time (one COM call each), the results of every object are retrieved
+in a single call through the group "ALL", and parsed into NumPy arrays which
+can be indexed by object name. The parsed tables are kept for as long as the
+model is not changed (see ResultsSapModel).
+'''
+from sap2000.sap_cache import SapProxy
+import numpy as np
+
+class ResultsTable(object):
+  '''
+  Results of many objects, one row per output station (and load case). The rows
+  of each object are found through its name.
+  '''
+  def __init__(self, names, values):
+    super(ResultsTable, self).__init__()
+    self.names = np.array(names, dtype=str)
+    self.values = values
+
+    # The rows sorted by object (in the order returned for each object), and
+    # where the rows of each object start
+    unique, inverse = np.unique(self.names, return_inverse=True)
+    self.unique = unique
+    self.objects = unique.tolist()
+    self.order = np.argsort(inverse, kind="stable")
+    counts = np.bincount(inverse, minlength=len(unique))
+    self.starts = np.cumsum(counts) - counts
+
+    # Rows of each object {name : array of row indeces}
+    self.index = dict(zip(self.objects, np.split(self.order, self.starts[1:])))
+
+  def __contains__(self, name):
+    return name in self.index
+
+  def __len__(self):
+    return len(self.names)
+
+  def rows(self, name):
+    '''
+    Returns the indeces of the rows of the named object (empty if there are no
+    results for it)
+    '''
+    return self.index.get(name, np.zeros(0, dtype=int))
+
+  def first_rows(self, names):
+    '''
+    Returns the index of the first row of each of the named objects, or -1 for
+    the objects without results
+    '''
+    names = np.asarray(names, dtype=str)
+    if len(self.unique) == 0:
+      return np.full(len(names), -1)
+    positions = np.minimum(np.searchsorted(self.unique, names),
+      len(self.unique) - 1)
+    found = self.unique[positions] == names
+    return np.where(found, self.order[self.starts[positions]], -1)
+
+class FrameForces(ResultsTable):
+  '''
+  Parsed output of Results.FrameForce. values is a (k,6) array with P, V2, V3,
+  T, M2 and M3 at each station, stations the distances of the stations from the
+  i-end of the frame objects.
+  '''
+  def __init__(self, results):
+    # Format (ret[0], number_results[1], obj_names[2], i_end distances[3],
+    # elm_names[4], elm_dist[5], load_cases[6], step_types[7], step_nums[8],
+    # Ps[9], V2s[10], V3s[11], Ts[12], M2s[13], M3s[14]
+    values = np.array(results[9:15], dtype=float).reshape(6,-1).T
+    super(FrameForces, self).__init__(results[2], values)
+    self.stations = np.array(results[3], dtype=float)
+    self.elements = tuple(results[4])
+    self.element_stations = np.array(results[5], dtype=float)
+    self.cases = tuple(results[6])
+    self._max_moments = None
+
+  def max_moments(self):
+    '''
+    Returns the largest moment sqrt(m22^2 + m33^2) along each frame {name :
+    moment}, reduced over all the stations of all the frames at once
+    '''
+    if self._max_moments is None:
+      moments = np.sqrt(self.values[:,4]**2 + self.values[:,5]**2)
+      if len(moments) == 0:
+        self._max_moments = {}
+      else:
+        maxima = np.maximum.reduceat(moments[self.order], self.starts)
+        self._max_moments = dict(zip(self.objects, maxima.tolist()))
+
+    return self._max_moments
+
+class JointDisplacements(ResultsTable):
+  '''
+  Parsed output of Results.JointDisplAbs (or JointDispl). values is a (k,6)
+  array with U1, U2, U3, R1, R2 and R3 of each joint.
+  '''
+  def __init__(self, results):
+    # Format (ret[0], number_results[1], obj_names[2], elm_names[3],
+    # load_cases[4], step_types[5], step_nums[6], U1s[7], U2s[8], U3s[9],
+    # R1s[10], R2s[11], R3s[12])
+    values = np.array(results[7:13], dtype=float).reshape(6,-1).T
+    super(JointDisplacements, self).__init__(results[2], values)
+    self.cases = tuple(results[4])
+
+class ResultsSapObject(object):
+  '''
+  Wraps the SAP2000 COM object. Everything is forwarded to it, but SapModel is
+  replaced by a ResultsSapModel.
+  '''
+  def __init__(self, sap_com_object):
+    super(ResultsSapObject, self).__init__()
+    self._sap_com_object = sap_com_object
+    self.SapModel = ResultsSapModel(sap_com_object.SapModel)
+
+  def __getattr__(self, name):
+    return getattr(self._sap_com_object, name)
+
+class ResultsSapModel(object):
+  '''
+  Passes every call on to SapModel, and counts the calls that can change the
+  results (anything but reading the model or its results): analyzing, unlocking,
+  changing the model or the cases selected for output. The tables of SapResults
+  are kept for as long as this generation stays the same.
+  '''
+  def __init__(self, sap_model):
+    super(ResultsSapModel, self).__init__()
+    self._model = sap_model
+    self.generation = 0
+
+  def __getattr__(self, name):
+    return SapProxy(self, getattr(self._model, name), (name,))
+
+  def call(self, path, function, args, kwargs):
+    name = path[-1]
+    reading = ((path[0] == "Results" and path[1] != "Setup") or
+      name.startswith("Get") or name == "Count" or path[0] == "View")
+    if not reading:
+      self.generation += 1
+    return function(*args, **kwargs)
+
+  def InitializeNewModel(self, *args):
+    self.generation += 1
+    return self._model.InitializeNewModel(*args)
+
+class SapResults(object):
+  '''
+  Results of all the objects in the model for the cases selected for output.
+  The parsed tables are kept until the model is changed (or analyzed), and
+  parsed again only if the model then returns new results.
+  '''
+  def __init__(self, sap_com_object, group = "ALL"):
+    super(SapResults, self).__init__()
+
+    self._sap = sap_com_object
+    self._obj = sap_com_object.SapModel.Results
+    self.group = group
+
+    # The layer that counts the changes to the model (or None, in which case
+    # the model is asked every time)
+    self._counter = (sap_com_object.SapModel if isinstance(
+      sap_com_object.SapModel, ResultsSapModel) else None)
+
+    # Last raw results and their parsed tables, with the generation of the
+    # model they were retrieved in {function : (generation, raw, table)}
+    self._parsed = {}
+
+  def _table(self, function, table_class):
+    '''
+    Retrieves the results of the function for every element of the group (item
+    type 2) and returns them parsed into the table class, or None if it failed
+    '''
+    # Nothing that could change the results happened since they were parsed
+    generation = None if self._counter is None else self._counter.generation
+    parsed, raw, table = self._parsed.get(function, (None, None, None))
+    if generation is not None and parsed == generation:
+      return table
+
+    results = getattr(self._obj, function)(self.group, 2)
+    if results[0] != 0:
+      self._parsed.pop(function, None)
+      return None
+
+    # The caching layer returns the very same results until they change
+    if raw is not results:
+      table = table_class(results)
+    self._parsed[function] = (generation, results, table)
+
+    return table
+
+  def frame_forces(self):
+    '''
+    Returns the FrameForces of every frame (or None if they are not available)
+    '''
+    return self._table("FrameForce", FrameForces)
+
+  def joint_displacements(self):
+    '''
+    Returns the absolute JointDisplacements of every joint (or None if they are
+    not available)
+    '''
+    return self._table("JointDisplAbs", JointDisplacements)
@@ -0,0 +1,587 @@
+#!/usr/bin/env python
+'''
+Direct stiffness analysis of rigidly connected 3D frames. This is the numerical
+core behind the local stand in for the SAP2000 program (see sap_local.py). All
+of the heavy lifting is done with NumPy arrays so that a whole tower can be
+analyzed without ever leaving Python.
+
+The elements are prismatic Euler-Bernoulli beams (no shear deformation) and the
+analysis is linear (first order). Loads along the elements are turned into
+consistent nodal loads, and the internal forces at any station are recovered
+by statics from the i-end forces of the element.
+'''
+import numpy as np
+
+# SciPy is only needed for the sparse solver
+try:
+  import scipy.sparse as sparse
+  from scipy.sparse.csgraph import reverse_cuthill_mckee
+  from scipy.sparse.linalg import splu
+except ImportError:
+  sparse = None
+
+# Degrees of freedom per node (u1,u2,u3,r1,r2,r3)
+DOF = 6
+
+def element_axes(i_coords,j_coords):
+  '''
+  Returns the lengths and the default local axes of the elements running from
+  i_coords to j_coords (both (m,3) arrays). The axes are returned as an (m,3,3)
+  array whose rows are the unit vectors of local axes 1, 2 and 3 in global
+  coordinates. This follows the SAP2000 convention: axis 1 runs from i to j,
+  axis 2 points upwards (+z) in the vertical 1-2 plane, or along +x if the
+  element is vertical, and axis 3 completes the right handed system.
+  '''
+  vectors = j_coords - i_coords
+  lengths = np.sqrt((vectors**2).sum(axis=1))
+  axis_1 = vectors / lengths[:,None]
+
+  # Vertical elements (same tolerance SAP2000 uses, sin(angle) <= 0.001)
+  horizontal = np.sqrt(axis_1[:,0]**2 + axis_1[:,1]**2)
+  vertical = horizontal <= 0.001
+
+  # Axis 2 is the part of +z perpendicular to axis 1 (or +x when vertical)
+  axis_2 = np.zeros_like(axis_1)
+  axis_2[:,2] = 1
+  axis_2 = axis_2 - axis_1[:,2][:,None] * axis_1
+  axis_2[vertical] = (1,0,0)
+  axis_2 = axis_2 / np.sqrt((axis_2**2).sum(axis=1))[:,None]
+  axis_3 = np.cross(axis_1,axis_2)
+
+  return lengths, np.stack((axis_1,axis_2,axis_3),axis=1)
+
+def local_stiffness(lengths,properties):
+  '''
+  Returns the (m,12,12) element stiffness matrices in local coordinates. The
+  properties are an (m,6) array of E, G, A, I22, I33 and J for each element.
+  '''
+  L = lengths
+  E, G, A, I22, I33, J = properties.T
+  k = np.zeros((len(L),12,12))
+
+  def fill(pairs,values):
+    for (row,col), value in zip(pairs,values):
+      k[:,row,col] = value
+      k[:,col,row] = value
+
+  # Axial and torsional stiffness
+  fill([(0,0),(6,6),(0,6)],[E*A/L,E*A/L,-E*A/L])
+  fill([(3,3),(9,9),(3,9)],[G*J/L,G*J/L,-G*J/L])
+
+  # Bending in the 1-2 plane (about axis 3)
+  a, b, c, d = 12*E*I33/L**3, 6*E*I33/L**2, 4*E*I33/L, 2*E*I33/L
+  fill([(1,1),(1,5),(1,7),(1,11),(5,5),(5,7),(5,11),(7,7),(7,11),(11,11)],
+    [a,b,-a,b,c,-b,d,a,-b,c])
+
+  # Bending in the 1-3 plane (about axis 2). A positive rotation about axis 2
+  # corresponds to a negative slope in the 3 direction, hence the signs
+  a, b, c, d = 12*E*I22/L**3, 6*E*I22/L**2, 4*E*I22/L, 2*E*I22/L
+  fill([(2,2),(2,4),(2,8),(2,10),(4,4),(4,8),(4,10),(8,8),(8,10),(10,10)],
+    [a,-b,-a,-b,c,b,d,a,b,c])
+
+  return k
+
+def to_global(k_local,axes):
+  '''
+  Rotates the (m,12,12) local matrices into global coordinates (T^T k T, where
+  T is made up of four copies of the element axes along the diagonal)
+  '''
+  m = len(k_local)
+  T = np.zeros((m,12,12))
+  for block in range(4):
+    T[:,3*block:3*block+3,3*block:3*block+3] = axes
+  return np.matmul(T.transpose(0,2,1),np.matmul(k_local,T))
+
+def consistent_loads(lengths,distances,forces,moments):
+  '''
+  Returns the (k,12) consistent nodal loads, in local coordinates, of point
+  forces and moments (both (k,3) and local) applied at the specified distances
+  from the i-end of elements of the specified lengths. These are obtained from
+  the (exact) cubic shape functions of the element.
+  '''
+  L = lengths
+  xi = distances / L
+
+  # Linear (axial, torsion) and cubic (bending) shape functions and slopes
+  linear = (1 - xi, xi)
+  cubic = (1 - 3*xi**2 + 2*xi**3, L*(xi - 2*xi**2 + xi**3), 3*xi**2 - 2*xi**3,
+    L*(xi**3 - xi**2))
+  slope = ((6*xi**2 - 6*xi) / L, 1 - 4*xi + 3*xi**2, (6*xi - 6*xi**2) / L,
+    3*xi**2 - 2*xi)
+
+  P1, P2, P3 = forces.T
+  M1, M2, M3 = moments.T
+  f = np.zeros((len(L),12))
+  f[:,0], f[:,6] = P1 * linear[0], P1 * linear[1]
+  f[:,3], f[:,9] = M1 * linear[0], M1 * linear[1]
+
+  # Bending in the 1-2 plane
+  for dof, shape, dshape in zip((1,5,7,11),cubic,slope):
+    f[:,dof] = P2 * shape + M3 * dshape
+
+  # Bending in the 1-3 plane (rotations about 2 are negative slopes)
+  for dof, sign, shape, dshape in zip((2,4,8,10),(1,-1,1,-1),cubic,slope):
+    f[:,dof] = sign * (P3 * shape - M2 * dshape)
+
+  return f
+
+def uniform_loads(lengths,loads):
+  '''
+  Returns the (m,12) consistent nodal loads, in local coordinates, of uniform
+  loads per unit length ((m,3), local) over the entire element.
+  '''
+  L = lengths
+  q1, q2, q3 = loads.T
+  f = np.zeros((len(L),12))
+  f[:,0], f[:,6] = q1 * L / 2, q1 * L / 2
+  f[:,1], f[:,5], f[:,7], f[:,11] = q2*L/2, q2*L**2/12, q2*L/2, -q2*L**2/12
+  f[:,2], f[:,4], f[:,8], f[:,10] = q3*L/2, -q3*L**2/12, q3*L/2, q3*L**2/12
+
+  return f
+
+class FrameLoads:
+  '''
+  Stores the loads of a single load case. Nodal loads are in global coordinates.
+  Loads along the elements are uniform loads per unit length and concentrated
+  forces/moments at a distance from the i-end, all in global coordinates.
+  '''
+  def __init__(self,num_nodes,num_elements):
+    self.nodal = np.zeros((num_nodes,DOF))
+    self.uniform = np.zeros((num_elements,3))
+
+    # Concentrated loads along elements (kept as lists until needed)
+    self.point_elements = []
+    self.point_distances = []
+    self.point_values = []
+
+  def add_point(self,element,distance,force=(0,0,0),moment=(0,0,0)):
+    '''
+    Adds a concentrated force and/or moment to the element at the specified
+    distance from its i-end.
+    '''
+    self.point_elements.append(element)
+    self.point_distances.append(distance)
+    self.point_values.append(tuple(force) + tuple(moment))
+
+  def points(self):
+    '''
+    Returns the concentrated loads as arrays (elements, distances, values)
+    '''
+    return (np.array(self.point_elements,dtype=int),
+      np.array(self.point_distances,dtype=float),
+      np.array(self.point_values,dtype=float).reshape(-1,6))
+
+class FrameSolver:
+  '''
+  Linear elastic solver for a frame made up of nodes (coordinates and
+  restraints) and elements connecting them. The global stiffness matrix is
+  assembled once, and can then be used to solve any number of load cases.
+  previous is the solver of the frame before it last changed. It is only used by
+  solvers which can update an existing factorization.
+  '''
+  def __init__(self,coordinates,restraints,elements,properties,previous=None):
+    # Nodes (n,3) coordinates and (n,6) boolean restraints
+    self.coordinates = np.asarray(coordinates,dtype=float).reshape(-1,3)
+    self.restraints = np.asarray(restraints,dtype=bool).reshape(-1,DOF)
+
+    # Elements (m,2) node indeces and (m,6) section properties
+    self.elements = np.asarray(elements,dtype=int).reshape(-1,2)
+    self.properties = np.asarray(properties,dtype=float).reshape(-1,6)
+
+    self.lengths, self.axes = element_axes(
+      self.coordinates[self.elements[:,0]],self.coordinates[self.elements[:,1]])
+    self.k_local = local_stiffness(self.lengths,self.properties)
+    self.k_global = to_global(self.k_local,self.axes)
+
+    # Global degree of freedom numbers of each element (m,12)
+    nodes = np.repeat(self.elements,DOF,axis=1)
+    self.element_dofs = nodes * DOF + np.tile(np.arange(DOF),2)
+
+    # Nodes which belong to parts of the frame that are not attached to any
+    # restraint. They cannot be solved for, so they are held in place.
+    self.unstable = self.floating_nodes()
+    self.free = self.free_dofs()
+
+    self.factorize()
+
+  def floating_nodes(self):
+    '''
+    Returns a boolean array marking the nodes that are not connected, through
+    elements, to a restrained node (or that have no elements at all)
+    '''
+    num_nodes = len(self.coordinates)
+    parent = list(range(num_nodes))
+
+    def find(node):
+      while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+      return node
+
+    for i, j in self.elements:
+      parent[find(i)] = find(j)
+
+    roots = np.array([find(node) for node in range(num_nodes)],dtype=int)
+    supported = np.zeros(num_nodes,dtype=bool)
+    supported[np.unique(roots[self.restraints.any(axis=1)])] = True
+
+    connected = np.zeros(num_nodes,dtype=bool)
+    connected[self.elements.ravel()] = True
+
+    return ~(supported[roots] & connected)
+
+  def free_dofs(self):
+    '''
+    Returns the indeces of the degrees of freedom that are solved for
+    '''
+    fixed = self.restraints | self.unstable[:,None]
+    return np.flatnonzero(~fixed.ravel())
+
+  def assemble(self):
+    '''
+    Returns the dense global stiffness matrix (all degrees of freedom)
+    '''
+    size = len(self.coordinates) * DOF
+    K = np.zeros((size,size))
+    rows = np.repeat(self.element_dofs,12,axis=1)
+    cols = np.tile(self.element_dofs,12)
+    np.add.at(K,(rows.ravel(),cols.ravel()),self.k_global.ravel())
+
+    return K
+
+  def factorize(self):
+    '''
+    Prepares the stiffness matrix of the free degrees of freedom for solving
+    '''
+    K = self.assemble()
+    self.K_free = K[np.ix_(self.free,self.free)]
+
+  def solve_free(self,forces):
+    '''
+    Solves K_free * d = forces for the (f,c) array of forces on the free
+    degrees of freedom
+    '''
+    if len(self.free) == 0:
+      return np.zeros_like(forces)
+    return np.linalg.solve(self.K_free,forces)
+
+  def element_loads(self,loads):
+    '''
+    Returns the (m,12) consistent nodal loads, in local coordinates, of all the
+    loads along the elements
+    '''
+    local_uniform = np.einsum('mpi,mi->mp',self.axes,loads.uniform)
+    f = uniform_loads(self.lengths,local_uniform)
+
+    elements, distances, values = loads.points()
+    if len(elements) > 0:
+      axes = self.axes[elements]
+      forces = np.einsum('kpi,ki->kp',axes,values[:,:3])
+      moments = np.einsum('kpi,ki->kp',axes,values[:,3:])
+      point = consistent_loads(self.lengths[elements],distances,forces,moments)
+      np.add.at(f,elements,point)
+
+    return f
+
+  def load_vector(self,loads,element_loads=None):
+    '''
+    Returns the global (n*6) load vector of the load case
+    '''
+    if element_loads is None:
+      element_loads = self.element_loads(loads)
+
+    # Rotate the element loads into global coordinates and add them up
+    m = len(self.elements)
+    global_loads = np.einsum('mpi,map->mai',self.axes,
+      element_loads.reshape(m,4,3)).reshape(m,12)
+    P = loads.nodal.ravel().copy()
+    np.add.at(P,self.element_dofs.ravel(),global_loads.ravel())
+
+    return P
+
+  def solve(self,cases):
+    '''
+    Solves each of the FrameLoads in cases. Returns a list with an (n,6) array
+    of global displacements for each case.
+    '''
+    if len(cases) == 0:
+      return []
+    P = np.stack([self.load_vector(loads) for loads in cases],axis=1)
+    d = self.solve_free(P[self.free])
+
+    displacements = []
+    for case in range(len(cases)):
+      D = np.zeros(len(self.coordinates) * DOF)
+      D[self.free] = d[:,case]
+      displacements.append(D.reshape(-1,DOF))
+
+    return displacements
+
+  def end_forces(self,displacements,loads):
+    '''
+    Returns the (m,12) forces exerted by the nodes on the ends of each element,
+    in local coordinates
+    '''
+    m = len(self.elements)
+    d = displacements.ravel()[self.element_dofs].reshape(m,4,3)
+    d_local = np.einsum('mpi,mai->map',self.axes,d).reshape(m,12)
+
+    return (np.einsum('mab,mb->ma',self.k_local,d_local) -
+      self.element_loads(loads))
+
+  def station_forces(self,element,stations,end_forces,loads):
+    '''
+    Returns the (k,6) internal forces P, V2, V3, T, M2, M3 at the stations
+    (distances from the i-end) along the element. These are the components, in
+    the local axes, of the force and moment acting on the positive face of a
+    cut at the station (so tension is a positive P, and a moment which
+    compresses the positive 2 face is a positive M3).
+    '''
+    x = np.asarray(stations,dtype=float)
+    axes = self.axes[element]
+
+    # Start with the forces at the i-end
+    F_i = end_forces[element,:3]
+    M_i = end_forces[element,3:6]
+    force = np.tile(F_i,(len(x),1))
+    moment = np.tile(M_i,(len(x),1))
+
+    def lever(d,F):
+      '''
+      Moment of the forces F applied at a distance d (along axis 1) from the cut
+      '''
+      M = np.zeros_like(F)
+      M[:,1] = -d * F[:,2]
+      M[:,2] = d * F[:,1]
+      return M
+
+    moment += lever(-x,force)
+
+    # Uniform load from the i-end up to the cut
+    q = np.dot(axes,loads.uniform[element])
+    force += np.outer(x,q)
+    moment[:,1] += x**2 * q[2] / 2
+    moment[:,2] -= x**2 * q[1] / 2
+
+    # Concentrated loads between the i-end and the cut (a load right at the cut
+    # is left in front of it, so the ends report the forces from the nodes)
+    elements, distances, values = loads.points()
+    for a, value in zip(distances[elements == element],
+      values[elements == element]):
+      behind = (x > a + 1e-6)[:,None]
+      P = np.tile(np.dot(axes,value[:3]),(len(x),1)) * behind
+      force += P
+      moment += np.dot(axes,value[3:]) * behind + lever(a - x,P)
+
+    # Forces on the positive face balance everything behind the cut
+    return np.hstack((-force,-moment))
+
+class SparseFrameSolver(FrameSolver):
+  '''
+  Same as FrameSolver, but the stiffness matrix is assembled in sparse (COO,
+  then CSR) form and factorized with a sparse LU decomposition. The degrees of
+  freedom are first renumbered with the reverse Cuthill-McKee algorithm, which
+  keeps the matrix banded (and the factorization from filling in). Memory and
+  time grow roughly linearly with the size of the tower instead of with its
+  square and cube.
+  '''
+  def __init__(self,coordinates,restraints,elements,properties,previous=None):
+    if sparse is None:
+      raise ImportError("The sparse frame solver requires SciPy.")
+    super(SparseFrameSolver,self).__init__(coordinates,restraints,elements,
+      properties,previous)
+
+  def assemble(self):
+    '''
+    Returns the sparse (CSR) global stiffness matrix (all degrees of freedom)
+    '''
+    size = len(self.coordinates) * DOF
+    rows = np.repeat(self.element_dofs,12,axis=1)
+    cols = np.tile(self.element_dofs,12)
+
+    # Duplicate entries are summed when converting from COO
+    K = sparse.coo_matrix((self.k_global.ravel(),(rows.ravel(),cols.ravel())),
+      shape=(size,size))
+    return K.tocsr()
+
+  def factorize(self):
+    '''
+    Reorders and factorizes the stiffness matrix of the free degrees of freedom
+    '''
+    K = self.assemble()
+    self.K_free = K[self.free][:,self.free]
+    self.order, self.factor = self.decompose(self.K_free)
+
+  def decompose(self,K):
+    '''
+    Returns the reverse Cuthill-McKee ordering and the LU factorization of the
+    (reordered) sparse matrix K
+    '''
+    if K.shape[0] == 0:
+      return None, None
+
+    # The matrix is symmetric positive definite, so no pivoting is needed and
+    # the banded structure from the reordering is kept
+    order = reverse_cuthill_mckee(K,symmetric_mode=True)
+    factor = splu(K[order][:,order].tocsc(),permc_spec="NATURAL",
+      diag_pivot_thresh=0,options={"SymmetricMode" : True})
+
+    return order, factor
+
+  def solve_free(self,forces):
+    '''
+    Solves K_free * d = forces using the factorization
+    '''
+    if len(self.free) == 0:
+      return np.zeros_like(forces)
+    d = np.empty_like(forces)
+    d[self.order] = self.factor.solve(np.ascontiguousarray(forces[self.order]))
+
+    return d
+
+class IncrementalFrameSolver(SparseFrameSolver):
+  '''
+  A sparse solver meant to be kept from one analysis to the next. Instead of
+  factorizing the stiffness matrix every time the frame changes, it keeps the
+  factorization of an earlier (base) frame and treats the difference as a low
+  rank update (Sherman-Morrison-Woodbury):
+
+    K = A + U C U^T,  K^-1 b = y - A^-1 U (I + C U^T A^-1 U)^-1 C y_S
+
+  where y = A^-1 b, A is the base matrix (with ones on the diagonal for the
+  degrees of freedom added since), U selects the degrees of freedom S whose
+  stiffness has changed and C is the change. Adding a beam only changes the
+  degrees of freedom of its nodes (and of a beam it splits), so each new beam
+  costs a handful of back-substitutions. Once more than max_rank degrees of
+  freedom have changed, the matrix is factorized again.
+  '''
+  def __init__(self,coordinates,restraints,elements,properties,previous=None,
+    max_rank=600):
+    self.previous = previous
+    self.max_rank = max_rank
+    super(IncrementalFrameSolver,self).__init__(coordinates,restraints,
+      elements,properties,previous)
+
+    # Don't keep the whole chain of solvers alive
+    self.previous = None
+
+  def factorize(self):
+    '''
+    Updates the factorization of the previous solver if possible, and
+    factorizes the stiffness matrix otherwise
+    '''
+    K = self.assemble()
+    self.K_free = K[self.free][:,self.free]
+    if not self.update(self.previous):
+      self.base_free = self.free
+      self.base_K = self.K_free
+      self.base_order, self.base_factor = self.decompose(self.K_free)
+      self.set_base_positions()
+      self.changed = np.zeros(0,dtype=int)
+      self.G = np.zeros((0,0))
+      self.correction = np.zeros((0,0))
+
+  def set_base_positions(self):
+    '''
+    Stores where the free degrees of freedom of the base frame are among the
+    current free degrees of freedom. Returns False if some of them are no
+    longer free.
+    '''
+    position = np.full(len(self.coordinates) * DOF,-1,dtype=int)
+    position[self.free] = np.arange(len(self.free))
+    self.base_position = position[self.base_free]
+    self.position = position
+
+    return not (self.base_position < 0).any()
+
+  def update(self,previous):
+    '''
+    Sets up the low rank update of the previous solver's base factorization.
+    Returns False if the frame has changed too much (or there is nothing to
+    update).
+    '''
+    if not isinstance(previous,IncrementalFrameSolver) or (
+      previous.base_factor is None):
+      return False
+
+    # Degrees of freedom can be added, but the base ones must remain free
+    self.base_free = previous.base_free
+    self.base_K = previous.base_K
+    self.base_order = previous.base_order
+    self.base_factor = previous.base_factor
+    if not self.set_base_positions():
+      return False
+
+    # The base matrix in the current numbering, and the change from it (ignoring
+    # round off from summing the element matrices in a different order)
+    size = len(self.free)
+    base = self.base_K.tocoo()
+    added = np.setdiff1d(np.arange(size),self.base_position)
+    A = sparse.coo_matrix((np.concatenate((base.data,np.ones(len(added)))),
+      (np.concatenate((self.base_position[base.row],added)),
+      np.concatenate((self.base_position[base.col],added)))),
+      shape=(size,size)).tocsr()
+    D = (self.K_free - A).tocsr()
+    D.data[abs(D.data) <= 1e-12 * abs(self.K_free.data).max()] = 0
+    D.eliminate_zeros()
+
+    # Changed degrees of freedom (in global numbering). The previous ones come
+    # first so that their part of G can be reused.
+    new = np.setdiff1d(self.free[np.unique(D.nonzero()[0])],previous.changed)
+    self.changed = np.concatenate((previous.changed,new)).astype(int)
+    if len(self.changed) > self.max_rank:
+      return False
+
+    # G = U^T A^-1 U (only the columns of the new degrees of freedom have to be
+    # calculated)
+    s, old = len(self.changed), len(previous.changed)
+    positions = self.position[self.changed]
+    self.G = np.zeros((s,s))
+    self.G[:old,:old] = previous.G
+    if len(new) > 0:
+      E = np.zeros((size,len(new)))
+      E[positions[old:],np.arange(len(new))] = 1
+      columns = self.base_solve(E)[positions]
+      self.G[:,old:] = columns
+      self.G[old:,:old] = columns[:old].T
+
+    # (I + C G)^-1 C, which is all that is needed to solve
+    C = D[positions][:,positions].toarray()
+    self.correction = np.linalg.solve(np.eye(s) + np.dot(C,self.G),C)
+
+    return True
+
+  def base_solve(self,forces):
+    '''
+    Solves A * d = forces for the base matrix A (in the current numbering)
+    '''
+    d = np.array(forces,dtype=float)
+    if len(self.base_free) > 0:
+      rhs = forces[self.base_position][self.base_order]
+      base = np.empty_like(rhs)
+      base[self.base_order] = self.base_factor.solve(np.ascontiguousarray(rhs))
+      d[self.base_position] = base
+
+    return d
+
+  def solve_free(self,forces):
+    '''
+    Solves K_free * d = forces with the updated factorization
+    '''
+    if len(self.free) == 0:
+      return np.zeros_like(forces)
+    d = self.base_solve(forces)
+    if len(self.changed) == 0:
+      return d
+
+    positions = self.position[self.changed]
+    w = np.zeros_like(d)
+    w[positions] = np.dot(self.correction,d[positions])
+
+    return d - self.base_solve(w)
+
+# Available solvers (by name). The sparse one is used whenever SciPy is there.
+SOLVERS = { "dense"       : FrameSolver,
+            "sparse"      : SparseFrameSolver,
+            "incremental" : IncrementalFrameSolver }
+DEFAULT_SOLVER = "dense" if sparse is None else "sparse"
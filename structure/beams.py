@@ -1,12 +1,116 @@
 from helpers import helpers
 from collections import namedtuple
-import math, variables,pdb
+import math, numpy as np, pdb
 
 Coord = namedtuple("Coordinates", ["x", "y", "z"])
 EndPoints = namedtuple("Endpoints", ["i","j"])
 
-class DumbBeam:
-  def __init__(self, name, endpoints,visual_model = None):
+# Pickle finds the namedtuples by their own names (for checkpoints)
+Coordinates, Endpoints = Coord, EndPoints
+
+class BeamStore(object):
+  '''
+  Keeps the data of many beams in contiguous arrays (one row per beam), so that
+  it takes little memory and can be read and updated for all beams at once. 
+  Rows are never reused, so a beam removed from the structure keeps its data.
+  '''
+  # The arrays with one row per beam
+  arrays = ("endpoints","deflections","written","moments","points",
+    "deflected","has_written")
+
+  def __init__(self,capacity=64):
+    # Number of rows in use
+    self.size = 0
+
+    # The endpoints, the deflection of each endpoint and the deflected endpoints
+    # last written out (n,2,3)
+    self.endpoints = np.zeros((capacity,2,3))
+    self.deflections = np.zeros((capacity,2,3))
+    self.written = np.zeros((capacity,2,3))
+
+    # The largest moment along each beam (nan until it is known)
+    self.moments = np.full(capacity,np.nan)
+
+    # The ids of the names of the endpoints (n,2)
+    self.points = np.zeros((capacity,2),dtype=int)
+
+    # Whether each beam has a deflection, and has been written out
+    self.deflected = np.zeros(capacity,dtype=bool)
+    self.has_written = np.zeros(capacity,dtype=bool)
+
+    # The names of the points by id, and the ids by name
+    self.point_names = []
+    self.point_ids = {}
+
+  def __len__(self):
+    return self.size
+
+  def __grow(self):
+    '''
+    Doubles the number of rows
+    '''
+    for name in self.arrays:
+      array = getattr(self,name)
+      grown = np.zeros((2 * len(array),) + array.shape[1:],dtype=array.dtype)
+      if name == "moments":
+        grown[:] = np.nan
+      grown[:len(array)] = array
+      setattr(self,name,grown)
+
+  def point_id(self,name):
+    '''
+    Returns the id of the name of a point
+    '''
+    if name not in self.point_ids:
+      self.point_ids[name] = len(self.point_names)
+      self.point_names.append(name)
+
+    return self.point_ids[name]
+
+  def add(self,endpoints,endpoint_names):
+    '''
+    Adds a row for a beam and returns its index
+    '''
+    if self.size == len(self.endpoints):
+      self.__grow()
+
+    index = self.size
+    self.size += 1
+    self.endpoints[index] = endpoints
+    self.points[index] = (self.point_id(endpoint_names[0]),self.point_id(
+      endpoint_names[1]))
+
+    return index
+
+  def update_deflections(self,rows,displacements,step):
+    '''
+    Updates the deflections of the beams in rows at once, from the displacements
+    of all the points (one row per point id). Returns whether the deflected 
+    endpoints of each of those beams moved by step or more since they were last
+    written out (or were never written out).
+    '''
+    self.deflections[rows] = displacements[self.points[rows]]
+    self.deflected[rows] = True
+    moved = np.sqrt(((self.endpoints[rows] + self.deflections[rows] - 
+      self.written[rows])**2).sum(axis=-1))
+
+    return ~self.has_written[rows] | (moved >= step).any(axis=-1)
+
+  def write(self,rows):
+    '''
+    Records the current deflected endpoints of the beams in rows as written out
+    '''
+    self.written[rows] = self.endpoints[rows] + self.deflections[rows]
+    self.has_written[rows] = True
+
+class DumbBeam(object):
+  # Beams have no __dict__, since there are thousands of them
+  __slots__ = ("endpoints","joints","name","visual_model","weight")
+
+  def __init__(self, name, endpoints, weight, visual_model = None):
+    # This is how much the beam weighs (beam_load of the config)
+    self.weight = weight
+
     # Each beam has two endpoints (i and j)
     self.endpoints = EndPoints(i=endpoints[0], j=endpoints[1])
 
@@ -17,11 +121,23 @@ class DumbBeam:
     # This is the name of the beam
     self.name = name
 
-    # This is how much each beam weighs
-    self.weight = variables.beam_load
-
     self.visual_model = visual_model
 
+  def __getstate__(self):
+    # The beams at each joint are pickled by name, or pickling a beam would
+    # recurse through every beam connected to it (Structure puts them back).
+    # The visual model cannot be pickled.
+    state = dict((name, getattr(self,name)) for cls in type(self).__mro__ for
+      name in getattr(cls,"__slots__",()))
+    state["joints"] = dict((coord, [beam.name for beam in beams]) for coord,
+      beams in self.joints.items())
+    state["visual_model"] = None
+    return state
+
+  def __setstate__(self, state):
+    for name, value in state.items():
+      setattr(self,name,value)
+
   def current_state(self):
     '''
     Returns the current state
@@ -38,25 +154,24 @@ class DumbBeam:
               'joints'    : joints,
               'weight'    : self.weight  }
 
-  def addjoint(self, coord, beam):
+  def addjoint(self, coord, beam, key = None):
     '''
     Adds a joint (at the specified coordinate), to the beam itself. The beam 
-    variable defines the which crosses this one at the joint
+    variable defines the which crosses this one at the joint. The joint is kept
+    under key (the coordinate of the joint in the joint table of the structure,
+    so that the same joint has the same coordinate on every beam), or under
+    coord if there is none.
     '''
     # Verify that the coordinate is on the beam based on endpoints
     if not helpers.on_line(self.endpoints.i, self.endpoints.j, coord):
       return False
 
     else:
-      coord = Coord(x=coord[0],y=coord[1],z=coord[2])
-      # We cycle manually so we can compare using our compare function
-      for key, beams in self.joints.items():
-        # We have a key and the beam isn't already there
-        if helpers.compare_tuple(key,coord) and beam not in beams:
-          self.joints[key].append(beam)
-          return True
-
-      self.joints[coord] = [beam]
+      key = coord if key is None else key
+      key = Coord(x=key[0],y=key[1],z=key[2])
+      beams = self.joints.setdefault(key,[])
+      if beam not in beams:
+        beams.append(beam)
       return True
 
   def removejoint(self,coord, beam):
@@ -84,23 +199,67 @@ class DumbBeam:
 class Beam(DumbBeam):
   '''
   This class keeps track of both the original design location of the tubes and 
-  of the deflected location based on the analysis results
+  of the deflected location based on the analysis results. The data that 
+  changes with the analysis (and the names of the endpoints) is kept in a row 
+  of a BeamStore, which is shared by all the beams of a structure.
   '''
-  def __init__(self, name, endpoints,endpoint_names, visual_model = None):
-    super(Beam,self).__init__(name,endpoints,visual_model)
+  __slots__ = ("store","index")
 
-    self.endpoint_names = EndPoints(i=endpoint_names[0],j=endpoint_names[1])
-    
-    # Keeps track of the amoung of deflection
-    self.deflection = None
+  def __init__(self, name, endpoints,endpoint_names, weight, visual_model = None,
+    store = None):
+    super(Beam,self).__init__(name,endpoints,weight,visual_model)
 
-    # Deflected enpoints
-    self.deflected_enpoints = self.get_true_endpoints()
+    self.store = BeamStore(1) if store is None else store
+    self.index = self.store.add(endpoints,endpoint_names)
 
-    # Keeps track of the deflected endpoint we last wrote out 
-    # This makes a faster visualization (we only change the visualization) when
-    # there's a change that will be noticeable.
-    self.previous_write_endpoints = None
+  @property
+  def endpoint_names(self):
+    i, j = self.store.points[self.index].tolist()
+    return EndPoints(i=self.store.point_names[i],j=self.store.point_names[j])
+
+  @property
+  def deflection(self):
+    '''
+    The deflection of each endpoint (or None before the first analysis)
+    '''
+    if not self.store.deflected[self.index]:
+      return None
+    i, j = self.store.deflections[self.index].tolist()
+    return EndPoints(i=tuple(i),j=tuple(j))
+
+  @property
+  def deflected_endpoints(self):
+    return self.get_true_endpoints()
+
+  @property
+  def previous_write_endpoints(self):
+    '''
+    Keeps track of the deflected endpoint we last wrote out. This makes a 
+    faster visualization (we only change the visualization) when there's a 
+    change that will be noticeable.
+    '''
+    if not self.store.has_written[self.index]:
+      return None
+    i, j = self.store.written[self.index].tolist()
+    return EndPoints(i=tuple(i),j=tuple(j))
+
+  @previous_write_endpoints.setter
+  def previous_write_endpoints(self,endpoints):
+    self.store.has_written[self.index] = endpoints is not None
+    if endpoints is not None:
+      self.store.written[self.index] = endpoints
+
+  @property
+  def max_moment(self):
+    '''
+    The largest moment along the beam in the last analysis (or None)
+    '''
+    moment = self.store.moments[self.index]
+    return None if np.isnan(moment) else float(moment)
+
+  @max_moment.setter
+  def max_moment(self,moment):
+    self.store.moments[self.index] = np.nan if moment is None else moment
 
   def current_state(self):
     '''
@@ -108,29 +267,13 @@ class Beam(DumbBeam):
     '''
     state = super(Beam,self).current_state()
 
-    state.update({ 'deflected_enpoints'        : self.deflected_enpoints,
+    state.update({ 'deflected_enpoints'        : self.deflected_endpoints,
                   'deflection'                : self.deflection,
                   'previous_write_endpoints'  : self.previous_write_endpoints,
                   'endpoint_names'            : self.endpoint_names })
 
     return state
 
-  def update_deflection(self,i_val,j_val):
-    '''
-    Updates the deflection using a named tupled
-    '''
-    # Update deflection
-    self.deflection = EndPoints(i=i_val,j=j_val)
-
-    # Update endpoints
-    self.deflected_endpoints = self.get_true_endpoints()
-
-    return (self.previous_write_endpoints is None or helpers.distance(
-      self.deflected_endpoints.i,self.previous_write_endpoints.i) 
-      >= variables.visualization['step'] or helpers.distance(
-        self.deflected_endpoints.j,self.previous_write_endpoints.j) >=
-      variables.visualization['step'])
-
   def global_default_axes(self):
     '''
     Returns the default local axes. Later on we might incorporate the ability to return
@@ -180,9 +323,10 @@ class Beam(DumbBeam):
     Takes into account the deflection and returns the true physical endpoints of
     the structure
     '''
-    if self.deflection is None:
+    deflection = self.deflection
+    if deflection is None:
       return self.endpoints
     else:
-      return EndPoints(i=helpers.sum_vectors(self.endpoints.i,self.deflection.i),
-       j=helpers.sum_vectors(self.endpoints.j,self.deflection.j))
+      return EndPoints(i=helpers.sum_vectors(self.endpoints.i,deflection.i),
+       j=helpers.sum_vectors(self.endpoints.j,deflection.j))
 
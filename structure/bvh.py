@@ -0,0 +1,240 @@
+'''
+A bounding volume hierarchy over the beams of the structure, for finding the
+beams near a point. It is a dynamic tree of axis aligned bounding boxes (as in
+Box2D): beams are inserted next to the node whose box grows the least, and the
+tree is kept balanced with rotations, so beams can be added and removed as the
+structure changes.
+'''
+import variables
+
+def union(low1,high1,low2,high2):
+  '''
+  Returns the bounding box of two bounding boxes
+  '''
+  return ((min(low1[0],low2[0]),min(low1[1],low2[1]),min(low1[2],low2[2])),
+    (max(high1[0],high2[0]),max(high1[1],high2[1]),max(high1[2],high2[2])))
+
+def perimeter(low,high):
+  '''
+  The cost of a bounding box (half its surface area)
+  '''
+  x, y, z = high[0] - low[0], high[1] - low[1], high[2] - low[2]
+  return x * y + y * z + z * x
+
+def box_distance(low,high,point):
+  '''
+  Returns the squared distance from the point to the bounding box
+  '''
+  total = 0
+  for i in range(3):
+    if point[i] < low[i]:
+      total += (low[i] - point[i])**2
+    elif point[i] > high[i]:
+      total += (point[i] - high[i])**2
+  return total
+
+def segment_distance(i,j,point):
+  '''
+  Returns the squared distance from the point to the segment i -> j
+  '''
+  d = (j[0] - i[0], j[1] - i[1], j[2] - i[2])
+  v = (point[0] - i[0], point[1] - i[1], point[2] - i[2])
+  dd = d[0] * d[0] + d[1] * d[1] + d[2] * d[2]
+  t = 0 if dd == 0 else (v[0] * d[0] + v[1] * d[1] + v[2] * d[2]) / dd
+  t = min(max(t,0),1)
+  return ((v[0] - t * d[0])**2 + (v[1] - t * d[1])**2 + (v[2] - t * d[2])**2)
+
+class Node(object):
+  '''
+  A node of the tree. Leaves hold a beam, the others exactly two children.
+  '''
+  def __init__(self,low,high,beam=None):
+    self.low, self.high = low, high
+    self.beam = beam
+    self.parent = self.left = self.right = None
+    self.height = 0
+
+  def leaf(self):
+    return self.left is None
+
+  def refit(self):
+    '''
+    Updates the bounding box and height from the children
+    '''
+    self.low, self.high = union(self.left.low,self.left.high,self.right.low,
+      self.right.high)
+    self.height = 1 + max(self.left.height,self.right.height)
+
+class BeamTree(object):
+  def __init__(self):
+    self.root = None
+
+    # The leaf of each beam {name : node}
+    self.leaves = {}
+
+  def __len__(self):
+    return len(self.leaves)
+
+  def add(self,beam):
+    '''
+    Inserts the beam (replacing any beam with the same name)
+    '''
+    if beam.name in self.leaves:
+      self.remove(beam.name)
+
+    i, j = beam.endpoints
+    leaf = Node(tuple(min(a,b) for a,b in zip(i,j)),tuple(max(a,b) for a,b in
+      zip(i,j)),beam)
+    self.leaves[beam.name] = leaf
+    if self.root is None:
+      self.root = leaf
+      return
+
+    # Find the best sibling for the leaf (the one whose box grows the least,
+    # counting the growth of all its ancestors)
+    node = self.root
+    while not node.leaf():
+      area = perimeter(node.low,node.high)
+      combined = perimeter(*union(node.low,node.high,leaf.low,leaf.high))
+
+      # Cost of making a new parent of this node and the leaf, and the cost
+      # that going further down adds to this node
+      cost = 2 * combined
+      inheritance = 2 * (combined - area)
+
+      def descend_cost(child):
+        enlarged = perimeter(*union(child.low,child.high,leaf.low,leaf.high))
+        if child.leaf():
+          return enlarged + inheritance
+        return enlarged - perimeter(child.low,child.high) + inheritance
+
+      left, right = descend_cost(node.left), descend_cost(node.right)
+      if cost < left and cost < right:
+        break
+      node = node.left if left < right else node.right
+
+    # Make a new parent for the sibling and the leaf
+    sibling = node
+    parent = Node(leaf.low,leaf.high)
+    parent.parent = sibling.parent
+    parent.left, parent.right = sibling, leaf
+    parent.refit()
+    if sibling.parent is None:
+      self.root = parent
+    elif sibling.parent.left is sibling:
+      sibling.parent.left = parent
+    else:
+      sibling.parent.right = parent
+    sibling.parent = leaf.parent = parent
+
+    self.__fix(parent.parent)
+
+  def remove(self,name):
+    '''
+    Removes the beam with the specified name. Returns whether it was there.
+    '''
+    leaf = self.leaves.pop(name,None)
+    if leaf is None:
+      return False
+
+    if leaf is self.root:
+      self.root = None
+      return True
+
+    # The sibling takes the place of the parent
+    parent = leaf.parent
+    sibling = parent.right if parent.left is leaf else parent.left
+    grandparent = parent.parent
+    sibling.parent = grandparent
+    if grandparent is None:
+      self.root = sibling
+    else:
+      if grandparent.left is parent:
+        grandparent.left = sibling
+      else:
+        grandparent.right = sibling
+      self.__fix(grandparent)
+
+    return True
+
+  def __fix(self,node):
+    '''
+    Rebalances and refits the nodes from node up to the root
+    '''
+    while node is not None:
+      node = self.__balance(node)
+      node.refit()
+      node = node.parent
+
+  def __replace(self,old,new):
+    '''
+    Puts new in the place of old in the parent of old
+    '''
+    new.parent = old.parent
+    if old.parent is None:
+      self.root = new
+    elif old.parent.left is old:
+      old.parent.left = new
+    else:
+      old.parent.right = new
+
+  def __balance(self,a):
+    '''
+    Rotates the taller child of a up if a is unbalanced. Returns the node now
+    in the place of a.
+    '''
+    if a.leaf() or a.height < 2:
+      return a
+
+    b, c = a.left, a.right
+    balance = c.height - b.height
+
+    # Rotate c up
+    if balance > 1:
+      f, g = c.left, c.right
+      self.__replace(a,c)
+      c.left, a.parent = a, c
+      if f.height > g.height:
+        c.right, a.right, g.parent = f, g, a
+      else:
+        c.right, a.right, f.parent = g, f, a
+      a.refit()
+      c.refit()
+      return c
+
+    # Rotate b up
+    if balance < -1:
+      d, e = b.left, b.right
+      self.__replace(a,b)
+      b.left, a.parent = a, b
+      if d.height > e.height:
+        b.right, a.left, e.parent = d, e, a
+      else:
+        b.right, a.left, d.parent = e, d, a
+      a.refit()
+      b.refit()
+      return b
+
+    return a
+
+  def query(self,center,radius):
+    '''
+    Returns the beams within radius (up to epsilon) of the center, in the order
+    of the tree
+    '''
+    reach = (radius + variables.epsilon)**2
+    beams = []
+    stack = [self.root] if self.root is not None else []
+    while stack != []:
+      node = stack.pop()
+      if box_distance(node.low,node.high,center) > reach:
+        continue
+      if node.leaf():
+        i, j = node.beam.endpoints
+        if segment_distance(i,j,center) <= reach:
+          beams.append(node.beam)
+      else:
+        stack.append(node.right)
+        stack.append(node.left)
+
+    return beams
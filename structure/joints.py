@@ -0,0 +1,91 @@
+'''
+The joints of the structure (the points where beams meet). Coordinates that
+are the same up to epsilon are the same joint, and each joint keeps the
+coordinate it was first added with, so every beam meeting there uses the same
+one. Joints are found through a spatial hash: coordinates are rounded down to
+multiples of epsilon, and a joint is looked for in the cells around the cell of
+a coordinate.
+'''
+from structure.beams import Coord
+import itertools, math, variables
+
+class Joint(object):
+  def __init__(self,id,coord):
+    # A number that identifies the joint for as long as it exists
+    self.id = id
+
+    # The coordinate of the joint, and the beams that meet there
+    self.coord = coord
+    self.beams = []
+
+class JointTable(object):
+  def __init__(self,epsilon=variables.epsilon):
+    self.epsilon = epsilon
+
+    # The joints by id, and the ids of the joints in each cell
+    # {rounded coordinate : [id]}
+    self.joints = {}
+    self.cells = {}
+
+    # The id of the next joint
+    self.next_id = 0
+
+  def __len__(self):
+    return len(self.joints)
+
+  def __cell(self,coord):
+    return tuple(int(math.floor(c / self.epsilon)) for c in coord)
+
+  def find(self,coord):
+    '''
+    Returns the joint at the coordinate (up to epsilon), or None if there is no
+    joint there
+    '''
+    e = self.epsilon
+    ranges = [range(int(math.floor((c - e) / e)),int(math.floor((c + e) / e)) +
+      1) for c in coord]
+    for cell in itertools.product(*ranges):
+      for id in self.cells.get(cell,()):
+        joint = self.joints[id]
+        if (abs(joint.coord[0] - coord[0]) < e and abs(joint.coord[1] -
+          coord[1]) < e and abs(joint.coord[2] - coord[2]) < e):
+          return joint
+
+    return None
+
+  def add(self,coord,beam):
+    '''
+    Adds the beam to the joint at the coordinate, creating the joint if needed.
+    Returns the joint.
+    '''
+    joint = self.find(coord)
+    if joint is None:
+      joint = Joint(self.next_id,Coord(x=coord[0],y=coord[1],z=coord[2]))
+      self.next_id += 1
+      self.joints[joint.id] = joint
+      self.cells.setdefault(self.__cell(joint.coord),[]).append(joint.id)
+
+    if beam not in joint.beams:
+      joint.beams.append(beam)
+
+    return joint
+
+  def remove(self,coord,beam):
+    '''
+    Removes the beam from the joint at the coordinate. The joint is removed
+    once fewer than two beams meet there. Returns whether the beam was at the
+    joint.
+    '''
+    joint = self.find(coord)
+    if joint is None or beam not in joint.beams:
+      return False
+
+    joint.beams.remove(beam)
+    if len(joint.beams) < 2:
+      del self.joints[joint.id]
+      cell = self.__cell(joint.coord)
+      self.cells[cell].remove(joint.id)
+      if self.cells[cell] == []:
+        del self.cells[cell]
+
+    return True
@@ -3,30 +3,60 @@ This file establishes the structure and keeps track of all beam elements added
 to it. This is done for the sake of efficiency, as we only want to query the 
 SAP program when absolutely necessary. The following functions are all helpful'
 '''
-from helpers import helpers
-from helpers.errors import OutofBox
-from structure.beams import Beam
-from visual import *
-import construction, math, pdb, sys, variables
+from helpers import geometry, helpers
+from structure.beams import Beam, BeamStore
+from structure.bvh import BeamTree
+from structure.joints import JointTable
+from config import Config
+import math, numpy as np, pdb, sys, variables
+
+def grid_resolution(box_size = None, config = variables):
+  '''
+  Returns the length of the sides of the boxes of the structure (box_size of
+  the config by default). If box_size is "auto", this is half a beam length (so
+  a beam spans two or three boxes), but no less than the local radius (so the
+  neighbourhood of a robot spans at most two boxes along each axis). The "grid"
+  benchmark compares other sizes.
+  '''
+  box_size = config.box_size if box_size is None else box_size
+  if box_size == "auto":
+    return max(config.beam_length / 2,config.local_radius)
+
+  assert box_size > 0
+  return box_size
 
 class Structure:
-  def __init__(self, visualization):
+  def __init__(self, visualization, box_size = None, config = None):
+    # The settings of the simulation (see config.py)
+    self.config = Config() if config is None else config
 
-    # number of boxes
-    self.num = variables.num_x, variables.num_y, variables.num_z
+    # size of the entire structure
+    self.size = self.config.dim_x, self.config.dim_y, self.config.dim_z
 
-    # size of each box
-    self.box_size = (variables.dim_x / variables.num_x, variables.dim_y / 
-      variables.num_y, variables.dim_y / variables.num_y)
+    # size of each box (they are cubes)
+    side = grid_resolution(box_size,self.config)
+    self.box_size = side, side, side
 
-    self.origin = variables.origin
+    # number of boxes (enough to cover the entire structure)
+    self.num = tuple(math.ceil(dim / side) for dim in self.size)
 
-    # size of the entire structure
-    self.size = variables.dim_x, variables.dim_y, variables.dim_z
+    self.origin = self.config.origin
+
+    # Storage of information. Only the boxes that contain beams are stored, as
+    # {packed index of the box : {name : beam}}
+    self.model = {}
+
+    # The beams currently in the structure {name : beam}, and a tree of their
+    # bounding boxes for finding the beams near a point
+    self.beams = {}
+    self.tree = BeamTree()
 
-    # Storage of information
-    self.model =  ([[[{} for k in range(variables.num_z)] for j in 
-      range(variables.num_y)] for i in range(variables.num_x)])
+    # The data of the beams that changes with the analysis, in arrays (see
+    # structure/beams.py)
+    self.store = BeamStore()
+
+    # The points where beams meet (see structure/joints.py)
+    self.joints = JointTable(self.config.epsilon)
 
     # Keeps track of how many tubes we have in the structure
     self.tubes = 0
@@ -49,6 +79,9 @@ class Structure:
     # Stores information on the beams' max moments
     self.structure_data = []
 
+    # Names of the beams whose local axes are known to be the default
+    self.default_axes = set()
+
   def __feasable_point(self,p):
     '''
     Checks whether or not a point lies within the defined limits of the 
@@ -72,106 +105,64 @@ class Structure:
     xi, yi, zi = get_index(x,dim_x), get_index(y,dim_y), get_index(z,dim_z)
     return xi, yi, zi
 
+  def __get_key(self,xi,yi,zi):
+    '''
+    Returns the packed index of the box with the specified indeces. Raises an
+    IndexError if the box is not in the structure.
+    '''
+    num_x, num_y, num_z = self.num
+    if not (0 <= xi < num_x and 0 <= yi < num_y and 0 <= zi < num_z):
+      raise IndexError("The box {} is not in the structure".format(
+        str((xi,yi,zi))))
+
+    return (xi * num_y + yi) * num_z + zi
+
   def __path(self,coord1, coord2):
     '''
-    Traverses the line formed between coord1 and coord2. Returns a list of 
-    points on the line that lie in different boxes. This will NOT miss any 
-    points that are in difference boxes. The basic method is to find the 
-    intersection of the line with one of the faces of the cube formed by the 
-    box. There should not be multiple points, but this has not been proven. It 
-    might return two points that are in the same box.
+    Traverses the line formed between coord1 and coord2. Returns the indeces of
+    the boxes the line passes through, in order from coord1 to coord2 and each
+    only once. This is the voxel traversal of Amanatides and Woo: the line
+    steps into the next box along whichever axis has the nearest boundary, so
+    no box is skipped.
     '''
-    def get_sign(n):
-      '''
-      Returns the sign of the number
-      '''
-      if n == 0:
-        return None
+    start, end = self.__get_indeces(coord1), self.__get_indeces(coord2)
+
+    # For each axis, the direction of the steps, and the fractions of the line
+    # at which it crosses the next boundary (t_max) and between boundaries 
+    # (t_delta)
+    steps, t_max, t_delta = [], [], []
+    for i in range(3):
+      change = coord2[i] - coord1[i]
+      if change > 0:
+        steps.append(1)
+        t_max.append(((start[i] + 1) * self.box_size[i] - coord1[i]) / change)
+        t_delta.append(self.box_size[i] / change)
+      elif change < 0:
+        steps.append(-1)
+        t_max.append((start[i] * self.box_size[i] - coord1[i]) / change)
+        t_delta.append(-self.box_size[i] / change)
       else:
-        return n > 0
-
-    # move from coord1 to coord2. Here, we determine the sign of the change 
-    # (pos = True, neg = False, or None)
-    signs = (get_sign(coord2[0] - coord1[0]), get_sign(coord2[1] - coord1[1]),
-      get_sign(coord2[2] - coord1[2]))
-    line = helpers.make_vector(coord1,coord2)
-
-    def crawl(point):
-      # get the current box boundaries (bottom left corner-(0,0,0) is starting)
-      # and coordinates
-      xi, yi, zi = self.__get_indeces(point)
-      bounds = xi*self.box_size[0], yi*self.box_size[1], zi*self.box_size[2]
-
-      # This is defined here to have access to the above signs and bounds
-      def closest(p):
-        '''
-        Returns which coordinate in p is closest to the boundary of a box 
-        (x = 0, y = 1, z = 2) if moving along the line, and the absolute change
-        in that coordinate.
-        '''
-        def distance(i):
-          '''
-          i is 0,1,2 for x,y,z
-          '''
-          if signs[i] == None:
-            # This will never be the minimum. Makes later code easier
-            return None
-          elif signs[i]:
-            return abs(p[i] - (bounds[i] + self.box_size[i]))
-          else:
-            return abs(p[i] - bounds[i])
-
-        # Find the shortest time distance (ie, distance/velocity)
-        index = None
-        for i in range(3):
-          dist, vel = distance(i), abs(line[i])
-          if dist is not None and vel != 0:
-            if index is None:
-              index = i
-            else:
-              min_time = distance(index) / abs(line[index])
-              index = i if dist / vel < min_time else index
-
-        return index, distance(index)
-
-      # In crawl, we obtain the coordinate closests to an edge (index), and its 
-      # absolute distance from that edge
-      index, distance = closest(point)
-
-      # The change is the line scaled so that the right coordinate changes the 
-      # amount necessary to cross into the next box. This means that we scale it
-      # and also add a teeny bit so as to push it into the right box. This is 
-      # the scaled version, exactly the distance we need to move
-      move = helpers.scale(distance / abs(line[index]), line)
-      # Here we scale the line again by epsilon/2. This is our push
-      push = helpers.scale(variables.epsilon / 2, line)
-      # The total change is the addition of these two
-      change = helpers.sum_vectors(move,push)
-
-      # make sure we are changing the right amount
-      assert helpers.compare(abs(move[index]), distance)
-
-      # The new initial coordinate in the next box
-      new_point = helpers.sum_vectors(point,change)
-
-      return new_point
-
-    points, passed,temp = [coord2], False, coord1
-    while not passed:
-      points.append(temp)
-      temp = crawl(temp)
-
-      # Check the next coordinate to see if we have moved past the endpoint
+        steps.append(0)
+        t_max.append(float("inf"))
+        t_delta.append(float("inf"))
+
+    # Step into the next box until the last one is reached. Where the line
+    # crosses several boundaries at once (within epsilon / 2 of the line), it
+    # steps along all of those axes together. Axes that already reached the last
+    # box are not stepped along (in case of rounding errors).
+    box = list(start)
+    remaining = [abs(e - s) for s, e in zip(start,end)]
+    boxes = [start]
+    while sum(remaining) > 0:
+      t = min(t_max[i] for i in range(3) if remaining[i] > 0)
       for i in range(3):
-        if signs[i] != None:
-          # Movings positively, so set to True if our new_point has a larger 
-          # positive coordinate
-          # Moving negatively, so set to True if our new_point has a smaller 
-          # positive coordinate
-          passed = (temp[i] > coord2[i] + variables.epsilon / 2 if signs[i] 
-            else temp[i] < coord2[i] - variables.epsilon / 2)
+        if remaining[i] > 0 and t_max[i] - t < self.config.epsilon / 2:
+          box[i] += steps[i]
+          t_max[i] += t_delta[i]
+          remaining[i] -= 1
+      boxes.append(tuple(box))
 
-    return points
+    return boxes
 
   def load_model(self,program):
     '''
@@ -199,20 +190,20 @@ class Structure:
 
   def find_beam(self,beam):
     '''
-    Cycles through the structure, looking for the beam specified by name
+    Returns the beam specified by name (or None if it is not in the structure)
     '''
-    for wall in self.model:
-      for column in wall:
-        for cell in column:
-          if beam in cell:
-            return cell[beam]
+    return self.beams.get(beam)
 
-    return None
+  def find_joint(self,coord):
+    '''
+    Returns the joint at the coordinate (or None if there is no joint there)
+    '''
+    return self.joints.find(coord)
 
   def get_endpoints(self,beam_name,location,deflected=False):
     '''
-    Returns the endpoints of the beam. It uses location to facilitate the 
-    search. If not found, it looks for the beam the old fashion way. 
+    Returns the endpoints of the beam (or None if it is not in the structure).
+    The location is no longer needed.
     '''
     beam = self.get_beam(beam_name,location)
     if beam is not None:
@@ -223,21 +214,11 @@ class Structure:
 
   def get_beam(self,beam_name,location):
     '''
-    Returns the beam object with the specified name. Uses location to quickly
-    find the box that contains it. If it is not found in that box, None is 
-    returned. This doesn't mean the beam doesn't exists, just that the location
-    specified a box which does not contain the beam\
+    Returns the beam object with the specified name, or None if it is not in the
+    structure. The location is no longer needed, since beams are looked up by
+    name.
     '''
-    box = self.get_box(location)
-
-    for name,beam in box.items():
-      if beam_name == name:
-        return beam
-
-    if self.find_beam(beam_name) is not None:
-      return self.find_beam(beam_name)
-    else:
-      return None
+    return self.find_beam(beam_name)
 
   def get_box(self,point):
     '''
@@ -245,22 +226,23 @@ class Structure:
     containing the named and point coordinates of the objects for which any part
     is contained within the box
     '''
-    xi, yi, zi = self.__get_indeces(point)
-    num_x, num_y, num_z = self.num
-
     # Catch Errors 
     try:
-      return (self.model[xi][yi][zi])
+      key = self.__get_key(*self.__get_indeces(point))
     except IndexError:
       print ("The coordinate, {}, is not in the structure and should never have\
         been. Please check the add function in structure.py".format(point))
       return None
 
-  def get_boxes(self,location,radius=variables.beam_length):
+    # Boxes without beams are not stored
+    return self.model.get(key,{})
+
+  def get_boxes(self,location,radius=None):
     '''
     Returns all of the boxes that are within the sphere specified by location
-    and radius
+    and radius (a beam length by default)
     '''
+    radius = self.config.beam_length if radius is None else radius
     def index_range(index):
       dim = self.box_size[index]
       num = math.ceil(radius/dim)
@@ -273,83 +255,81 @@ class Structure:
     for i in range(-x,x+1):
       for j in range(-y,y+1):
         for k in range(0,z+1):
-          ix,iy,iz = xi+i,yi+j,zi+k
           try:
-            boxes.append(self.model[ix][iy][iz])
+            key = self.__get_key(xi+i,yi+j,zi+k)
           except IndexError:
-            pass
+            continue
+          if key in self.model:
+            boxes.append(self.model[key])
 
     return boxes
 
+  def get_beams(self,location,radius=None):
+    '''
+    Returns all of the beams that are within the sphere specified by location
+    and radius (any part of them, and a beam length by default)
+    '''
+    radius = self.config.beam_length if radius is None else radius
+    return self.tree.query(location,radius)
+
   def add_beam(self,p1,p1_name,p2,p2_name,name):
     ''' 
     Function to add the name and endpoint combination of a beam
     to all of the boxes that contain it. Returns the number of boxes (which 
     should be at least 1)
     '''
-    def addbeam(beam,p):
-      '''
-      Function to add an arbitrary beam to its respective box. Returns number of
-      boxes changed. Also takes care of finding intersecting beams to the added
-      beam and adding the joints to both beams. Uses the point p (which should 
-      be on the beam), to calculate the box it should be added to
-      '''
-      # Getting indeces
-      xi,yi,zi = self.__get_indeces(p)
+    # Create the beam
+    new_beam = Beam(name,(p1,p2),(p1_name,p2_name),self.config.beam_load,
+      store=self.store)
 
-      # Getting the box and all of the other beams in the box
+    # Find the boxes that contain the beam
+    keys = []
+    for indeces in self.__path(p1, p2):
       try:
-        box = self.model[xi][yi][zi]
+        keys.append(self.__get_key(*indeces))
       except IndexError:
         print ("Addbeam is incorrect. Accessing box not defined.")
-        return False
 
-      # Finding intersection points with other beams
-      for key in box:
-        point = helpers.intersection(box[key].endpoints, beam.endpoints)
-        # If they intersect, add the joint to both beams
-        if point != None:
-          assert key == box[key].name
-          if not beam.addjoint(point, box[key]):
-            sys.exit("Could not add joint to {} at {}".format(beam.name,
-              str(point)))
-          if not box[key].addjoint(point, beam):
-            sys.exit("Could not add joint to {} at {}".format(box[key].name,
-              str(point)))
-
-      # update the box
-      self.model[xi][yi][zi] = box
-
-      # Adding beam to boxes that contain it based on the point p.
-      try:
-        if beam.name in self.model[xi][yi][zi]:
-          return 0
-        else:
-          self.model[xi][yi][zi][beam.name] = beam
-          return 1
-      except IndexError:
-        raise OutofBox ("The coordinate {}, is not in the structure. Something\
-          went wront in addpoint()".format(p))
-
-    # Create the beam
-    new_beam = Beam(name,(p1,p2),(p1_name,p2_name))
+    # The other beams in those boxes (each only once)
+    others = {}
+    for key in keys:
+      others.update(self.model.get(key,{}))
+    others = list(others.values())
+
+    # Find the intersection points with all of them at once, and add the joints
+    # to both beams (under the coordinate of the joint in the joint table)
+    if others != []:
+      points = geometry.intersection([other.endpoints for other in others],
+        new_beam.endpoints)
+      for index in np.flatnonzero(~np.isnan(points[:,0])):
+        other, point = others[index], tuple(points[index].tolist())
+        joint = self.joints.add(point,new_beam)
+        self.joints.add(point,other)
+        if not new_beam.addjoint(point, other, joint.coord):
+          sys.exit("Could not add joint to {} at {}".format(new_beam.name,
+            str(point)))
+        if not other.addjoint(point, new_beam, joint.coord):
+          sys.exit("Could not add joint to {} at {}".format(other.name,
+            str(point)))
 
     # Add to all boxes it is located in
     total_boxes = 0
-    try:
-      for point in self.__path(p1, p2):
-        total_boxes += addbeam(new_beam,point)
-    except OutofBox as e:
-      print (e)
-      return False
+    for key in keys:
+      box = self.model.setdefault(key,{})
+      if name not in box:
+        box[name] = new_beam
+        total_boxes += 1
 
     # If something went wrong, kill the program
     assert total_boxes > 0
+    self.beams[name] = new_beam
+    self.tree.add(new_beam)
 
     # If showing the visualization, add the cylinder to the structure
     if self.visualization:
+      from visual import cylinder
       temp = cylinder(pos=p1,axis=helpers.make_vector(p1,p2),
-        radius=variables.outside_diameter)
+        radius=self.config.outside_diameter)
       temp.color = (0,1,1)
 
     # Safe visualization data
@@ -365,58 +345,45 @@ class Structure:
   def remove_beam(self,name,point=None):
     '''
     This function removes the beam element referred to by the specified name 
-    from all the boxes that contained it. If a point contained by the element is
-    given, then it makes the removal faster. Otherwise, the entire structure is
-    searched for the name, and all references removed. Returns true if the 
-    removal is successfull, false otherwise (ie, cannot find the element) 
+    from all the boxes that contained it. The beam is found by name, so the
+    point is no longer needed. Returns true if the removal is successfull, false
+    otherwise (ie, cannot find the element) 
     Furthermore, it removes itself from all of the beams with which it 
     previously intersected.
     '''
     def remove_joints(beam):
       for coord in beam.joints:
+        self.joints.remove(coord,beam)
         for other_beam in beam.joints[coord]:
           if not other_beam.removejoint(coord,beam):
             return False
       return True
 
 
-    # no point given, so cycle through entire structure
-    deleted = False
-    if point == None:
-      for wall in self.model:
-        for column in wall:
-          for box in column:
-            if name in box:
-              value = remove_joints(box[name])
-              del box[name]
-              deleted = value
+    def remove(beam):
+      '''
+      Removes the beam from the boxes it crosses and from the structure
+      '''
+      p1,p2 = beam.endpoints
+      for indeces in self.__path(p1,p2):
+        try:
+          key = self.__get_key(*indeces)
+        except IndexError:
+          continue
+        if key in self.model and beam.name in self.model[key]:
+          del self.model[key][beam.name]
+
+          # Empty boxes are not stored
+          if self.model[key] == {}:
+            del self.model[key]
+
+      del self.beams[beam.name]
+      self.tree.remove(beam.name)
       self.tubes -= 1
-      return value
+      return remove_joints(beam)
 
-    # point is given, so no need to cycle. Just find endpoints.
-    else:
-      xi, yi, zi = self.__get_indeces(point)
-      # found the beam, now get endpoints to find rest of it
-      if name in self.model[xi][yi][zi]:
-        beam = self.model[xi][yi][zi][name]
-        p1,p2 = beam.endpoints
-
-        # find the boxes it crosses
-        for p in self.__path(p1,p2):
-          x,y,z = self.__get_indeces(p)
-
-          # check for the beam being in the box, otherwise raise an error
-          if name in self.model[x][y][z]:
-            del self.model[x][y][z][name]
-            deleted = True
-        self.tubes -= 1
-        return remove_joints(beam)
-
-      # the beam isn't located in the specified box
-      else: 
-        print ("The beam was not found with the specified point. Attempting to\
-          remove it anyway.")
-        return remove_beam(name)
+    beam = self.find_beam(name)
+    return remove(beam) if beam is not None else False
 
   def available(self,e1,e2):
     '''
@@ -465,11 +432,10 @@ class Structure:
     Returns whether or not the beam defined by the endpoints e1 -> e2 exists
     '''
     # Let's get the box
-    xi, yi, zi = self.__get_indeces(e1)
+    box = self.model.get(self.__get_key(*self.__get_indeces(e1)),{})
 
     # Cycle through the box and compare endpoints
-    for name in self.model[xi][yi][zi]:
-      beam = self.model[xi][yi][zi][name]
+    for name, beam in box.items():
       if ((helpers.compare_tuple(beam.endpoints.i,e1,0.5) and helpers.compare_tuple(
         beam.endpoints.j,e2,0.5)) or (helpers.compare_tuple(beam.endpoints.i,e2,0.5) and
         helpers.compare_tuple(beam.endpoints.j,e1,0.5))):
@@ -481,54 +447,67 @@ class Structure:
     Returns the name of each beam along with it's endpoints
     '''
     beams = {}
-    for wall in self.model:
-      for column in wall:
-        for box in column:
-          for name, beam in box.items():
-            if name not in beams:
-              beams[name] = beam.current_state()
+    for name, beam in self.beams.items():
+      beams[name] = beam.current_state()
 
     return beams
 
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+
+    # The beams at the joints of each beam were pickled by name (see
+    # DumbBeam.__getstate__)
+    for beam in self.beams.values():
+      beam.joints = dict((coord, [self.beams[name] for name in names if name in
+        self.beams]) for coord, names in beam.joints.items())
+
   def reset(self):
     # Reset the storage
-    self.model =  ([[[{} for k in range(self.num[0])] for j in 
-      range(self.num[1])] for i in range(self.num[2])])
+    self.model = {}
+    self.beams = {}
+    self.tree = BeamTree()
+    self.store = BeamStore()
+    self.joints = JointTable(self.config.epsilon)
+    self.default_axes = set()
 
     # Reset the tubes
     self.tubes = 0
 
-  def failed(self,program):
+  def failed(self,program,forces=None,displacements=None):
     '''
     Checks the entire SAP2000 structure for any possible structural errors.
+    Takes the bulk results of the analysis (see sap2000/sap_results.py), and
+    retrieves them from the program if they are not given. Each beam is visited
+    once.
     '''
+    # The results of every beam and joint, retrieved all at once
+    if forces is None:
+      forces = program.results.frame_forces()
+    if displacements is None:
+      displacements = program.results.joint_displacements()
+    if forces is None or displacements is None:
+      pdb.set_trace()
+      return False
+
+    # The largest moment along each beam
+    moments = forces.max_moments()
+
     def get_max_moment(beam):
       '''
       Returns the largest moment along a beam
       '''
-      results = program.model.Results.FrameForce(beam.name,0)
-      if results[0] != 0:
+      if beam.name not in moments:
         pdb.set_trace()
         return 0
+      max_val = moments[beam.name]
+      beam.max_moment = max_val
 
-      def total(index):
-        '''
-        Calculates the total moment for a specified index
-        '''
-        m22 = results[13][index]
-        m33 = results[14][index]
-        return math.sqrt(m22**2 + m33**2)
-
-      # Calculate individual moments, and from them choose maximum
-      moments = [total(i) for i in range(results[1])]
-      max_val = max(moments)
-
-      # Store max value along with beam name 
-      if (beam.name,max_val) not in self.structure_data[-1]:
-        self.structure_data[-1].append((beam.name,max_val))
+      # Store max value along with beam name (once, since each beam is only
+      # visited once)
+      self.structure_data[-1].append((beam.name,max_val))
 
       # Calculate gradiant color and store
-      ratio = round(max_val/construction.beam['structure_check'],2)
+      ratio = round(max_val/self.config.beam.structure_check,2)
       color = (ratio,round(max(1-ratio,0),2),0)
       try:
         self.color_data += "{}:{}<>".format(beam.name,str(color)) 
@@ -538,69 +517,71 @@ class Structure:
       # Return maximum value
       return max_val
 
-    def update_deflection(beam):
+    def update_deflections(beams):
       '''
-      Updates the deflection of the specified beam
+      Updates the deflections of all the beams at once. Returns the rows of the
+      beams in the store and whether each changed significantly since it was
+      last written out.
       '''
-      # Assert that the local axes are still the default
-      results = program.model.FrameObj.GetLocalAxes(beam.name)
-      if not (results[0] == 0 and results[1] == 0 and not results[2]):
+      # Assert that the local axes are still the default (nothing changes them,
+      # so each beam is only checked once). Beams that fail are not updated.
+      default = np.ones(len(beams),dtype=bool)
+      for index, beam in enumerate(beams):
+        if beam.name not in self.default_axes:
+          results = program.model.FrameObj.GetLocalAxes(beam.name)
+          if not (results[0] == 0 and results[1] == 0 and not results[2]):
+            pdb.set_trace()
+            default[index] = False
+          else:
+            self.default_axes.add(beam.name)
+
+      # The displacement of every point of the structure (by point id)
+      rows = displacements.first_rows(self.store.point_names)
+      if (rows < 0).any():
         pdb.set_trace()
-        return (0,0,0)
-
-      # Obtain joint axes - these are, by default, the global axes
-      axis_1,axis_2,axis_3 = beam.global_joint_axes()
-
-      # Placed here for access to local axes
-      def get_deflection(joint_name):
-        '''
-        Returns the correct displacement in absolute coordinates for the named
-        joint
-        '''
-        # Get displacements
-        results = program.model.Results.JointDisplAbs(joint_name,0)
-        if results[0] != 0:
-          pdb.set_trace()
-          return (0,0,0)
-        u1,u2,u3 = results[7][0], results[8][0], results[9][0]
+      values = np.where((rows >= 0)[:,np.newaxis],displacements.values[rows,:3],
+        0)
 
-        # Return the total deflection based on the local axes
-        return helpers.sum_vectors(helpers.scale(u1,axis_1),helpers.sum_vectors(
-          helpers.scale(u2,axis_2),helpers.scale(u3,axis_3)))
+      # Obtain joint axes - these are, by default, the global axes (the same for
+      # every beam), and express the displacements in absolute coordinates
+      axes = np.array(beams[0].global_joint_axes(),dtype=float)
+      values = np.dot(values,axes)
 
-      return beam.update_deflection(get_deflection(beam.endpoint_names.i),
-        get_deflection(beam.endpoint_names.j))
+      changed = np.ones(len(beams),dtype=bool)
+      indeces = np.array([beam.index for beam in beams],dtype=int)
+      changed[default] = self.store.update_deflections(indeces[default],values,
+        self.config.visualization.step)
+      return indeces, changed
 
     bool_data = False
-    seen = []
     data = ''
-    for wall in self.model:
-      for column in wall:
-        for cell in column:
-          for name,beam in cell.items():
-            # Only if this is the first time we are collecting data 
-            if name not in seen:
-              moment = get_max_moment(beam)
-              if moment > construction.beam['structure_check']:
-                data += "Beam {} is structurally unstable with moment {}.\n".format(
-                  name,str(moment))
-                bool_data = True
-
-              # Update deflection of beams :)
-              if update_deflection(beam) and variables.deflection:
-                # Add the deflection data for the beam if it's changed significantly
-                # since last time we updated it
-                try:
-                  self.visualization_data += "{}:{}-{}<>".format(str(name),str(
-                    helpers.round_tuple(beam.deflected_endpoints.i,3)),str(
-                    helpers.round_tuple(beam.deflected_endpoints.j,3)))
-                except MemoryError:
-                  pdb.set_trace()
-
-                # Update the previous endpoints
-                beam.previous_write_endpoints = beam.deflected_endpoints
-
-              seen.append(name)
+    for name, beam in self.beams.items():
+      moment = get_max_moment(beam)
+      if moment > self.config.beam.structure_check:
+        data += "Beam {} is structurally unstable with moment {}.\n".format(
+          name,str(moment))
+        bool_data = True
+
+    # Update deflection of beams :)
+    beams = list(self.beams.values())
+    if beams != []:
+      indeces, changed = update_deflections(beams)
+      if not self.config.deflection:
+        changed[:] = False
+
+      # Add the deflection data for the beams that changed significantly since
+      # last time we updated them
+      for index in np.flatnonzero(changed):
+        beam = beams[index]
+        try:
+          self.visualization_data += "{}:{}-{}<>".format(str(beam.name),str(
+            helpers.round_tuple(beam.deflected_endpoints.i,3)),str(
+            helpers.round_tuple(beam.deflected_endpoints.j,3)))
+        except MemoryError:
+          pdb.set_trace()
+
+      # Update the previous endpoints
+      self.store.write(indeces[changed])
 
     if not bool_data:
       return bool_data
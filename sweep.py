@@ -0,0 +1,199 @@
+'''
+Parameter sweeps. Every combination of the values in a grid of overrides is run
+as an independent Simulation, each in a fresh process of a pool, with its own
+output folder. A summary of the runs (height, number of beams, timestep of
+failure and wall time) is printed and written to summary.csv in the folder of
+the sweep.
+
+The keys of the grid are "robots", "seed", or a setting given by its module and
+name, e.g. "variables.local_radius" or "construction.beam.support_angle" (for
+an entry of a dictionary). The settings of each run are handed to its
+Simulation as a Config (see config.py).
+
+The analysis program is a setting like any other. Sweeps run the "Local"
+program by default, so they need neither SAP2000 nor Windows:
+
+  sweep({"seed" : [1,2,3], "construction.beam.beam_limit" : [0.5,0.55]})
+
+Run with "python sweep.py [timesteps] [processes]" for the example GRID.
+'''
+from time import strftime
+import csv, itertools, multiprocessing, os, sys, time, traceback
+
+# The sweep run by "python sweep.py"
+GRID = {"seed"                         : [1,2],
+        "robots"                       : [10,20],
+        "construction.beam.beam_limit" : [0.5,0.55]}
+
+# Settings of every run, unless the grid has them
+DEFAULTS = {"robots"                     : 10,
+            "seed"                       : 1,
+            "variables.analysis_program" : "Local"}
+
+# Columns of the summary
+COLUMNS = ["height","beams","failed_step","timesteps","wall_time","folder",
+  "error"]
+
+def runs(grid, defaults = DEFAULTS):
+  '''
+  Returns the settings of each run of the grid {name : [values]}, one
+  dictionary {name : value} per combination of values
+  '''
+  names = sorted(grid)
+  settings = []
+  for values in itertools.product(*[grid[name] for name in names]):
+    run = dict(defaults)
+    run.update(zip(names,values))
+    settings.append(run)
+
+  return settings
+
+def overrides(settings):
+  '''
+  Returns the overrides of a Config for the settings of a run (the names of
+  the settings without their module, and the entries of construction.beam and
+  variables.visualization as dictionaries). Settings that are none of these,
+  "robots" or "seed" are an error, so that typos do not go unnoticed.
+  '''
+  result = {}
+  for name, value in settings.items():
+    path = name.split(".")
+    if name in ("robots","seed"):
+      continue
+    if path[0] not in ("variables","construction"):
+      raise AttributeError("Unknown setting {}".format(name))
+    if len(path) == 3:
+      result.setdefault(path[1],{})[path[2]] = value
+    elif len(path) == 2:
+      result[path[1]] = value
+    else:
+      raise AttributeError("Unknown setting {}".format(name))
+
+  return result
+
+def check(settings):
+  '''
+  Raises an error if a run's settings name anything a Config does not know
+  (before any run is started)
+  '''
+  from config import Config
+  import construction, variables
+  Config(**overrides(settings))
+
+  # The entries of the dictionaries are merged into them by the Config
+  defaults = {"beam" : construction.beam, "visualization" :
+    variables.visualization}
+  for name, value in overrides(settings).items():
+    if isinstance(value, dict):
+      unknown = sorted(set(value) - set(defaults.get(name,())))
+      if unknown != []:
+        raise AttributeError("Unknown settings {}".format(", ".join(
+          "{}.{}".format(name,key) for key in unknown)))
+
+def run(job):
+  '''
+  Runs one simulation, (index, settings, timesteps, folder), in this process.
+  Returns its row of the summary.
+  '''
+  index, settings, timesteps, folder = job
+  row = dict(settings)
+  row.update({"run" : index, "height" : "", "beams" : "", "failed_step" : "",
+    "timesteps" : 0, "folder" : folder, "error" : ""})
+
+  # The output of the simulation goes to the run's own folder
+  if not os.path.exists(folder):
+    os.makedirs(folder)
+  stdout = sys.stdout
+  sys.stdout = open(os.path.join(folder,"output.txt"),"w")
+  start = time.time()
+  try:
+    from config import Config
+    from main import Simulation
+
+    config = Config(output_folder=folder,**overrides(settings))
+    sim = Simulation(seed=settings["seed"],config=config)
+    sim.start(robots=settings["robots"])
+    sim.run_simulation(timesteps=timesteps)
+
+    row.update({"height" : sim.Structure.height, "beams" :
+      sim.Structure.tubes, "failed_step" : sim.failed_step or "", "timesteps" :
+      sim.timesteps, "folder" : sim.folder})
+  except (Exception, SystemExit) as e:
+    traceback.print_exc(file=sys.stdout)
+    row["error"] = "{}: {}".format(e.__class__.__name__,e)
+  finally:
+    row["wall_time"] = round(time.time() - start,2)
+    sys.stdout.close()
+    sys.stdout = stdout
+
+  return row
+
+def sweep(grid, timesteps = 100, processes = None, folder = None,
+  defaults = DEFAULTS):
+  '''
+  Runs every combination of the grid over a pool of processes (as many as
+  there are cores by default). Returns the rows of the summary, in the order of
+  the runs.
+  '''
+  if folder is None:
+    import variables
+    folder = os.path.join(variables.output_folder,"sweep-" + strftime(
+      "%b-%d-%H_%M_%S"))
+  settings = runs(grid,defaults)
+  for run_settings in settings:
+    check(run_settings)
+  jobs = [(index,run_settings,timesteps,os.path.join(folder,
+    "run-{:03d}".format(index))) for index, run_settings in enumerate(settings)]
+
+  # Every run gets a new process ("spawn" does not inherit anything from this
+  # one), so nothing a run leaves behind in its modules affects the others
+  pool = multiprocessing.get_context("spawn").Pool(processes,
+    maxtasksperchild=1)
+  rows = []
+  try:
+    for row in pool.imap(run,jobs):
+      print("Finished run {} of {} ({:.1f} s){}".format(row["run"] + 1,
+        len(jobs),row["wall_time"]," - " + row["error"] if row["error"] else
+        ""))
+      rows.append(row)
+  finally:
+    pool.close()
+    pool.join()
+
+  write_summary(rows,sorted(grid),os.path.join(folder,"summary.csv"))
+  print_summary(rows,sorted(grid))
+
+  return rows
+
+def write_summary(rows, names, filename):
+  '''
+  Writes the summary of the runs as CSV
+  '''
+  with open(filename,"w",newline="") as summary:
+    writer = csv.writer(summary)
+    writer.writerow(["run"] + names + COLUMNS)
+    for row in rows:
+      writer.writerow([row["run"]] + [row[name] for name in names] + [row[column]
+        for column in COLUMNS])
+
+def print_summary(rows, names):
+  '''
+  Prints the summary of the runs as a table
+  '''
+  def cell(value):
+    if isinstance(value, float):
+      return "{:.2f}".format(value)
+    return str(value)
+
+  columns = ["run"] + names + COLUMNS[:5]
+  widths = [max([len(column)] + [len(cell(row[column])) for row in rows]) for
+    column in columns]
+  print(" ".join(column.rjust(width) for column, width in zip(columns,widths)))
+  for row in rows:
+    print(" ".join(cell(row[column]).rjust(width) for column, width in zip(
+      columns,widths)))
+
+if __name__ == "__main__":
+  timesteps = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+  processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+  sweep(GRID,timesteps,processes)
@@ -3,6 +3,29 @@ import math
 # Units for starting the program
 program_units = "kip_in_F"
 
+# The program that analyzes the structure. "SAP2000" runs SAP2000 through its 
+# COM interface (Windows only). "Local" runs the NumPy frame solver found in 
+# sap2000/sap_local.py, which works anywhere
+analysis_program = "SAP2000"
+
+# Folder where the output of every simulation is stored
+output_folder = "C:\\SAP 2000"
+
+# Solver used by the "Local" analysis program. "dense" only requires NumPy, 
+# "sparse" and "incremental" require SciPy. The incremental solver keeps its
+# factorization between analyses and updates it as beams are added.
+local_solver = "incremental"
+
+# Skip the analysis when the model (beams, restraints and loads) has not changed
+# since the last one, and retrieve each result at most once per analysis (see
+# sap2000/sap_cache.py)
+cache_analysis = True
+
+# Record the changes to the loads on the beams (robots moving around) and apply
+# them in one batch before the model is analyzed, so that only the final loads
+# of each beam are written (see sap2000/sap_journal.py)
+defer_loads = True
+
 # Radius of "locality" (how far can a robot obtain information about 
 # the structure from where it is located. In units specified by program_units
 local_radius = 36 # 3 ft
@@ -35,14 +58,14 @@ random_percentage = 0.33
 # construct before travelling off the structure)
 beam_capacity = 1
 
-# The size of the division of space into blocks. 
-# x,y,z gives the number of blocks along the x axix, the y axis, and the z axis
+# The size of the division of space into blocks. The blocks are cubes, and 
+# box_size gives the length of their sides (in the units specified by 
+# program_units), or "auto" to pick it from beam_length and local_radius (see
+# structure/structure.py). The number of blocks along each axis follows.
 # dim_var gives the limit of the structure on the axis indicated by var. 
 # Keep in mind that the origin is the bottom-left part of this structure
 origin = (0,0,0)
-num_x = 10
-num_y = 10
-num_z = 100
+box_size = "auto"
 dim_x = 1700 # 100 ft
 dim_y = 1700
 dim_z = 170000
@@ -90,6 +113,10 @@ beam_limit = joint_limit + (beam_load + robot_load)*beam_length
 
 # The number of timesteps before an analysis model is saved.
 analysis_timesteps = 200
+
+# The number of timesteps between checkpoints of the simulation, from which it
+# can be resumed (see Simulation.checkpoint and Simulation.resume). 0 for none.
+checkpoint_timesteps = 1000
 ########################################################
 
 # Wind pattern settings